@@ -0,0 +1,165 @@
+"""
+Change bus: publishes (table, rowid, op) events for committed writes
+
+Writes made through this process's connections are captured with SQLite's
+update hook and published once their transaction commits (rolled back
+changes are dropped). Commits from other processes can't be seen row by
+row, so poll() watches PRAGMA data_version and publishes one 'EXTERNAL'
+event; subscribers treat it as "re-check everything you show".
+data_version on the monitor connection also moves when this process
+commits, and it moves once per check however many commits landed, so on
+its own it can't tell our commit from an external one right after it.
+Each local commit is therefore checked twice:
+    in the commit hook, before it lands (the write lock is held, so
+    nothing else can commit): a monitor version other than the baseline
+    means an external commit got in first
+    once it has landed, on the committing thread: the monitor version
+    becomes the new baseline, and the committing connection's own
+    data_version, which never moves for its own commits, shows whether
+    anything else committed since that connection last looked
+poll() leaves the baseline alone while a local commit is between the two.
+A commit from another of this process's connections can be reported as
+EXTERNAL too; that costs a reload, never a lost event.
+
+Subscribers are plain callables taking a list of ChangeEvent. They are
+called on whichever thread committed (or polled), so GUI code should go
+through gui.change_notifier, which forwards events onto the Qt main thread.
+"""
+
+import sqlite3
+import threading
+from collections import namedtuple
+
+from database.connection import database
+
+ChangeEvent = namedtuple('ChangeEvent', ['table', 'rowid', 'op'])
+
+EXTERNAL = 'EXTERNAL'
+
+
+class ChangeBus:
+    def __init__(self, db):
+        self.db = db
+        self._pending = threading.local()
+        self._subscribers = []
+        self._lock = threading.Lock()
+        self._monitor = None
+        self._data_version = None
+        # Local commits whose hook has fired but which haven't been checked after landing
+        self._landing = 0
+        self._external = False
+        self.hooks_enabled = False
+
+    def install(self):
+        """Register the SQLite hooks; safe to call more than once"""
+        if self.hooks_enabled or not hasattr(self.db, 'on_update'):
+            return self.hooks_enabled
+        self.db.on_update(self._on_update)
+        self.db.on_commit(self._on_commit)
+        self.db.on_rollback(self._on_rollback)
+        self.db.after_statement(self._after_statement)
+        if not self.db.is_closed():
+            # Connections opened later take their first reading as they open
+            self._after_statement(self.db.connection())
+        self.hooks_enabled = True
+        return True
+
+    def subscribe(self, callback):
+        with self._lock:
+            self._subscribers.append(callback)
+        return callback
+
+    def unsubscribe(self, callback):
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def publish(self, events):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(events)
+            except Exception as e:
+                print(f"Change bus subscriber failed: {e}")
+
+    def _monitor_version(self):
+        """data_version on the monitor connection, or None if it can't be read; hold self._lock"""
+        try:
+            if self._monitor is None:
+                self._monitor = sqlite3.connect(self.db.database, check_same_thread=False)
+            return self._monitor.execute('PRAGMA data_version').fetchone()[0]
+        except sqlite3.Error:
+            return None
+
+    def poll(self):
+        """Publish an EXTERNAL event if another connection committed since the last poll"""
+        with self._lock:
+            version = self._monitor_version()
+            if version is None or self._landing:
+                # The landing commit's own check moves the baseline
+                return False
+            changed = self._external or (self._data_version is not None and version != self._data_version)
+            self._data_version = version
+            self._external = False
+        if changed:
+            self.publish([ChangeEvent(None, None, EXTERNAL)])
+        return changed
+
+    def close(self):
+        if self._monitor is not None:
+            self._monitor.close()
+            self._monitor = None
+
+    def _events(self):
+        events = getattr(self._pending, 'events', None)
+        if events is None:
+            events = self._pending.events = []
+        return events
+
+    # SQLite hooks; they run on the thread that owns the connection
+    def _on_update(self, op, db_name, table, rowid):
+        self._events().append(ChangeEvent(table, rowid, op))
+
+    def _on_commit(self):
+        with self._lock:
+            if self._data_version is not None and self._monitor_version() != self._data_version:
+                self._external = True
+            self._landing += 1
+        self._pending.landing = True
+        events = self._events()
+        if events:
+            self._pending.events = []
+            self.publish(events)
+
+    def _on_rollback(self):
+        self._pending.events = []
+        if getattr(self._pending, 'landing', False):
+            # The commit failed after its hook ran
+            self._pending.landing = False
+            with self._lock:
+                self._landing -= 1
+
+    def _after_statement(self, conn):
+        landing = getattr(self._pending, 'landing', False)
+        seen = getattr(self._pending, 'data_version', None)   # (connection id, its data_version)
+        if seen is not None and seen[0] != id(conn):
+            seen = None
+        if not landing:
+            if seen is None:
+                self._pending.data_version = (id(conn), conn.execute('PRAGMA data_version').fetchone()[0])
+            return
+        self._pending.landing = False
+        with self._lock:
+            # Monitor first: anything landing after this read still moves the connection's own version
+            version = self._monitor_version()
+            own = conn.execute('PRAGMA data_version').fetchone()[0]
+            if seen is None or seen[1] != own:
+                self._external = True
+            if version is not None:
+                self._data_version = version
+            self._landing -= 1
+        self._pending.data_version = (id(conn), own)
+
+
+change_bus = ChangeBus(database)
@@ -2,11 +2,64 @@ import os
 import peewee as pw
 from playhouse.sqlite_ext import SqliteExtDatabase
 
+# The C extension adds commit/update hooks (used by database.change_bus)
+try:
+    from playhouse.sqlite_ext import CSqliteExtDatabase
+except ImportError:
+    _Database = SqliteExtDatabase
+else:
+    class _Database(CSqliteExtDatabase):
+        # peewee keeps one hook helper per database, not per connection; when
+        # a second thread connects the first thread's helper is collected and
+        # its hooks go with it. Keep each thread's helper on its own state.
+        def _add_conn_hooks(self, conn):
+            super()._add_conn_hooks(conn)
+            self._state.conn_helper = self._conn_helper
+            if self._after_statement is not None:
+                self._after_statement(conn)
+
+        def _close(self, conn):
+            self._conn_helper = getattr(self._state, 'conn_helper', self._conn_helper)
+            self._state.conn_helper = None
+            return super()._close(conn)
+
+        # The commit hook fires before a commit is on disk. A callable set with
+        # after_statement() runs with the connection on its own thread when it
+        # opens and after every statement and COMMIT, by which time it is.
+        _after_statement = None
+
+        def after_statement(self, fn):
+            self._after_statement = fn
+
+        def execute_sql(self, sql, params=None, commit=None):
+            cursor = super().execute_sql(sql, params, commit)
+            if self._after_statement is not None:
+                self._after_statement(self._state.conn)
+            return cursor
+
+        def commit(self):
+            result = super().commit()
+            if self._after_statement is not None:
+                self._after_statement(self._state.conn)
+            return result
+
 # Path to the SQLite database file
 DB_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'dmls_powder.db')
 
-database = SqliteExtDatabase(DB_PATH)
+# WAL lets readers keep working while another connection writes; busy_timeout
+# makes writers wait for the lock instead of failing immediately.
+database = _Database(DB_PATH, pragmas={
+    'journal_mode': 'wal',
+    'busy_timeout': 5000,
+})
+
+# SQL functions (comp_sum, comp_distance, lot_id, ...) for every connection
+from database.functions import register_functions
+register_functions(database)
 
 def init_database():
     if database.is_closed():
-        database.connect() 
\ No newline at end of file
+        database.connect()
+    # Bring older database files up to the current schema
+    from database.migrations import migrate_database
+    migrate_database(database)
@@ -0,0 +1,170 @@
+"""
+Denormalized counts kept exact by triggers
+
+row_counts holds one value per (table_name, row_id, counter):
+    coupon_arrays.coupons   filled coupon_1 .. coupon_256 slots
+    part_lists.parts        filled part_1 .. part_128 slots
+    work_orders.jobs        jobs with that work order
+    builds.jobs             jobs with that build
+Slot counts are recomputed from the row itself on insert/update; child
+counts are incremented and decremented by triggers on the child table. A
+missing row means 0. List views read a count with count_column() instead of
+scanning slots or children per row.
+
+verify_counters() compares the stored values with a fresh count and
+rebuild_counters() recomputes them (python -m dmls counters [--rebuild]).
+row_counts outlives the tables it counts, so creating a counted table (or
+its child) recomputes the counters involved, and dropping one clears them;
+otherwise a drop and re-create would leave the old values for the
+triggers to add to.
+"""
+
+from collections import namedtuple
+
+import peewee as pw
+
+CREATE_TABLE = ('CREATE TABLE IF NOT EXISTS row_counts ('
+                'table_name VARCHAR(255) NOT NULL, row_id INTEGER NOT NULL, '
+                'counter VARCHAR(255) NOT NULL, value INTEGER NOT NULL, '
+                'PRIMARY KEY (table_name, row_id, counter)) WITHOUT ROWID')
+
+# table/counter: filled slots <prefix>1_id .. <prefix><slots>_id of the same row
+SlotCounter = namedtuple('SlotCounter', ['table', 'counter', 'prefix', 'slots'])
+# table/counter: rows of child whose fk column points at the row
+ChildCounter = namedtuple('ChildCounter', ['table', 'counter', 'child', 'fk'])
+
+COUNTERS = [
+    SlotCounter('coupon_arrays', 'coupons', 'coupon_', 256),
+    SlotCounter('part_lists', 'parts', 'part_', 128),
+    ChildCounter('work_orders', 'jobs', 'jobs', 'work_order_id'),
+    ChildCounter('builds', 'jobs', 'jobs', 'build_id'),
+]
+
+Mismatch = namedtuple('Mismatch', ['table', 'row_id', 'counter', 'stored', 'actual'])
+
+def _slot_columns(counter):
+    return [f'{counter.prefix}{i}_id' for i in range(1, counter.slots + 1)]
+
+
+def _slot_sum(counter, alias):
+    return '(' + ' + '.join(f'({alias}."{column}" IS NOT NULL)' for column in _slot_columns(counter)) + ')'
+
+
+def _parent_delete_trigger(table):
+    return (f'CREATE TRIGGER IF NOT EXISTS {table}_counts_delete AFTER DELETE ON {table} BEGIN '
+            f"DELETE FROM row_counts WHERE table_name = '{table}' AND row_id = OLD.id; END")
+
+
+def counter_triggers(counter):
+    """(table the trigger is on, CREATE TRIGGER sql) pairs for one counter"""
+    table, name = counter.table, counter.counter
+    key = f"'{table}', {{row}}, '{name}'"
+    if isinstance(counter, SlotCounter):
+        upsert = (f"INSERT INTO row_counts (table_name, row_id, counter, value) "
+                  f"VALUES ({key.format(row='NEW.id')}, {_slot_sum(counter, 'NEW')}) "
+                  f"ON CONFLICT (table_name, row_id, counter) DO UPDATE SET value = excluded.value")
+        columns = ', '.join(f'"{column}"' for column in _slot_columns(counter))
+        return [
+            (table, f'CREATE TRIGGER IF NOT EXISTS {table}_count_{name}_insert '
+                    f'AFTER INSERT ON {table} BEGIN {upsert}; END'),
+            (table, f'CREATE TRIGGER IF NOT EXISTS {table}_count_{name}_update '
+                    f'AFTER UPDATE OF {columns} ON {table} BEGIN {upsert}; END'),
+            (table, _parent_delete_trigger(table)),
+        ]
+    child, fk = counter.child, counter.fk
+    # Children pointing at a missing parent aren't counted (matching the JOIN in verify)
+    increment = (f"INSERT INTO row_counts (table_name, row_id, counter, value) "
+                 f"SELECT {key.format(row=f'NEW.{fk}')}, 1 WHERE EXISTS "
+                 f"(SELECT 1 FROM {table} WHERE id = NEW.{fk}) "
+                 f"ON CONFLICT (table_name, row_id, counter) DO UPDATE SET value = value + 1")
+    decrement = (f"UPDATE row_counts SET value = value - 1 WHERE table_name = '{table}' "
+                 f"AND counter = '{name}' AND row_id = OLD.{fk}")
+    prefix = f'{child}_count_{table}_{name}'
+    return [
+        (child, f'CREATE TRIGGER IF NOT EXISTS {prefix}_insert AFTER INSERT ON {child} '
+                f'WHEN NEW.{fk} IS NOT NULL BEGIN {increment}; END'),
+        (child, f'CREATE TRIGGER IF NOT EXISTS {prefix}_delete AFTER DELETE ON {child} '
+                f'WHEN OLD.{fk} IS NOT NULL BEGIN {decrement}; END'),
+        (child, f'CREATE TRIGGER IF NOT EXISTS {prefix}_update AFTER UPDATE OF {fk} ON {child} '
+                f'WHEN OLD.{fk} IS NOT NEW.{fk} BEGIN {decrement}; {increment}; END'),
+        (table, _parent_delete_trigger(table)),
+    ]
+
+
+def _involving(table):
+    return [counter for counter in COUNTERS if table in (counter.table, getattr(counter, 'child', None))]
+
+
+def install_counter_triggers(db, table):
+    """Create the triggers that live on table and recompute its counters (called when the table is created)"""
+    statements = [sql for counter in COUNTERS for on, sql in counter_triggers(counter) if on == table]
+    if statements:
+        db.execute_sql(CREATE_TABLE)
+    for sql in statements:
+        db.execute_sql(sql)
+    if _involving(table):
+        rebuild_counters(db, _involving(table))
+
+
+def forget_counters(db, table):
+    """Delete the stored counts that depend on table (called when the table is dropped)"""
+    counters = _involving(table)
+    if not counters or 'row_counts' not in db.get_tables():
+        return
+    for counter in counters:
+        db.execute_sql('DELETE FROM row_counts WHERE table_name = ? AND counter = ?',
+                       (counter.table, counter.counter))
+
+
+def _actual_counts_sql(counter):
+    """SELECT row_id, value for every row of counter.table with a non-zero count"""
+    if isinstance(counter, SlotCounter):
+        return (f'SELECT row_id, value FROM (SELECT t.id AS row_id, {_slot_sum(counter, "t")} AS value '
+                f'FROM {counter.table} t) WHERE value > 0')
+    return (f'SELECT c.{counter.fk} AS row_id, COUNT(*) AS value FROM {counter.child} c '
+            f'JOIN {counter.table} t ON t.id = c.{counter.fk} GROUP BY c.{counter.fk}')
+
+
+def _installed(db, counters):
+    tables = set(db.get_tables())
+    return [counter for counter in counters
+            if counter.table in tables and getattr(counter, 'child', counter.table) in tables]
+
+
+def rebuild_counters(db, counters=None):
+    """Recompute counters (default: all) from scratch in one transaction"""
+    counters = _installed(db, COUNTERS if counters is None else counters)
+    with db.atomic():
+        db.execute_sql(CREATE_TABLE)
+        for counter in counters:
+            db.execute_sql('DELETE FROM row_counts WHERE table_name = ? AND counter = ?',
+                           (counter.table, counter.counter))
+            db.execute_sql(f'INSERT INTO row_counts (table_name, row_id, counter, value) '
+                           f"SELECT '{counter.table}', row_id, '{counter.counter}', value "
+                           f'FROM ({_actual_counts_sql(counter)})')
+
+
+def verify_counters(db, counters=None):
+    """Mismatch tuples for every stored count that differs from a fresh count"""
+    mismatches = []
+    for counter in _installed(db, COUNTERS if counters is None else counters):
+        actual = dict(db.execute_sql(_actual_counts_sql(counter)).fetchall())
+        stored = dict(db.execute_sql(
+            'SELECT row_id, value FROM row_counts WHERE table_name = ? AND counter = ?',
+            (counter.table, counter.counter)).fetchall())
+        for row_id in sorted(actual.keys() | stored.keys()):
+            if actual.get(row_id, 0) != stored.get(row_id, 0):
+                mismatches.append(Mismatch(counter.table, row_id, counter.counter,
+                                           stored.get(row_id, 0), actual.get(row_id, 0)))
+    return mismatches
+
+
+def count_column(model_cls, counter):
+    """Correlated subquery giving model_cls rows' counter value (0 when missing)"""
+    row_counts = pw.Table('row_counts', ('table_name', 'row_id', 'counter', 'value'))
+    value = (row_counts
+             .select(row_counts.value)
+             .where((row_counts.table_name == model_cls._meta.table_name) &
+                    (row_counts.counter == counter) &
+                    (row_counts.row_id == model_cls._meta.primary_key)))
+    return pw.fn.COALESCE(value, 0)
@@ -0,0 +1,86 @@
+"""
+User-defined SQL functions registered on every connection
+
+Scalar:
+    comp_sum(x1, x2, ...)              sum of the non-NULL arguments
+    comp_distance(a1, b1, a2, b2, ...) Euclidean distance over the pairs where both are set
+                                       (NULL if there are none)
+    lot_id(powder_id)                  '<matID>-<manLot>' from '<matID>-<manLot>-<subgroup>-<rev>'
+Aggregate:
+    weighted_mean(value, weight)       e.g. a quantity-weighted composition
+
+All are deterministic, so SQLite may use them in WHERE/ORDER BY freely.
+Energy density is not among them: the expression index on feature_settings
+and the queries that use it are written with built-in arithmetic (see
+FeatureSetting.energy_density), so other SQLite clients that don't have
+these functions can still write to the indexed table.
+"""
+
+import math
+
+
+def comp_sum(*values):
+    return sum(v for v in values if v is not None)
+
+
+def comp_distance(*pairs):
+    if len(pairs) % 2:
+        raise ValueError("comp_distance takes (a, b) pairs")
+    total, compared = 0.0, 0
+    for a, b in zip(pairs[::2], pairs[1::2]):
+        if a is not None and b is not None:
+            total += (a - b) ** 2
+            compared += 1
+    return math.sqrt(total) if compared else None
+
+
+def parse_powder_id(powder_id):
+    """(mat_id, man_lot, subgroup, rev) from '<matID>-<manLot>-<subgroup>-<rev>', or None"""
+    if not isinstance(powder_id, str):
+        return None
+    parts = powder_id.rsplit('-', 3)
+    if len(parts) != 4:
+        return None
+    mat_id, man_lot, subgroup, rev = parts
+    try:
+        return mat_id, man_lot, int(subgroup), int(rev)
+    except ValueError:
+        return None
+
+
+def lot_id(powder_id):
+    parsed = parse_powder_id(powder_id)
+    return f"{parsed[0]}-{parsed[1]}" if parsed else None
+
+
+class WeightedMean:
+    def __init__(self):
+        self.total = 0.0
+        self.weight = 0.0
+
+    def step(self, value, weight):
+        if value is not None and weight:
+            self.total += value * weight
+            self.weight += weight
+
+    def finalize(self):
+        return self.total / self.weight if self.weight else None
+
+
+SCALAR_FUNCTIONS = {
+    'comp_sum': (comp_sum, -1),
+    'comp_distance': (comp_distance, -1),
+    'lot_id': (lot_id, 1),
+}
+
+AGGREGATES = {
+    'weighted_mean': (WeightedMean, 2),
+}
+
+
+def register_functions(db):
+    """Register everything above on db; connections opened afterwards get them"""
+    for name, (fn, num_params) in SCALAR_FUNCTIONS.items():
+        db.register_function(fn, name, num_params, deterministic=True)
+    for name, (klass, num_params) in AGGREGATES.items():
+        db.register_aggregate(klass, name, num_params)
@@ -0,0 +1,204 @@
+"""
+Schema migrations for existing database files
+
+Applied versions are tracked in PRAGMA user_version. Each migration runs in
+its own transaction and must cope with a database whose tables don't exist
+yet (a fresh file that seed_database.py will fill in later).
+"""
+
+import sys
+
+from database.connection import database
+
+# feature type -> table that held its parameters before migration 1
+LEGACY_FEATURE_TABLES = {
+    'hatch_up_skin': 'hatch_up_skins',
+    'hatch_infill': 'hatch_infills',
+    'hatch_down_skin': 'hatch_down_skins',
+    'contour_on_part': 'contour_on_parts',
+    'contour_standard': 'contour_standards',
+    'contour_down': 'contour_downs',
+    'edge': 'edges',
+    'core': 'cores',
+    'support': 'supports',
+}
+
+
+def _columns(db, table):
+    return [column.name for column in db.get_columns(table)]
+
+
+def merge_feature_settings(db):
+    """Move the nine per-feature tables into feature_settings"""
+    from models.settings.feature_settings import DELETE_TRIGGER
+    if 'settings' not in db.get_tables():
+        return
+    # Schema as of this migration; later migrations build on it
+    db.execute_sql(
+        'CREATE TABLE IF NOT EXISTS "feature_settings" ("id" INTEGER NOT NULL PRIMARY KEY, '
+        '"setting_id" INTEGER NOT NULL, "feature_type" VARCHAR(255) NOT NULL, "power" REAL, '
+        '"scan_speed" REAL, "layer_thick" REAL, "hatch_dist" REAL, '
+        'FOREIGN KEY ("setting_id") REFERENCES "settings" ("id") ON DELETE CASCADE)')
+    db.execute_sql('CREATE INDEX IF NOT EXISTS "featuresetting_setting_id" '
+                   'ON "feature_settings" ("setting_id")')
+    db.execute_sql('CREATE UNIQUE INDEX IF NOT EXISTS "featuresetting_setting_id_feature_type" '
+                   'ON "feature_settings" ("setting_id", "feature_type")')
+    db.execute_sql(DELETE_TRIGGER)
+    columns = _columns(db, 'settings')
+    legacy = [(feature_type, table) for feature_type, table in LEGACY_FEATURE_TABLES.items()
+              if f'{feature_type}_id' in columns]
+    if not legacy:
+        return
+    for feature_type, table in legacy:
+        db.execute_sql(
+            'INSERT OR REPLACE INTO feature_settings '
+            '(setting_id, feature_type, power, scan_speed, layer_thick, hatch_dist) '
+            f'SELECT s.id, ?, f.power, f.scan_speed, f.layer_thick, f.hatch_dist '
+            f'FROM settings s JOIN "{table}" f ON f.id = s."{feature_type}_id"',
+            (feature_type,))
+    # The FK columns can't be dropped in place; rebuild settings without them
+    # (dropping the table also drops the trigger, which is recreated below)
+    db.execute_sql(
+        'CREATE TABLE "settings__new" ("id" INTEGER NOT NULL PRIMARY KEY, '
+        '"name" VARCHAR(255) NOT NULL, "description" VARCHAR(255) NOT NULL, '
+        '"is_preset" INTEGER NOT NULL)')
+    db.execute_sql('INSERT INTO "settings__new" (id, name, description, is_preset) '
+                   'SELECT id, name, description, is_preset FROM settings')
+    db.execute_sql('DROP TABLE settings')
+    db.execute_sql('ALTER TABLE "settings__new" RENAME TO settings')
+    for _, table in legacy:
+        db.execute_sql(f'DROP TABLE IF EXISTS "{table}"')
+    db.execute_sql(DELETE_TRIGGER)
+
+
+def add_setting_hashes(db):
+    """Add indexed parameter hashes to settings and fill them in"""
+    from models.settings.feature_settings import STALE_HASH_TRIGGERS
+    from models.settings.dedupe import refresh_hashes
+    if 'settings' not in db.get_tables():
+        return
+    columns = _columns(db, 'settings')
+    for column in ('content_hash', 'near_hash'):
+        if column not in columns:
+            db.execute_sql(f'ALTER TABLE settings ADD COLUMN "{column}" VARCHAR(255)')
+        db.execute_sql(f'CREATE INDEX IF NOT EXISTS "setting_{column}" ON "settings" ("{column}")')
+    for sql in STALE_HASH_TRIGGERS:
+        db.execute_sql(sql)
+    refresh_hashes()
+
+
+def add_table_versions(db):
+    """Track changes to feature_settings for cached analytics"""
+    from database.table_versions import install_version_triggers
+    if 'feature_settings' in db.get_tables():
+        install_version_triggers(db, 'feature_settings')
+
+
+def add_expression_indexes(db):
+    """Energy density expression index on feature_settings, lot index on powders"""
+    from models.settings.feature_settings import FeatureSetting
+    from models.powders.powder import Powder
+    tables = db.get_tables()
+    if 'feature_settings' in tables:
+        FeatureSetting._schema.create_indexes(safe=True)
+    if 'powders' in tables:
+        Powder._schema.create_indexes(safe=True)
+
+
+def add_composition_versions(db):
+    """No-op: once tracked powder_compositions for an element bitmap cache
+
+    The bitmaps are now computed from the loaded composition row, so nothing
+    reads the version; drop_composition_versions removes the triggers from
+    databases that got them.
+    """
+
+
+def add_row_counts(db):
+    """Trigger-maintained coupon, part and job counts"""
+    from database.counters import install_counter_triggers, rebuild_counters
+    for table in db.get_tables():
+        install_counter_triggers(db, table)
+    rebuild_counters(db)
+
+
+def add_sort_indexes(db):
+    """Indexes on the columns the list tabs are usually sorted by"""
+    from models.builds.build import Build
+    from models.jobs.work_order import WorkOrder
+    from models.jobs.job import Job
+    from models.settings.setting import Setting
+    from models.powders.powder import Powder
+    from models.coupons.coupon_array import CouponArray
+    tables = db.get_tables()
+    for model_cls in (Build, WorkOrder, Job, Setting, Powder, CouponArray):
+        if model_cls._meta.table_name in tables:
+            model_cls._schema.create_indexes(safe=True)
+
+
+def add_coupon_positions(db):
+    """R-tree index over coupon positions"""
+    from models.coupons.coupon_position import install_position_index
+    if 'coupons' in db.get_tables():
+        install_position_index(db)
+
+
+def add_part_geometry(db):
+    """Cache table for STL volume, area and bounding box"""
+    from models.jobs.part_geometry import GeometryCache
+    GeometryCache.create_table(safe=True)
+
+
+def add_part_files(db):
+    """Catalog of part file sizes, mtimes and content hashes"""
+    from models.jobs.part_files import PartFile
+    PartFile.create_table(safe=True)
+
+
+def add_build_logs(db):
+    """Machine logs of builds, stored as per-layer chunks"""
+    from models.builds.build_log import BuildLog, BuildLogChunk
+    BuildLog.create_table(safe=True)
+    BuildLogChunk.create_table(safe=True)
+
+def drop_composition_versions(db):
+    """Remove the powder_compositions version triggers nothing reads any more"""
+    from database.table_versions import drop_version_triggers
+    drop_version_triggers(db, 'powder_compositions')
+
+
+# (version, migration) in the order they are applied
+MIGRATIONS = [
+    (1, merge_feature_settings),
+    (2, add_setting_hashes),
+    (3, add_table_versions),
+    (4, add_expression_indexes),
+    (5, add_composition_versions),
+    (6, add_row_counts),
+    (7, add_sort_indexes),
+    (8, add_coupon_positions),
+    (9, add_part_geometry),
+    (10, add_part_files),
+    (11, add_build_logs),
+    (12, drop_composition_versions),
+]
+
+
+def schema_version(db=database):
+    return db.execute_sql('PRAGMA user_version').fetchone()[0]
+
+
+def migrate_database(db=database):
+    """Apply pending migrations; returns the versions that were applied"""
+    applied = []
+    current = schema_version(db)
+    for version, migration in MIGRATIONS:
+        if version <= current:
+            continue
+        with db.atomic():
+            migration(db)
+            db.execute_sql(f'PRAGMA user_version = {int(version)}')
+        applied.append(version)
+        # stderr, so output piped from the CLI (--format json) stays parseable
+        print(f"Applied database migration {version}: {migration.__name__}", file=sys.stderr)
+    return applied
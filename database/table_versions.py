@@ -0,0 +1,46 @@
+"""
+Per-table version counters maintained by triggers
+
+Every INSERT, UPDATE or DELETE on a tracked table bumps its row in
+table_versions, from any connection or process. Caches of derived data can
+store the version they were built from and compare it with one cheap read
+instead of re-querying the table.
+"""
+
+import peewee as pw
+
+CREATE_TABLE = ('CREATE TABLE IF NOT EXISTS table_versions '
+                '(name VARCHAR(255) NOT NULL PRIMARY KEY, version INTEGER NOT NULL)')
+
+
+def version_triggers(table):
+    return [
+        f'CREATE TRIGGER IF NOT EXISTS {table}_version_{op.lower()} '
+        f'AFTER {op} ON {table} BEGIN '
+        f"INSERT INTO table_versions (name, version) VALUES ('{table}', 1) "
+        f'ON CONFLICT (name) DO UPDATE SET version = version + 1; END'
+        for op in ('INSERT', 'UPDATE', 'DELETE')
+    ]
+
+
+def install_version_triggers(db, table):
+    db.execute_sql(CREATE_TABLE)
+    for sql in version_triggers(table):
+        db.execute_sql(sql)
+
+
+def drop_version_triggers(db, table):
+    """Stop tracking table and forget its version"""
+    for op in ('insert', 'update', 'delete'):
+        db.execute_sql(f'DROP TRIGGER IF EXISTS {table}_version_{op}')
+    if 'table_versions' in db.get_tables():
+        db.execute_sql('DELETE FROM table_versions WHERE name = ?', (table,))
+
+
+def table_version(db, table):
+    """Current version of table (0 if it has never changed or isn't tracked)"""
+    try:
+        row = db.execute_sql('SELECT version FROM table_versions WHERE name = ?', (table,)).fetchone()
+    except pw.OperationalError:
+        return 0  # no table_versions table yet
+    return row[0] if row else 0
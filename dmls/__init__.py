@@ -0,0 +1 @@
+# Headless command line interface (never imports Qt)
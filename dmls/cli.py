@@ -0,0 +1,603 @@
+"""
+Headless command line interface for lookups, listings and exports.
+
+Usage examples:
+    python -m dmls lot 316L-S312328 --total
+    python -m dmls builds --setting 3
+    python -m dmls --format json trace 42
+    python -m dmls export coupon-arrays -o arrays.tsv
+
+Everything here stays on the models/ layer and never imports PyQt6, so a
+call costs one interpreter start plus a handful of projection queries.
+Models are imported lazily per subcommand to keep startup short.
+"""
+
+import argparse
+import importlib
+import json
+import os
+import sys
+
+import peewee as pw
+
+from database.connection import database, init_database
+
+# Entity name -> (module path, model class name)
+ENTITIES = {
+    'builds': ('models.builds.build', 'Build'),
+    'work-orders': ('models.jobs.work_order', 'WorkOrder'),
+    'jobs': ('models.jobs.job', 'Job'),
+    'settings': ('models.settings.setting', 'Setting'),
+    'powders': ('models.powders.powder', 'Powder'),
+    'plates': ('models.plates.plate', 'Plate'),
+    'coupon-arrays': ('models.coupons.coupon_array', 'CouponArray'),
+    'parts': ('models.jobs.part', 'Part'),
+    'part-lists': ('models.jobs.part_list', 'PartList'),
+}
+
+# Columns shown by `list`; foreign keys are read as raw ids, never dereferenced
+LIST_COLUMNS = {
+    'builds': ['id', 'name', 'datetime', 'powder', 'setting', 'plate', 'coupon_array',
+               'powder_weight_required', 'powder_weight_loaded'],
+    'work-orders': ['id', 'name', 'pvid', 'part_list'],
+    'jobs': ['id', 'name', 'part_list', 'work_order', 'build'],
+    'settings': ['id', 'name', 'description', 'is_preset'],
+    'powders': ['id', 'mat_id', 'man_lot', 'subgroup', 'rev', 'quantity', 'init_date_time'],
+    'plates': ['id', 'description', 'material'],
+    'coupon-arrays': ['id', 'name', 'description', 'is_preset'],
+    'parts': ['id', 'name', 'file_path', 'is_complete'],
+    'part-lists': ['id', 'name', 'description', 'is_preset'],
+}
+
+
+def load_model(entity):
+    module_path, class_name = ENTITIES[entity]
+    return getattr(importlib.import_module(module_path), class_name)
+
+
+def element_list(text):
+    """argparse type for 'Fe,Cr,Ni'; unknown symbols are a usage error"""
+    from models.powders.powder_composition import element_fields
+    elements = [element.strip() for element in text.split(',') if element.strip()]
+    if not elements:
+        raise argparse.ArgumentTypeError("no elements given")
+    try:
+        element_fields(elements)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+    return elements
+
+
+def element_percentages(text):
+    """argparse type for 'Fe=70,Cr=18'"""
+    pairs = [pair.partition('=') for pair in text.split(',') if pair.strip()]
+    try:
+        values = [float(value) for _, _, value in pairs]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected ELEMENT=PERCENT pairs: {text!r}")
+    return dict(zip(element_list(','.join(element for element, _, _ in pairs)), values))
+
+
+def projection(model_cls, field_names):
+    """Return (headers, fields) for a column projection; foreign keys come out as <name>_id"""
+    fields = [model_cls._meta.fields[name] for name in field_names]
+    return [f.column_name for f in fields], fields
+
+
+def _format_tsv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return str(value).replace('\t', ' ').replace('\r', ' ').replace('\n', ' ')
+
+
+def write_rows(headers, rows, fmt, out, header=True):
+    """Write rows as JSON (list of objects) or TSV"""
+    if fmt == 'json':
+        json.dump([dict(zip(headers, row)) for row in rows], out, default=str)
+        out.write('\n')
+        return
+    if header:
+        out.write('\t'.join(headers) + '\n')
+    for row in rows:
+        out.write('\t'.join(_format_tsv_value(v) for v in row) + '\n')
+
+
+def split_lot(lot):
+    """Split '<matID>-<manLot>' into (mat_id, man_lot); a bare lot has no mat_id"""
+    if '-' in lot:
+        mat_id, man_lot = lot.rsplit('-', 1)
+        return mat_id, man_lot
+    return None, lot
+
+
+def cmd_powder(args, out):
+    Powder = load_model('powders')
+    headers, fields = projection(Powder, LIST_COLUMNS['powders'] + ['description'])
+    rows = list(Powder.select(*fields).where(Powder.id == args.powder_id).tuples())
+    if not rows:
+        print(f"Powder not found: {args.powder_id}", file=sys.stderr)
+        return 1
+    write_rows(headers, rows, args.format, out, header=not args.no_header)
+    return 0
+
+
+def cmd_lot(args, out):
+    Powder = load_model('powders')
+    mat_id, man_lot = split_lot(args.lot)
+    query = Powder.man_lot == man_lot
+    if mat_id is not None:
+        query &= Powder.mat_id == mat_id
+    if args.total:
+        total = Powder.select(pw.fn.SUM(Powder.quantity)).where(query).scalar()
+        if args.format == 'json':
+            json.dump({'lot': args.lot, 'quantity': total or 0.0}, out)
+            out.write('\n')
+        else:
+            out.write(f"{total or 0.0}\n")
+        return 0
+    headers, fields = projection(Powder, LIST_COLUMNS['powders'])
+    rows = Powder.select(*fields).where(query).order_by(Powder.subgroup, Powder.rev).tuples()
+    write_rows(headers, rows, args.format, out, header=not args.no_header)
+    return 0
+
+
+def cmd_builds(args, out):
+    Build = load_model('builds')
+    headers, fields = projection(Build, LIST_COLUMNS['builds'])
+    query = Build.select(*fields)
+    for field_name in ('setting', 'powder', 'plate', 'coupon_array'):
+        value = getattr(args, field_name)
+        if value is not None:
+            query = query.where(getattr(Build, field_name) == value)
+    write_rows(headers, query.order_by(Build.id).tuples(), args.format, out, header=not args.no_header)
+    return 0
+
+
+def cmd_jobs(args, out):
+    Job = load_model('jobs')
+    headers, fields = projection(Job, LIST_COLUMNS['jobs'])
+    query = Job.select(*fields)
+    for field_name in ('build', 'work_order', 'part_list'):
+        value = getattr(args, field_name)
+        if value is not None:
+            query = query.where(getattr(Job, field_name) == value)
+    write_rows(headers, query.order_by(Job.id).tuples(), args.format, out, header=not args.no_header)
+    return 0
+
+
+def cmd_settings(args, out):
+    from models.settings.setting import Setting
+    from models.settings.feature_settings import settings_in_energy_window
+    headers, fields = projection(Setting, LIST_COLUMNS['settings'])
+    query = settings_in_energy_window(args.energy_min, args.energy_max, args.feature).select(*fields)
+    write_rows(headers, query.tuples(), args.format, out, header=not args.no_header)
+    return 0
+
+
+def cmd_powders(args, out):
+    from models.powders.powder import Powder
+    from models.powders.powder_composition import powders_by_composition_sum
+    headers, fields = projection(Powder, LIST_COLUMNS['powders'])
+    query = powders_by_composition_sum(args.elements, args.sum_min, args.sum_max).select(*fields)
+    write_rows(headers, query.tuples(), args.format, out, header=not args.no_header)
+    return 0
+
+
+def cmd_nearest_powders(args, out):
+    from models.powders.powder_composition import nearest_powders
+    rows = [(powder_id, round(distance, 4)) for powder_id, distance in nearest_powders(args.reference, args.limit)]
+    write_rows(['powder_id', 'distance'], rows, args.format, out, header=not args.no_header)
+    return 0
+
+
+def cmd_lot_composition(args, out):
+    from models.powders.powder_composition import lot_composition
+    composition = lot_composition(args.lot, args.elements)
+    write_rows(['element', 'percent'], list(composition.items()), args.format, out, header=not args.no_header)
+    return 0
+
+
+def cmd_trace(args, out):
+    from models.jobs.job import Job
+    from models.builds.build import Build
+    from models.powders.powder import Powder
+    from models.settings.setting import Setting
+    from models.plates.plate import Plate
+    from models.coupons.coupon_array import CouponArray
+    query = (Build
+             .select(Build.id, Build.name, Build.datetime,
+                     Build.powder, Powder.mat_id, Powder.man_lot,
+                     Build.setting, Setting.name,
+                     Build.plate, Plate.material,
+                     Build.coupon_array, CouponArray.name,
+                     pw.fn.GROUP_CONCAT(Job.id))
+             .join_from(Build, Powder, pw.JOIN.LEFT_OUTER)
+             .join_from(Build, Setting, pw.JOIN.LEFT_OUTER)
+             .join_from(Build, Plate, pw.JOIN.LEFT_OUTER)
+             .join_from(Build, CouponArray, pw.JOIN.LEFT_OUTER, on=(Build.coupon_array == CouponArray.id))
+             .join_from(Build, Job, pw.JOIN.LEFT_OUTER, on=(Job.build == Build.id))
+             .where(Build.id == args.build_id)
+             .group_by(Build.id)
+             .tuples())
+    rows = list(query)
+    if not rows:
+        print(f"Build not found: {args.build_id}", file=sys.stderr)
+        return 1
+    headers = ['id', 'name', 'datetime', 'powder_id', 'mat_id', 'man_lot',
+               'setting_id', 'setting_name', 'plate_id', 'plate_material',
+               'coupon_array_id', 'coupon_array_name', 'job_ids']
+    write_rows(headers, rows, args.format, out, header=not args.no_header)
+    return 0
+
+
+def cmd_list(args, out):
+    model_cls = load_model(args.entity)
+    headers, fields = projection(model_cls, LIST_COLUMNS[args.entity])
+    query = model_cls.select(*fields).order_by(model_cls._meta.primary_key)
+    if args.limit:
+        query = query.limit(args.limit)
+    write_rows(headers, query.tuples(), args.format, out, header=not args.no_header)
+    return 0
+
+
+def cmd_export(args, out):
+    model_cls = load_model(args.entity)
+    fields = list(model_cls._meta.sorted_fields)
+    headers = [f.column_name for f in fields]
+    query = model_cls.select(*fields).order_by(model_cls._meta.primary_key).tuples()
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8', newline='') as fh:
+            write_rows(headers, query, args.format, fh, header=not args.no_header)
+    else:
+        write_rows(headers, query, args.format, out, header=not args.no_header)
+    return 0
+
+
+def cmd_setting_dupes(args, out):
+    from models.builds.build import Build
+    from models.settings.dedupe import find_duplicates, choose_keeper, merge_settings
+    if args.near and args.merge:
+        # Near groups only round to the same values; merging them would change builds' parameters
+        print("--merge folds exact duplicates only; --near is a report", file=sys.stderr)
+        return 1
+    rows = []
+    for group in find_duplicates(near=args.near):
+        keep = choose_keeper(group)
+        duplicates = [setting_id for setting_id in group if setting_id != keep]
+        builds = Build.select().where(Build.setting.in_(duplicates)).count()
+        if args.merge:
+            merge_settings(keep, duplicates)
+        rows.append((keep, ','.join(str(i) for i in duplicates), builds))
+    headers = ['keep', 'duplicates', 'builds_moved' if args.merge else 'builds_to_move']
+    write_rows(headers, rows, args.format, out, header=not args.no_header)
+    return 0
+
+
+def cmd_counters(args, out):
+    from database.counters import verify_counters, rebuild_counters
+    mismatches = verify_counters(database)
+    if args.rebuild and mismatches:
+        rebuild_counters(database)
+    write_rows(['table', 'row_id', 'counter', 'stored', 'actual'], mismatches,
+               args.format, out, header=not args.no_header)
+    # Non-zero when counts were wrong and left that way
+    return 1 if mismatches and not args.rebuild else 0
+
+
+def cmd_integrity(args, out):
+    from models.integrity import scan, repair
+    found = scan()
+    rows = [(check.model._meta.table_name, check.field.column_name, check.field.rel_model._meta.table_name,
+             row_id, missing_id) for check in found for row_id, missing_id in check.rows]
+    write_rows(['table', 'column', 'references', 'row_id', 'missing_id'], rows,
+               args.format, out, header=not args.no_header)
+    if args.clear:
+        nullable = [(check.model, check.field, None) for check in found
+                    if check.field.null and not check.field.primary_key]
+        if nullable:
+            print(f"Cleared {repair(nullable)} references", file=sys.stderr)
+    return 1 if rows and not args.clear else 0
+
+
+def cmd_clone_array(args, out):
+    from models.coupons.preset_clone import clone_coupon_array
+    try:
+        new_id = clone_coupon_array(args.coupon_array_id, args.name, copy_on_write=args.copy_on_write)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    write_rows(['source', 'coupon_array', 'copy_on_write'], [(args.coupon_array_id, new_id, args.copy_on_write)],
+               args.format, out, header=not args.no_header)
+    return 0
+
+
+def cmd_coupon_overlaps(args, out):
+    from models.coupons.spatial import overlapping_coupons
+    overlaps = overlapping_coupons(args.clearance, coupon_array=args.coupon_array, build=args.build)
+    write_rows(['coupon', 'other_coupon', 'distance'], [(o.id, o.other_id, round(o.distance, 3)) for o in overlaps],
+               args.format, out, header=not args.no_header)
+    return 1 if overlaps else 0
+
+
+def cmd_layout(args, out):
+    from models.coupons.layout import layout_points, find_collisions, create_layout_array
+    points = layout_points(args.pattern, args.width, args.depth, args.spacing, args.spacing_y,
+                           margin=args.margin, angle=args.angle)[:args.limit]
+    if args.clearance is not None:
+        for collision in find_collisions(points, args.clearance):
+            print(f"Positions {collision.first + 1} and {collision.second + 1} are "
+                  f"{collision.distance:.3f} apart", file=sys.stderr)
+    if args.name:
+        try:
+            array_id = create_layout_array(points, args.name, z=args.z, direction=args.direction,
+                                           clearance=args.clearance, is_preset=args.preset)
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            return 1
+        print(f"Created coupon array {array_id} with {len(points)} coupons", file=sys.stderr)
+    rows = [(slot, round(float(x), 4), round(float(y), 4)) for slot, (x, y) in enumerate(points, start=1)]
+    write_rows(['slot', 'x', 'y'], rows, args.format, out, header=not args.no_header)
+    return 0
+
+
+def cmd_part_geometry(args, out):
+    from models.jobs.part_geometry import part_geometry
+    rows = part_geometry(args.part_ids or None, workers=args.workers)
+    for row in rows:
+        if row.error:
+            print(f"Part {row.part_id} ({row.path}): {row.error}", file=sys.stderr)
+    headers = ['part_id', 'name', 'path', 'triangles', 'volume', 'area',
+               'min_x', 'min_y', 'min_z', 'max_x', 'max_y', 'max_z', 'cached']
+    write_rows(headers, [[getattr(row, name) for name in headers] for row in rows if not row.error],
+               args.format, out, header=not args.no_header)
+    return 1 if any(row.error for row in rows) else 0
+
+
+def cmd_powder_plan(args, out):
+    from models.builds.powder_plan import plan_powder, SUPPORT_FACTOR, OVERHEAD_FACTOR
+    support = SUPPORT_FACTOR if args.support is None else args.support
+    overhead = OVERHEAD_FACTOR if args.overhead is None else args.overhead
+    plan = plan_powder(args.build_ids or None, support_factor=support, overhead_factor=overhead, workers=args.workers)
+    headers = ['build_id', 'name', 'mat_id', 'estimated_kg', 'entered_kg', 'required_kg', 'lots',
+               'shortfall_kg', 'assigned_covers', 'parts_without_geometry']
+    rows = []
+    for build in plan.builds:
+        requirement = build.requirement
+        lots = ','.join(f'{allocation.powder_id}={allocation.kg:.3f}' for allocation in build.allocations)
+        rows.append([requirement.build_id, requirement.name, requirement.mat_id, requirement.estimated_kg,
+                     requirement.entered_kg, requirement.required_kg, lots, build.shortfall_kg,
+                     build.assigned_covers, requirement.parts_without_geometry])
+    write_rows(headers, rows, args.format, out, header=not args.no_header)
+    return 1 if any(build.shortfall_kg > 0 for build in plan.builds) else 0
+
+
+def cmd_part_files(args, out):
+    from models.jobs import part_files
+    if args.action == 'scan':
+        result = part_files.scan_part_files(workers=args.workers, rehash=args.rehash)
+        write_rows(list(result._fields), [list(result)], args.format, out, header=not args.no_header)
+        return 0
+    if args.action == 'missing':
+        rows = [(m.path, ' '.join(map(str, m.part_ids)), m.last_seen) for m in part_files.missing_files()]
+        write_rows(['path', 'part_ids', 'last_seen'], rows, args.format, out, header=not args.no_header)
+        return 1 if rows else 0
+    groups = part_files.duplicate_files()
+    rows = [(group.content_hash, group.size, path, ' '.join(map(str, group.part_ids)))
+            for group in groups for path in group.paths]
+    write_rows(['content_hash', 'size', 'path', 'part_ids'], rows, args.format, out, header=not args.no_header)
+    if args.action == 'merge':
+        print(f"Repointed {part_files.merge_duplicate_paths(groups)} parts", file=sys.stderr)
+    return 0
+
+
+def cmd_ingest_log(args, out):
+    from models.builds.build_log import ingest_log
+    try:
+        log_id = ingest_log(args.build_id, args.path, layers_per_chunk=args.layers_per_chunk)
+    except (OSError, ValueError) as e:
+        print(e, file=sys.stderr)
+        return 1
+    print(f"Build {args.build_id}: log {log_id}", file=sys.stderr)
+    return 0
+
+
+def cmd_layer_summary(args, out):
+    from models.builds.build_log import layer_summary
+    layers = layer_summary(args.build_id, args.first, args.last)
+    channels = list(layers[0].mean) if layers else []
+    headers = (['layer', 'start', 'duration', 'samples'] + [f'mean_{name}' for name in channels] +
+               [f'max_{name}' for name in channels])
+    rows = [[layer.layer, layer.start, round(layer.duration, 3), layer.samples] +
+            [layer.mean[name] for name in channels] + [layer.max[name] for name in channels]
+            for layer in layers]
+    write_rows(headers, rows, args.format, out, header=not args.no_header)
+    return 0
+
+
+def cmd_monitoring(args, out):
+    from models.builds.monitoring import build_monitoring, MonitoringReader
+    stores = build_monitoring(args.build_id)
+    if args.kind:
+        stores = {kind: path for kind, path in stores.items() if kind == args.kind}
+    if args.layer is None:
+        rows = []
+        for kind, path in stores.items():
+            with MonitoringReader(path) as reader:
+                rows.append([kind] + list(reader.info()))
+        write_rows(['kind', 'path', 'dtype', 'item_shape', 'codec', 'layers', 'first_layer', 'last_layer',
+                    'chunks', 'raw_bytes', 'stored_bytes'], rows, args.format, out, header=not args.no_header)
+        return 0
+    rows = []
+    for kind, path in stores.items():
+        with MonitoringReader(path) as reader:
+            if args.layer not in reader:
+                continue
+            values = reader.read(args.layer)
+            rows.append([kind, args.layer, 'x'.join(map(str, values.shape)), values.min(), values.max(),
+                         float(values.mean())])
+    write_rows(['kind', 'layer', 'shape', 'min', 'max', 'mean'], rows, args.format, out, header=not args.no_header)
+    return 0 if rows else 1
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='dmls', description="DMLS database lookups without the GUI")
+    parser.add_argument('--db', default=os.environ.get('DMLS_DB'),
+                        help="Path to the SQLite database (default: $DMLS_DB or dmls_powder.db)")
+    parser.add_argument('--format', choices=['tsv', 'json'], default='tsv')
+    parser.add_argument('--no-header', action='store_true', help="Omit the TSV header line")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('powder', help="Look up a single powder lot")
+    p.add_argument('powder_id')
+    p.set_defaults(func=cmd_powder)
+
+    p = sub.add_parser('lot', help="Powders of a manufacturer lot (<matID>-<manLot> or <manLot>)")
+    p.add_argument('lot')
+    p.add_argument('--total', action='store_true', help="Only print the remaining quantity (Kg)")
+    p.set_defaults(func=cmd_lot)
+
+    p = sub.add_parser('builds', help="Builds, optionally filtered by what they used")
+    p.add_argument('--setting', type=int)
+    p.add_argument('--powder')
+    p.add_argument('--plate', type=int)
+    p.add_argument('--coupon-array', dest='coupon_array', type=int)
+    p.set_defaults(func=cmd_builds)
+
+    p = sub.add_parser('jobs', help="Jobs, optionally filtered by build, work order or part list")
+    p.add_argument('--build', type=int)
+    p.add_argument('--work-order', dest='work_order', type=int)
+    p.add_argument('--part-list', dest='part_list', type=int)
+    p.set_defaults(func=cmd_jobs)
+
+    p = sub.add_parser('settings', help="Settings with a feature in an energy density window (J/mm^3)")
+    p.add_argument('--energy-min', dest='energy_min', type=float)
+    p.add_argument('--energy-max', dest='energy_max', type=float)
+    p.add_argument('--feature', help="Feature type, e.g. hatch_infill (default: any)")
+    p.set_defaults(func=cmd_settings)
+
+    p = sub.add_parser('powders', help="Powders whose summed element percentages are in a range")
+    p.add_argument('--elements', required=True, type=element_list, help="Comma separated, e.g. Fe,Cr,Ni")
+    p.add_argument('--sum-min', dest='sum_min', type=float)
+    p.add_argument('--sum-max', dest='sum_max', type=float)
+    p.set_defaults(func=cmd_powders)
+
+    p = sub.add_parser('nearest-powders', help="Powders whose composition is closest to a reference")
+    p.add_argument('reference', type=element_percentages, help="e.g. Fe=70,Cr=18,Ni=10")
+    p.add_argument('--limit', type=int, default=10)
+    p.set_defaults(func=cmd_nearest_powders)
+
+    p = sub.add_parser('lot-composition', help="Quantity-weighted mean composition of a lot's powders")
+    p.add_argument('lot', help="<matID>-<manLot>, e.g. 316L-S312328")
+    p.add_argument('--elements', required=True, type=element_list, help="Comma separated, e.g. Fe,Cr,Ni")
+    p.set_defaults(func=cmd_lot_composition)
+
+    p = sub.add_parser('trace', help="Everything a build was made from")
+    p.add_argument('build_id', type=int)
+    p.set_defaults(func=cmd_trace)
+
+    p = sub.add_parser('list', help="List an entity using its summary columns")
+    p.add_argument('entity', choices=sorted(ENTITIES))
+    p.add_argument('--limit', type=int)
+    p.set_defaults(func=cmd_list)
+
+    p = sub.add_parser('export', help="Export every column of an entity")
+    p.add_argument('entity', choices=sorted(ENTITIES))
+    p.add_argument('-o', '--output', help="Write to a file instead of stdout")
+    p.set_defaults(func=cmd_export)
+
+    p = sub.add_parser('setting-dupes', help="Settings with identical parameters (merge with --merge)")
+    p.add_argument('--near', action='store_true', help="Group nearly identical parameters too (report only)")
+    p.add_argument('--merge', action='store_true',
+                   help="Move builds onto one setting per exact group and delete the rest")
+    p.set_defaults(func=cmd_setting_dupes)
+
+    p = sub.add_parser('counters', help="Check trigger-maintained counts against a fresh count")
+    p.add_argument('--rebuild', action='store_true', help="Recompute every count if any is wrong")
+    p.set_defaults(func=cmd_counters)
+
+    p = sub.add_parser('integrity', help="References to rows that no longer exist, one query per foreign key")
+    p.add_argument('--clear', action='store_true', help="Set the nullable ones to NULL (one transaction)")
+    p.set_defaults(func=cmd_integrity)
+
+    p = sub.add_parser('clone-array', help="Copy a coupon array preset as a new array (one transaction)")
+    p.add_argument('coupon_array_id', type=int)
+    p.add_argument('--name', help="Name of the new array (default: '<source name> (copy)')")
+    p.add_argument('--copy-on-write', dest='copy_on_write', action='store_true',
+                   help="Share the preset's coupons until a slot is edited (presets only)")
+    p.set_defaults(func=cmd_clone_array)
+
+    p = sub.add_parser('coupon-overlaps', help="Coupon pairs closer than a clearance (R-tree join)")
+    p.add_argument('clearance', type=float, help="Minimum centre-to-centre spacing in the XY plane (mm)")
+    p.add_argument('--coupon-array', dest='coupon_array', type=int)
+    p.add_argument('--build', type=int)
+    p.set_defaults(func=cmd_coupon_overlaps)
+
+    p = sub.add_parser('layout', help="Generate a grid/hex/staggered coupon layout (and save it with --name)")
+    p.add_argument('pattern', choices=['grid', 'hex', 'staggered'])
+    p.add_argument('--width', type=float, required=True, help="Plate envelope along X (mm)")
+    p.add_argument('--depth', type=float, required=True, help="Plate envelope along Y (mm)")
+    p.add_argument('--spacing', type=float, required=True, help="Centre-to-centre spacing along X (mm)")
+    p.add_argument('--spacing-y', dest='spacing_y', type=float, help="Row spacing (default: --spacing)")
+    p.add_argument('--margin', type=float, default=0.0, help="Keep-out band along the plate edges (mm)")
+    p.add_argument('--angle', type=float, default=0.0, help="Rotate the pattern about the plate centre (degrees)")
+    p.add_argument('--limit', type=int, default=256, help="Use at most this many positions (default: 256)")
+    p.add_argument('--clearance', type=float, help="Report (and refuse to save) pairs closer than this (mm)")
+    p.add_argument('--name', help="Create a coupon array with this name from the layout")
+    p.add_argument('--z', type=float, default=0.0, help="Z position of the new coupons")
+    p.add_argument('--direction', default='Z', choices=['X', 'Y', 'Z', 'XY', 'YZ', 'ZX', 'OTHER'])
+    p.add_argument('--preset', action='store_true', help="Save the array and its coupons as presets")
+    p.set_defaults(func=cmd_layout)
+
+    p = sub.add_parser('part-geometry', help="Volume, surface area and bounding box of parts' STL files (cached)")
+    p.add_argument('part_ids', nargs='*', type=int, help="Parts to measure (default: all with a file)")
+    p.add_argument('--workers', type=int, help="Processes measuring files (default: one per CPU)")
+    p.set_defaults(func=cmd_part_geometry)
+
+    p = sub.add_parser('powder-plan', help="Estimate powder for pending builds and allocate lots to them")
+    p.add_argument('build_ids', nargs='*', type=int, help="Builds to plan (default: not yet loaded)")
+    p.add_argument('--support', type=float, help="Support mass as a fraction of part mass (default 0.15)")
+    p.add_argument('--overhead', type=float, help="Powder fed per kg melted (default 1.5)")
+    p.add_argument('--workers', type=int, help="Processes measuring STL files (default: one per CPU)")
+    p.set_defaults(func=cmd_powder_plan)
+
+    p = sub.add_parser('part-files', help="Catalog of part files: scan, duplicates by content, missing files")
+    p.add_argument('action', choices=['scan', 'dupes', 'merge', 'missing'],
+                   help="scan: update the catalog; merge: point duplicate paths' parts at one path")
+    p.add_argument('--workers', type=int, default=16, help="Threads stat-ing and hashing files")
+    p.add_argument('--rehash', action='store_true', help="Hash every file, not only new and changed ones")
+    p.set_defaults(func=cmd_part_files)
+
+    p = sub.add_parser('ingest-log', help="Store a machine log (CSV with layer and time columns) for a build")
+    p.add_argument('build_id', type=int)
+    p.add_argument('path')
+    p.add_argument('--layers-per-chunk', type=int, default=50)
+    p.set_defaults(func=cmd_ingest_log)
+
+    p = sub.add_parser('layer-summary', help="Per-layer duration and channel mean/max from a build's machine logs")
+    p.add_argument('build_id', type=int)
+    p.add_argument('--first', type=int, help="First layer (inclusive)")
+    p.add_argument('--last', type=int, help="Last layer (inclusive)")
+    p.set_defaults(func=cmd_layer_summary)
+
+    p = sub.add_parser('monitoring', help="A build's monitoring stores, or statistics of one layer in them")
+    p.add_argument('build_id', type=int)
+    p.add_argument('kind', nargs='?', help="Store kind, e.g. meltpool or layer_image (default: all)")
+    p.add_argument('--layer', type=int)
+    p.set_defaults(func=cmd_monitoring)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.db:
+        database.init(args.db)
+    init_database()
+    try:
+        return args.func(args, sys.stdout)
+    except BrokenPipeError:
+        return 0
+    finally:
+        database.close()
@@ -0,0 +1,87 @@
+"""
+Qt side of the change bus
+
+ChangeNotifier forwards database.change_bus events onto the main thread and
+emits them in short batches through its `changes` signal; it also polls
+PRAGMA data_version so commits from other processes show up too.
+"""
+
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal, pyqtSlot
+
+from database.change_bus import change_bus, EXTERNAL
+
+# Events are gathered for a moment so one burst of writes causes one refresh
+BATCH_DELAY_MS = 50
+POLL_INTERVAL_MS = 1000
+
+
+class ChangeNotifier(QObject):
+    changes = pyqtSignal(list)
+    _relay = pyqtSignal(list)
+
+    def __init__(self, bus=change_bus, parent=None):
+        super().__init__(parent)
+        self.bus = bus
+        self._buffer = []
+        self._flush_timer = QTimer(self)
+        self._flush_timer.setSingleShot(True)
+        self._flush_timer.setInterval(BATCH_DELAY_MS)
+        self._flush_timer.timeout.connect(self._flush)
+        self._poll_timer = QTimer(self)
+        self._poll_timer.setInterval(POLL_INTERVAL_MS)
+        self._poll_timer.timeout.connect(self.bus.poll)
+        # The bus calls back on the committing thread; the signal hops to ours
+        self._relay.connect(self._collect)
+        self.bus.install()
+        self.bus.subscribe(self._relay.emit)
+        self.bus.poll()
+        self._poll_timer.start()
+
+    @pyqtSlot(list)
+    def _collect(self, events):
+        self._buffer.extend(events)
+        if not self._flush_timer.isActive():
+            self._flush_timer.start()
+
+    def _flush(self):
+        events, self._buffer = self._buffer, []
+        if events:
+            self.changes.emit(events)
+
+
+class _DeletionWatcher(QObject):
+    """Marks a detail window as deleted once its record disappears"""
+    def __init__(self, window, model_cls, pk):
+        super().__init__(window)
+        self.window = window
+        self.model_cls = model_cls
+        self.pk = pk
+        get_change_notifier().changes.connect(self.on_changes)
+
+    @pyqtSlot(list)
+    def on_changes(self, events):
+        table = self.model_cls._meta.table_name
+        if not any(e.table == table or e.op == EXTERNAL for e in events):
+            return
+        if self.model_cls.select().where(self.model_cls._meta.primary_key == self.pk).exists():
+            return
+        get_change_notifier().changes.disconnect(self.on_changes)
+        central = self.window.centralWidget()
+        if central is not None:
+            central.setEnabled(False)
+        self.window.setWindowTitle(f"{self.window.windowTitle()} (deleted)")
+
+
+def watch_for_deletion(window, model_cls, pk):
+    """Grey out window when the record it shows is deleted anywhere"""
+    return _DeletionWatcher(window, model_cls, pk)
+
+
+_change_notifier = None
+
+
+def get_change_notifier():
+    global _change_notifier
+    if _change_notifier is None:
+        _change_notifier = ChangeNotifier()
+    return _change_notifier
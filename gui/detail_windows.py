@@ -6,21 +6,64 @@ Detailed view windows for database entities
 from PyQt6.QtWidgets import (QMainWindow, QTableWidget, QTableWidgetItem, 
                              QVBoxLayout, QHBoxLayout, QWidget, QPushButton, 
                              QLabel, QScrollArea, QFrame, QGridLayout, QTabWidget,
-                             QMessageBox)
+                             QMessageBox, QComboBox, QInputDialog)
 from PyQt6.QtCore import Qt
 from models.powders.powder import Powder
-from models.powders.powder_composition import PowderComposition
-from models.powders.powder_results import PowderResults
-from models.settings.setting import Setting
-from models.settings.feature_settings import (
-    HatchUpSkin, HatchInfill, HatchDownSkin, ContourOnPart, 
-    ContourStandard, ContourDown, Edge, Core, Support
-)
+from models.powders.powder_composition import ELEMENTS
+from models.powders.loader import load_powder_detail, present_elements
+from models.settings.setting import Setting, FEATURE_TYPES
 from models.coupons.coupon_array import CouponArray
 from models.coupons.coupon import Coupon
 from models.coupons.coupon_composition import CouponComposition
+from models.coupons.preset_clone import clone_coupon_array, shared_slots, private_slot, update_slot
+from models.coupons.loader import load_array_coupons
 from models.jobs.work_order import WorkOrder
 from models.jobs.job import Job
+from models.jobs.part_resolver import resolve_parts
+from gui.write_queue import get_write_queue
+from gui.change_notifier import watch_for_deletion
+from gui.window_registry import get_window_registry
+from gui.plate_view import PlateLayoutView
+
+
+# Setting table row label -> feature setting field
+PARAMETER_FIELDS = {
+    "Power": "power",
+    "Scan Speed": "scan_speed",
+    "Layer Thickness": "layer_thick",
+    "Hatch Distance": "hatch_dist",
+}
+
+# Powder results table rows: (label, PowderResults field)
+RESULT_FIELDS = [
+    ("Water Content", "water_content"),
+    ("Skeletal Density", "skeletal_density"),
+    ("Sphericity", "sphericity"),
+    ("Symmetry", "symmetry"),
+    ("Aspect Ratio", "aspect_ratio"),
+    ("D10", "d10"),
+    ("D50", "d50"),
+    ("D90", "d90"),
+    ("XCMin10", "xcmin10"),
+    ("XCMin50", "xcmin50"),
+    ("XCMin90", "xcmin90"),
+    ("% Weight > 53", "perc_wt_gt_53"),
+    ("% Weight > 63", "perc_wt_gt_63"),
+    ("Apparent Density", "apparent_dens"),
+]
+
+
+def _current_part_slot(part_list, table, row):
+    """1-based part_list slot shown on a parts table row, read from the list as it is now
+
+    Deleting part_1 shifts every part up a slot, so a slot captured when the
+    table was built goes stale; the row's part id (and how many rows above
+    it show the same part) finds it again.
+    """
+    part_id = table.item(row, 0).text()
+    occurrence = sum(1 for above in range(row) if table.item(above, 0).text() == part_id)
+    slots = [slot for slot in range(1, 129) if str(getattr(part_list, f'part_{slot}_id')) == part_id]
+    return slots[occurrence]
 
 
 class DetailTableWidget(QTableWidget):
@@ -57,6 +100,9 @@ class PowderDetailWindow(QMainWindow):
         self.edit_mode = edit_mode
         self.setWindowTitle(f"Powder Details - {powder_id}")
         self.setGeometry(200, 200, 1000, 600)
+        watch_for_deletion(self, Powder, powder_id)
+        # Powder, composition and results in one query; the tabs and the delete button all use this
+        self.detail = load_powder_detail(powder_id)
         self._setup_ui()
     
     def _setup_ui(self):
@@ -66,15 +112,15 @@ class PowderDetailWindow(QMainWindow):
         layout = QVBoxLayout(central_widget)
         
         # Restore parent table info (header and subheader)
-        try:
-            powder = Powder.get(Powder.id == self.powder_id)
+        if self.detail is not None:
+            powder = self.detail.powder
             header_label = QLabel(f"Powder: {powder.id}")
             header_label.setStyleSheet("font-size: 18px; font-weight: bold; margin: 10px;")
             layout.addWidget(header_label)
             desc_label = QLabel(f"Description: {powder.description}")
             desc_label.setStyleSheet("font-size: 14px; margin: 5px 10px 15px 10px;")
             layout.addWidget(desc_label)
-        except Exception:
+        else:
             header_label = QLabel(f"Powder: {self.powder_id}")
             header_label.setStyleSheet("font-size: 18px; font-weight: bold; margin: 10px; color: #a00;")
             layout.addWidget(header_label)
@@ -103,6 +149,21 @@ class PowderDetailWindow(QMainWindow):
         # Always call the callback with the current index on initial load
         self._update_delete_button(self.tab_widget.currentIndex())
 
+    def reload(self):
+        """Re-read the powder (one query) and rebuild both tabs"""
+        self.detail = load_powder_detail(self.powder_id)
+        current = self.tab_widget.currentIndex()
+        self.tab_widget.blockSignals(True)
+        while self.tab_widget.count():
+            widget = self.tab_widget.widget(0)
+            self.tab_widget.removeTab(0)
+            widget.deleteLater()
+        self.create_composition_tab(self.tab_widget)
+        self.create_results_tab(self.tab_widget)
+        self.tab_widget.setCurrentIndex(max(current, 0))
+        self.tab_widget.blockSignals(False)
+        self._update_delete_button(self.tab_widget.currentIndex())
+
     def _update_delete_button(self, tab_index):
         """Update delete button based on currently selected tab"""
         print(f"[DEBUG] _update_delete_button called with tab_index={tab_index}, tab_count={self.tab_widget.count()}, edit_mode={self.edit_mode}")
@@ -120,23 +181,13 @@ class PowderDetailWindow(QMainWindow):
             print("[DEBUG] Setting Delete Composition button.")
             self.delete_btn.setText("Delete Composition")
             self.delete_btn.setToolTip("Delete the entire composition record")
-            try:
-                powder = Powder.get(Powder.id == self.powder_id)
-                PowderComposition.get(PowderComposition.powder == powder)
-                data_exists = True
-            except Exception:
-                data_exists = False
+            data_exists = self.detail is not None and self.detail.composition is not None
             self.delete_btn.clicked.connect(self._delete_composition)
         elif tab_index == 1:  # Results tab
             print("[DEBUG] Setting Delete Results button.")
             self.delete_btn.setText("Delete Results")
             self.delete_btn.setToolTip("Delete the entire results record")
-            try:
-                powder = Powder.get(Powder.id == self.powder_id)
-                PowderResults.get(PowderResults.powder == powder)
-                data_exists = True
-            except Exception:
-                data_exists = False
+            data_exists = self.detail is not None and self.detail.results is not None
             self.delete_btn.clicked.connect(self._delete_results)
         else:
             print("[DEBUG] Setting disabled placeholder button.")
@@ -146,247 +197,158 @@ class PowderDetailWindow(QMainWindow):
         self.delete_btn.setEnabled(data_exists)
         print(f"[DEBUG] Delete button updated for tab_index={tab_index}, data_exists={data_exists}")
     
+    def _confirm_record_delete(self, record, record_name):
+        from main import find_non_nullable_dependencies
+        dependencies = find_non_nullable_dependencies(type(record), record.get_id())
+        msg = QMessageBox(self)
+        msg.setIcon(QMessageBox.Icon.Warning)
+        msg.setWindowTitle("Confirm Delete")
+        warn_text = f"Are you sure you want to delete this {record_name} record?"
+        if dependencies:
+            warn_text += "\n\nWarning: This item is referenced by the following (deletion will break these references):\n"
+            for dep in dependencies:
+                warn_text += f"- {dep}\n"
+        msg.setText(warn_text)
+        msg.setStandardButtons(QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
+        msg.setDefaultButton(QMessageBox.StandardButton.No)
+        msg.setStyleSheet("QLabel{min-width:250px; font-size:14px;} QPushButton{min-width:60px;}")
+        return msg.exec() == QMessageBox.StandardButton.Yes
+
+    def _reload_after_delete(self, record_name):
+        """on_done for a queued delete: reload the tabs and the delete button, warning if it failed"""
+        def on_done(success):
+            if not success:
+                QMessageBox.warning(self, "Delete Failed", f"Could not delete the {record_name} record.")
+            self.reload()
+        return on_done
+
     def _delete_composition(self):
         """Delete composition record"""
         try:
-            powder = Powder.get(Powder.id == self.powder_id)
-            composition = PowderComposition.get(PowderComposition.powder == powder)
-            from main import find_non_nullable_dependencies
-            pk = composition.powder.id
-            dependencies = find_non_nullable_dependencies(type(composition), pk)
-            msg = QMessageBox(self)
-            msg.setIcon(QMessageBox.Icon.Warning)
-            msg.setWindowTitle("Confirm Delete")
-            warn_text = "Are you sure you want to delete this composition record?"
-            if dependencies:
-                warn_text += "\n\nWarning: This item is referenced by the following (deletion will break these references):\n"
-                for dep in dependencies:
-                    warn_text += f"- {dep}\n"
-            msg.setText(warn_text)
-            msg.setStandardButtons(QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
-            msg.setDefaultButton(QMessageBox.StandardButton.No)
-            msg.setStyleSheet("QLabel{min-width:250px; font-size:14px;} QPushButton{min-width:60px;}")
-            reply = msg.exec()
-            if reply == QMessageBox.StandardButton.Yes:
-                composition.delete_instance()
-                # Reload the composition tab and update the delete button
-                self.tab_widget.removeTab(0)
-                self.create_composition_tab(self.tab_widget)
-                self._update_delete_button(self.tab_widget.currentIndex())
+            composition = self.detail.composition if self.detail else None
+            if composition is not None and self._confirm_record_delete(composition, "composition"):
+                # Reload the tabs and the delete button once the delete is committed
+                get_write_queue().delete_instance(composition, on_done=self._reload_after_delete("composition"))
         except Exception as e:
             print(f"Error deleting composition: {e}")
     
     def _delete_results(self):
         """Delete results record"""
         try:
-            powder = Powder.get(Powder.id == self.powder_id)
-            results = PowderResults.get(PowderResults.powder == powder)
-            from main import find_non_nullable_dependencies
-            pk = results.powder.id
-            dependencies = find_non_nullable_dependencies(type(results), pk)
-            msg = QMessageBox(self)
-            msg.setIcon(QMessageBox.Icon.Warning)
-            msg.setWindowTitle("Confirm Delete")
-            warn_text = "Are you sure you want to delete this results record?"
-            if dependencies:
-                warn_text += "\n\nWarning: This item is referenced by the following (deletion will break these references):\n"
-                for dep in dependencies:
-                    warn_text += f"- {dep}\n"
-            msg.setText(warn_text)
-            msg.setStandardButtons(QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
-            msg.setDefaultButton(QMessageBox.StandardButton.No)
-            msg.setStyleSheet("QLabel{min-width:250px; font-size:14px;} QPushButton{min-width:60px;}")
-            reply = msg.exec()
-            if reply == QMessageBox.StandardButton.Yes:
-                results.delete_instance()
-                # Reload the results tab and update the delete button
-                self.tab_widget.removeTab(1)
-                self.create_results_tab(self.tab_widget)
-                self._update_delete_button(self.tab_widget.currentIndex())
+            results = self.detail.results if self.detail else None
+            if results is not None and self._confirm_record_delete(results, "results"):
+                get_write_queue().delete_instance(results, on_done=self._reload_after_delete("results"))
         except Exception as e:
             print(f"Error deleting results: {e}")
     
+    def _confirm_value_delete(self, label):
+        msg = QMessageBox(self)
+        msg.setIcon(QMessageBox.Icon.Warning)
+        msg.setWindowTitle("Confirm Delete")
+        msg.setText(f"Are you sure you want to delete the value for {label}?")
+        msg.setStandardButtons(QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
+        msg.setDefaultButton(QMessageBox.StandardButton.No)
+        msg.setStyleSheet("QLabel{min-width:250px; font-size:14px;} QPushButton{min-width:60px;}")
+        return msg.exec() == QMessageBox.StandardButton.Yes
+
+    def _fill_value_table(self, table, record, rows, value_header):
+        """rows: (label, field name) pairs; values are read from record and saved back to it"""
+        headers = [table.property("label_header"), value_header] + (["Delete"] if self.edit_mode else [])
+        table.setColumnCount(len(headers))
+        table.setHorizontalHeaderLabels(headers)
+        table.setRowCount(0)
+        for label, field in rows:
+            self._append_value_row(table, record, label, field)
+        if self.edit_mode:
+            def on_cell_changed(row, col):
+                if col == 1:
+                    field = table.item(row, 0).data(Qt.ItemDataRole.UserRole)
+                    new_value = table.item(row, 1).text()
+                    try:
+                        float_val = float(new_value) if new_value else None
+                    except Exception:
+                        float_val = None
+                    get_write_queue().save_fields(record, **{field: float_val})
+            table.cellChanged.connect(on_cell_changed)
+
+    def _append_value_row(self, table, record, label, field):
+        table.blockSignals(True)
+        row = table.rowCount()
+        table.insertRow(row)
+        field_item = QTableWidgetItem(label)
+        field_item.setData(Qt.ItemDataRole.UserRole, field)
+        field_item.setFlags(field_item.flags() & ~Qt.ItemFlag.ItemIsEditable)
+        table.setItem(row, 0, field_item)
+        value = getattr(record, field)
+        value_item = QTableWidgetItem(str(value) if value is not None else "")
+        if self.edit_mode:
+            value_item.setFlags(value_item.flags() | Qt.ItemFlag.ItemIsEditable)
+        else:
+            value_item.setFlags(value_item.flags() & ~Qt.ItemFlag.ItemIsEditable)
+        table.setItem(row, 1, value_item)
+        if self.edit_mode:
+            delete_btn = QPushButton()
+            delete_btn.setText("🗑️")
+            delete_btn.setStyleSheet("color: #c00; font-size: 16px; font-weight: bold;")
+            delete_btn.setToolTip(f"Delete value for {label}")
+            def delete_field():
+                if self._confirm_value_delete(label):
+                    get_write_queue().save_fields(record, **{field: None})
+                    table.setItem(table.row(field_item), 1, QTableWidgetItem(""))
+            delete_btn.clicked.connect(delete_field)
+            table.setCellWidget(row, 2, delete_btn)
+        table.blockSignals(False)
+
+    def _no_data_table(self, table, label_header, value_header):
+        table.setColumnCount(2)
+        table.setHorizontalHeaderLabels([label_header, value_header])
+        table.setRowCount(1)
+        table.setItem(0, 0, QTableWidgetItem("No data"))
+        table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+
     def create_composition_tab(self, tab_widget):
-        """Create tab for powder composition"""
+        """Create tab for powder composition; only elements with a value are listed"""
+        container = QWidget()
+        layout = QVBoxLayout(container)
+        layout.setContentsMargins(0, 0, 0, 0)
         table = QTableWidget()
-        tab_widget.addTab(table, "Composition")
-        try:
-            powder = Powder.get(Powder.id == self.powder_id)
-            try:
-                composition = PowderComposition.get(PowderComposition.powder == powder)
-                headers = ["Element", "Value (%)"]
-                data = [
-                    ["Fe", composition.Fe],
-                    ["Cr", composition.Cr],
-                    ["Ni", composition.Ni],
-                    ["Mo", composition.Mo],
-                    ["C", composition.C],
-                    ["Mn", composition.Mn],
-                    ["Si", composition.Si]
-                ]
-                if self.edit_mode:
-                    table.setColumnCount(3)
-                    table.setHorizontalHeaderLabels(["Element", "Value (%)", "Delete"])
-                else:
-                    table.setColumnCount(2)
-                    table.setHorizontalHeaderLabels(headers)
-                table.setRowCount(len(data))
-                for i, (field, value) in enumerate(data):
-                    field_item = QTableWidgetItem(field)
-                    field_item.setFlags(field_item.flags() & ~Qt.ItemFlag.ItemIsEditable)
-                    table.setItem(i, 0, field_item)
-                    value_item = QTableWidgetItem(str(value) if value is not None else "")
-                    if self.edit_mode:
-                        value_item.setFlags(value_item.flags() | Qt.ItemFlag.ItemIsEditable)
-                    else:
-                        value_item.setFlags(value_item.flags() & ~Qt.ItemFlag.ItemIsEditable)
-                    table.setItem(i, 1, value_item)
-                    if self.edit_mode:
-                        delete_btn = QPushButton()
-                        delete_btn.setText("🗑️")
-                        delete_btn.setStyleSheet("color: #c00; font-size: 16px; font-weight: bold;")
-                        delete_btn.setToolTip(f"Delete value for {field}")
-                        def make_delete_func(field_name, row_idx):
-                            def delete_field():
-                                from main import find_non_nullable_dependencies
-                                msg = QMessageBox(self)
-                                msg.setIcon(QMessageBox.Icon.Warning)
-                                msg.setWindowTitle("Confirm Delete")
-                                msg.setText(f"Are you sure you want to delete the value for {field_name}?")
-                                msg.setStandardButtons(QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
-                                msg.setDefaultButton(QMessageBox.StandardButton.No)
-                                msg.setStyleSheet("QLabel{min-width:250px; font-size:14px;} QPushButton{min-width:60px;}")
-                                reply = msg.exec()
-                                if reply == QMessageBox.StandardButton.Yes:
-                                    setattr(composition, field_name, None)
-                                    composition.save()
-                                    table.setItem(row_idx, 1, QTableWidgetItem(""))
-                            return delete_field
-                        delete_btn.clicked.connect(make_delete_func(field, i))
-                        table.setCellWidget(i, 2, delete_btn)
-                if self.edit_mode:
-                    def on_cell_changed(row, col):
-                        if col == 1:
-                            field = table.item(row, 0).text()
-                            new_value = table.item(row, 1).text()
-                            try:
-                                float_val = float(new_value) if new_value else None
-                            except Exception:
-                                float_val = None
-                            setattr(composition, field, float_val)
-                            composition.save()
-                    table.cellChanged.connect(on_cell_changed)
-                # Tab-level delete button
-                # This logic is now handled by _update_delete_button
-            except PowderComposition.DoesNotExist:
-                headers = ["Element", "Value (%)"]
-                table.setColumnCount(2)
-                table.setHorizontalHeaderLabels(headers)
-                table.setRowCount(7)
-                for i, field in enumerate(["Fe", "Cr", "Ni", "Mo", "C", "Mn", "Si"]):
-                    field_item = QTableWidgetItem(field)
-                    field_item.setFlags(field_item.flags() & ~Qt.ItemFlag.ItemIsEditable)
-                    table.setItem(i, 0, field_item)
-                    table.setItem(i, 1, QTableWidgetItem("No data"))
-                table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
-        except Exception as e:
-            print(f"Error loading powder composition: {e}")
-            # Don't print full traceback for missing data - this is expected
+        table.setProperty("label_header", "Element")
+        tab_widget.addTab(container, "Composition")
+        composition = self.detail.composition if self.detail else None
+        if composition is None:
+            layout.addWidget(table)
+            self._no_data_table(table, "Element", "Value (%)")
+            return
+        present = present_elements(self.detail.element_bits)
+        if self.edit_mode:
+            # Elements without a value are offered here instead of as empty rows
+            add_combo = QComboBox()
+            add_combo.addItem("Add element...")
+            add_combo.addItems([element for element in ELEMENTS if element not in present])
+            def add_element(index):
+                if index <= 0:
+                    return
+                element = add_combo.itemText(index)
+                add_combo.removeItem(index)
+                add_combo.setCurrentIndex(0)
+                self._append_value_row(table, composition, element, element)
+                table.editItem(table.item(table.rowCount() - 1, 1))
+            add_combo.currentIndexChanged.connect(add_element)
+            layout.addWidget(add_combo)
+        layout.addWidget(table)
+        self._fill_value_table(table, composition, [(element, element) for element in present], "Value (%)")
+        table.resizeColumnsToContents()
 
     def create_results_tab(self, tab_widget):
         """Create tab for powder results"""
         table = QTableWidget()
+        table.setProperty("label_header", "Property")
         tab_widget.addTab(table, "Results")
-        try:
-            powder = Powder.get(Powder.id == self.powder_id)
-            try:
-                results = PowderResults.get(PowderResults.powder == powder)
-                headers = ["Property", "Value"]
-                data = [
-                    ["Water Content", results.water_content],
-                    ["Skeletal Density", results.skeletal_density],
-                    ["Sphericity", results.sphericity],
-                    ["Symmetry", results.symmetry],
-                    ["Aspect Ratio", results.aspect_ratio],
-                    ["D10", results.d10],
-                    ["D50", results.d50],
-                    ["D90", results.d90],
-                    ["XCMin10", results.xcmin10],
-                    ["XCMin50", results.xcmin50],
-                    ["XCMin90", results.xcmin90],
-                    ["% Weight > 53", results.perc_wt_gt_53],
-                    ["% Weight > 63", results.perc_wt_gt_63],
-                    ["Apparent Density", results.apparent_dens]
-                ]
-                if self.edit_mode:
-                    table.setColumnCount(3)
-                    table.setHorizontalHeaderLabels(["Property", "Value", "Delete"])
-                else:
-                    table.setColumnCount(2)
-                    table.setHorizontalHeaderLabels(headers)
-                table.setRowCount(len(data))
-                for i, (field, value) in enumerate(data):
-                    field_item = QTableWidgetItem(field)
-                    field_item.setFlags(field_item.flags() & ~Qt.ItemFlag.ItemIsEditable)
-                    table.setItem(i, 0, field_item)
-                    value_item = QTableWidgetItem(str(value) if value is not None else "")
-                    if self.edit_mode:
-                        value_item.setFlags(value_item.flags() | Qt.ItemFlag.ItemIsEditable)
-                    else:
-                        value_item.setFlags(value_item.flags() & ~Qt.ItemFlag.ItemIsEditable)
-                    table.setItem(i, 1, value_item)
-                    if self.edit_mode:
-                        delete_btn = QPushButton()
-                        delete_btn.setText("🗑️")
-                        delete_btn.setStyleSheet("color: #c00; font-size: 16px; font-weight: bold;")
-                        delete_btn.setToolTip(f"Delete value for {field}")
-                        def make_delete_func(field_name, row_idx):
-                            def delete_field():
-                                from main import find_non_nullable_dependencies
-                                msg = QMessageBox(self)
-                                msg.setIcon(QMessageBox.Icon.Warning)
-                                msg.setWindowTitle("Confirm Delete")
-                                msg.setText(f"Are you sure you want to delete the value for {field_name}?")
-                                msg.setStandardButtons(QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
-                                msg.setDefaultButton(QMessageBox.StandardButton.No)
-                                msg.setStyleSheet("QLabel{min-width:250px; font-size:14px;} QPushButton{min-width:60px;}")
-                                reply = msg.exec()
-                                if reply == QMessageBox.StandardButton.Yes:
-                                    setattr(results, field_name.lower().replace(' ', '_').replace('%', 'perc').replace('>', 'gt').replace('.', '').replace('(', '').replace(')', ''), None)
-                                    results.save()
-                                    table.setItem(row_idx, 1, QTableWidgetItem(""))
-                            return delete_field
-                        delete_btn.clicked.connect(make_delete_func(field, i))
-                        table.setCellWidget(i, 2, delete_btn)
-                if self.edit_mode:
-                    def on_cell_changed(row, col):
-                        if col == 1:
-                            field = table.item(row, 0).text()
-                            new_value = table.item(row, 1).text()
-                            try:
-                                float_val = float(new_value) if new_value else None
-                            except Exception:
-                                float_val = None
-                            setattr(results, field.lower().replace(' ', '_').replace('%', 'perc').replace('>', 'gt').replace('.', '').replace('(', '').replace(')', ''), float_val)
-                            results.save()
-                    table.cellChanged.connect(on_cell_changed)
-                # Tab-level delete button
-                # This logic is now handled by _update_delete_button
-            except PowderResults.DoesNotExist:
-                headers = ["Property", "Value"]
-                table.setColumnCount(2)
-                table.setHorizontalHeaderLabels(headers)
-                table.setRowCount(14)
-                for i, field in enumerate([
-                    "Water Content", "Skeletal Density", "Sphericity", "Symmetry", "Aspect Ratio", "D10", "D50", "D90", "XCMin10", "XCMin50", "XCMin90", "% Weight > 53", "% Weight > 63", "Apparent Density"]):
-                    field_item = QTableWidgetItem(field)
-                    field_item.setFlags(field_item.flags() & ~Qt.ItemFlag.ItemIsEditable)
-                    table.setItem(i, 0, field_item)
-                    table.setItem(i, 1, QTableWidgetItem("No data"))
-                table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
-        except Exception as e:
-            print(f"Error loading powder results: {e}")
-            # Don't print full traceback for missing data - this is expected
+        results = self.detail.results if self.detail else None
+        if results is None:
+            self._no_data_table(table, "Property", "Value")
+            return
+        self._fill_value_table(table, results, RESULT_FIELDS, "Value")
 
 
 class SettingDetailWindow(QMainWindow):
@@ -397,6 +359,7 @@ class SettingDetailWindow(QMainWindow):
         self.edit_mode = edit_mode
         self.setWindowTitle(f"Setting Details - ID: {setting_id}")
         self.setGeometry(200, 200, 1200, 600)
+        watch_for_deletion(self, Setting, setting_id)
         central_widget = QWidget()
         self.setCentralWidget(central_widget)
         layout = QVBoxLayout(central_widget)
@@ -450,20 +413,15 @@ class SettingDetailWindow(QMainWindow):
                     msg.setStyleSheet("QLabel{min-width:250px; font-size:14px;} QPushButton{min-width:60px;}")
                     reply = msg.exec()
                     if reply == QMessageBox.StandardButton.Yes:
-                        setting.delete_instance()
+                        get_write_queue().delete_instance(setting)
                         self.close()
                 self.delete_setting_btn.clicked.connect(confirm_delete)
             parameters = ["Power", "Scan Speed", "Layer Thickness", "Hatch Distance"]
+            # All nine feature rows come from one query
+            feature_map = setting.feature_map()
             features = [
-                ("Hatch Up Skin", setting.hatch_up_skin),
-                ("Hatch Infill", setting.hatch_infill),
-                ("Hatch Down Skin", setting.hatch_down_skin),
-                ("Contour On Part", setting.contour_on_part),
-                ("Contour Standard", setting.contour_standard),
-                ("Contour Down", setting.contour_down),
-                ("Edge", setting.edge),
-                ("Core", setting.core),
-                ("Support", setting.support)
+                (feature_type.replace('_', ' ').title(), feature_map.get(feature_type))
+                for feature_type in FEATURE_TYPES
             ]
             headers = ["Parameter"] + [feature_name for feature_name, _ in features if _ is not None]
             table_headers = headers + (["Delete"] if self.edit_mode else [])
@@ -513,15 +471,7 @@ class SettingDetailWindow(QMainWindow):
                             if reply == QMessageBox.StandardButton.Yes:
                                 for col, (feature_name, feature_setting) in enumerate(features):
                                     if feature_setting is not None:
-                                        if param_name == "Power":
-                                            feature_setting.power = None
-                                        elif param_name == "Scan Speed":
-                                            feature_setting.scan_speed = None
-                                        elif param_name == "Layer Thickness":
-                                            feature_setting.layer_thick = None
-                                        elif param_name == "Hatch Distance":
-                                            feature_setting.hatch_dist = None
-                                        feature_setting.save()
+                                        get_write_queue().save_fields(feature_setting, **{PARAMETER_FIELDS[param_name]: None})
                                         table.setItem(row_idx, col + 1, QTableWidgetItem(""))
                         return delete_param
                     delete_btn.clicked.connect(make_delete_func(row, param))
@@ -538,15 +488,7 @@ class SettingDetailWindow(QMainWindow):
                         float_val = float(new_value) if new_value else None
                     except Exception:
                         float_val = None
-                    if param == "Power":
-                        feature_setting.power = float_val
-                    elif param == "Scan Speed":
-                        feature_setting.scan_speed = float_val
-                    elif param == "Layer Thickness":
-                        feature_setting.layer_thick = float_val
-                    elif param == "Hatch Distance":
-                        feature_setting.hatch_dist = float_val
-                    feature_setting.save()
+                    get_write_queue().save_fields(feature_setting, **{PARAMETER_FIELDS[param]: float_val})
                 table.cellChanged.connect(on_cell_changed)
             table.resizeColumnsToContents()
         except Exception as e:
@@ -607,8 +549,7 @@ class CouponDetailWindow(QMainWindow):
                             msg.setStyleSheet("QLabel{min-width:250px; font-size:14px;} QPushButton{min-width:60px;}")
                             reply = msg.exec()
                             if reply == QMessageBox.StandardButton.Yes:
-                                setattr(composition, field_name, None)
-                                composition.save()
+                                get_write_queue().save_fields(composition, **{field_name: None})
                                 comp_table.setItem(row_idx, 1, QTableWidgetItem(""))
                         return delete_field
                     delete_btn.clicked.connect(make_delete_func(field, i))
@@ -622,8 +563,7 @@ class CouponDetailWindow(QMainWindow):
                             float_val = float(new_value) if new_value else None
                         except Exception:
                             float_val = None
-                        setattr(composition, field, float_val)
-                        composition.save()
+                        get_write_queue().save_fields(composition, **{field: float_val})
                 comp_table.cellChanged.connect(on_cell_changed)
             # Full-table delete button
             if self.edit_mode:
@@ -648,7 +588,7 @@ class CouponDetailWindow(QMainWindow):
                     msg.setStyleSheet("QLabel{min-width:250px; font-size:14px;} QPushButton{min-width:60px;}")
                     reply = msg.exec()
                     if reply == QMessageBox.StandardButton.Yes:
-                        composition.delete_instance()
+                        get_write_queue().delete_instance(composition)
                         comp_table.setRowCount(0)
                         comp_table.setColumnCount(0)
                 delete_btn.clicked.connect(confirm_delete)
@@ -671,7 +611,7 @@ class CouponArrayDetailWindow(QMainWindow):
         self.edit_mode = edit_mode
         self.setWindowTitle(f"Coupon Array Details - ID: {coupon_array_id}")
         self.setGeometry(200, 200, 1600, 800)
-        self.detail_windows = []
+        watch_for_deletion(self, CouponArray, coupon_array_id)
         central_widget = QWidget()
         self.setCentralWidget(central_widget)
         layout = QVBoxLayout(central_widget)
@@ -695,6 +635,25 @@ class CouponArrayDetailWindow(QMainWindow):
             desc_label = QLabel(f"Description: {coupon_array.description}")
             desc_label.setStyleSheet("margin: 5px;")
             layout.addWidget(desc_label)
+            shared = set(shared_slots(coupon_array))
+            self.shared_slots = shared
+            if shared:
+                shared_label = QLabel(f"{len(shared)} slot{'s' if len(shared) != 1 else ''} still use the preset's "
+                                      "coupons; editing one gives this array its own copy first.")
+                shared_label.setStyleSheet("margin: 5px; font-style: italic;")
+                layout.addWidget(shared_label)
+            if self.edit_mode and coupon_array.is_preset:
+                clone_layout = QHBoxLayout()
+                clone_btn = QPushButton("Clone Preset")
+                clone_btn.setToolTip("New array with its own copy of every coupon and composition")
+                clone_btn.clicked.connect(lambda: self.clone_preset(coupon_array, copy_on_write=False))
+                clone_layout.addWidget(clone_btn)
+                cow_btn = QPushButton("Clone Preset (Copy on Write)")
+                cow_btn.setToolTip("New array sharing the preset's coupons; a slot is copied when it is edited")
+                cow_btn.clicked.connect(lambda: self.clone_preset(coupon_array, copy_on_write=True))
+                clone_layout.addWidget(cow_btn)
+                clone_layout.addStretch()
+                layout.addLayout(clone_layout)
             # Add full-table delete button
             if self.edit_mode:
                 self.delete_couponarray_btn_layout = QHBoxLayout()
@@ -722,7 +681,7 @@ class CouponArrayDetailWindow(QMainWindow):
                     msg.setStyleSheet("QLabel{min-width:250px; font-size:14px;} QPushButton{min-width:60px;}")
                     reply = msg.exec()
                     if reply == QMessageBox.StandardButton.Yes:
-                        coupon_array.delete_instance()
+                        get_write_queue().delete_instance(coupon_array)
                         self.close()
                 self.delete_couponarray_btn.clicked.connect(confirm_delete)
             # Add full-table clear button (not delete)
@@ -745,9 +704,8 @@ class CouponArrayDetailWindow(QMainWindow):
                     msg.setStyleSheet("QLabel{min-width:250px; font-size:14px;} QPushButton{min-width:60px;}")
                     reply = msg.exec()
                     if reply == QMessageBox.StandardButton.Yes:
-                        for i in range(1, 257):
-                            setattr(coupon_array, f'coupon_{i}', None)
-                        coupon_array.save()
+                        get_write_queue().save_fields(coupon_array, on_done=lambda success: self.reload_plate_view(),
+                                                      **{f'coupon_{i}': None for i in range(1, 257)})
                         # Reload the table to reflect the cleared coupons
                         for row_idx in range(table.rowCount()):
                             for col in range(1, 8):
@@ -757,7 +715,13 @@ class CouponArrayDetailWindow(QMainWindow):
             if self.edit_mode:
                 headers += ["Delete"]
             table = QTableWidget()
-            layout.addWidget(table)
+            tabs = QTabWidget()
+            tabs.addTab(table, "Slots")
+            self.plate_view = PlateLayoutView()
+            self.plate_view.set_coupons(load_array_coupons(self.coupon_array_id))
+            self.plate_view.coupon_clicked.connect(self.show_slot_coupon_details)
+            tabs.addTab(self.plate_view, "Plate Layout")
+            layout.addWidget(tabs)
             coupon_fields = ["name", "description", "x_position", "y_position", "z_position", "direction", "is_preset"]
             data = []
             for i in range(1, 257):
@@ -810,12 +774,12 @@ class CouponArrayDetailWindow(QMainWindow):
                         """)
                         details_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
                         details_label.setCursor(Qt.CursorShape.PointingHandCursor)
-                        def make_mouse_press_event(coupon_id):
+                        def make_mouse_press_event(coupon_id, slot):
                             def mousePressEvent(event):
                                 if event.button() == Qt.MouseButton.LeftButton:
-                                    self.show_coupon_details(coupon_id)
+                                    self.show_slot_coupon_details(coupon_id, slot)
                             return mousePressEvent
-                        details_label.mousePressEvent = make_mouse_press_event(coupon.id)
+                        details_label.mousePressEvent = make_mouse_press_event(coupon.id, row_idx + 1)
                         table.setCellWidget(row_idx, 8, details_label)
                 # Row delete button
                 if self.edit_mode:
@@ -834,8 +798,8 @@ class CouponArrayDetailWindow(QMainWindow):
                             msg.setStyleSheet("QLabel{min-width:250px; font-size:14px;} QPushButton{min-width:60px;}")
                             reply = msg.exec()
                             if reply == QMessageBox.StandardButton.Yes:
-                                setattr(coupon_array, f'coupon_{slot_idx+1}', None)
-                                coupon_array.save()
+                                get_write_queue().save_fields(coupon_array, on_done=lambda success: self.reload_plate_view(),
+                                                              **{f'coupon_{slot_idx+1}': None})
                                 for col in range(1, 8):
                                     table.setItem(slot_idx, col, QTableWidgetItem(""))
                         return delete_field
@@ -851,28 +815,66 @@ class CouponArrayDetailWindow(QMainWindow):
                     field = coupon_fields[col-1]
                     new_value = table.item(row, col).text()
                     if field == "is_preset":
-                        coupon.is_preset = new_value.lower() in ("yes", "true", "1")
-                    elif field == "direction":
-                        coupon.direction = new_value
+                        value = new_value.lower() in ("yes", "true", "1")
                     elif field in ["x_position", "y_position", "z_position"]:
                         try:
-                            coupon.__setattr__(field, float(new_value) if new_value else None)
+                            value = float(new_value) if new_value else None
                         except Exception:
-                            coupon.__setattr__(field, None)
+                            value = None
                     else:
-                        coupon.__setattr__(field, new_value)
-                    coupon.save()
+                        value = new_value
+                    # Shared preset coupons are copied before the edit lands
+                    on_done = None
+                    if field in ("x_position", "y_position", "direction"):
+                        on_done = lambda success: self.reload_plate_view()
+                    get_write_queue().submit_call(lambda: update_slot(coupon_array.id, row + 1, {field: value}),
+                                                  on_done=on_done)
                 table.cellChanged.connect(on_cell_changed)
             table.resizeColumnsToContents()
         except Exception as e:
             print(f"Error loading coupon array details: {e}")
 
     def show_coupon_details(self, coupon_id):
-        window = CouponDeepDetailWindow(coupon_id, edit_mode=self.edit_mode)
-        window.show()
-        if not hasattr(self, 'detail_windows'):
-            self.detail_windows = []
-        self.detail_windows.append(window)
+        get_window_registry().open(CouponDeepDetailWindow, coupon_id, edit_mode=self.edit_mode)
+
+    def show_slot_coupon_details(self, coupon_id, slot):
+        """Open the coupon in a slot (from the Slots table or the plate view)"""
+        if self.edit_mode and slot in self.shared_slots:
+            self.show_private_coupon_details(slot)
+        else:
+            self.show_coupon_details(coupon_id)
+
+    def show_private_coupon_details(self, slot):
+        # Editing a shared coupon's composition would change the preset; copy it first
+        # (private_slot just returns the coupon once the slot has its own copy)
+        result = {}
+        def make_private():
+            result['coupon_id'] = private_slot(self.coupon_array_id, slot)
+        def on_done(success):
+            if success and result['coupon_id'] is not None:
+                # The slot now points at its own copy
+                self.reload_plate_view()
+                self.show_coupon_details(result['coupon_id'])
+        get_write_queue().submit_call(make_private, on_done=on_done)
+
+    def reload_plate_view(self):
+        if getattr(self, 'plate_view', None) is not None:
+            self.plate_view.set_coupons(load_array_coupons(self.coupon_array_id), refit=False)
+
+    def clone_preset(self, coupon_array, copy_on_write):
+        name, ok = QInputDialog.getText(self, "Clone Preset", "Name of the new coupon array:",
+                                        text=f"{coupon_array.name or 'Coupon Array'} (copy)")
+        if not ok:
+            return
+        result = {}
+        def clone():
+            result['id'] = clone_coupon_array(coupon_array.id, name.strip() or None, copy_on_write=copy_on_write)
+        def on_done(success):
+            if success:
+                get_window_registry().open(CouponArrayDetailWindow, result['id'], edit_mode=self.edit_mode)
+            else:
+                QMessageBox.warning(self, "Clone Failed", "Could not clone the coupon array.")
+        get_write_queue().submit_call(clone, on_done=on_done)
 
 class CouponDeepDetailWindow(QMainWindow):
     """Window to display coupon composition with header info"""
@@ -882,10 +884,10 @@ class CouponDeepDetailWindow(QMainWindow):
         self.edit_mode = edit_mode
         self.setWindowTitle(f"Coupon Details - ID: {coupon_id}")
         self.setGeometry(200, 200, 700, 500)
+        watch_for_deletion(self, Coupon, coupon_id)
         central_widget = QWidget()
         self.setCentralWidget(central_widget)
         layout = QVBoxLayout(central_widget)
-        from models.coupons.coupon import Coupon
         try:
             coupon = Coupon.get(Coupon.id == self.coupon_id)
             header_label = QLabel(f"Coupon: {coupon.id}")
@@ -955,8 +957,7 @@ class CouponDeepDetailWindow(QMainWindow):
                             msg.setStyleSheet("QLabel{min-width:250px; font-size:14px;} QPushButton{min-width:60px;}")
                             reply = msg.exec()
                             if reply == QMessageBox.StandardButton.Yes:
-                                setattr(composition, field_name, None)
-                                composition.save()
+                                get_write_queue().save_fields(composition, **{field_name: None})
                                 comp_table.setItem(row_idx, 1, QTableWidgetItem(""))
                         return delete_field
                     delete_btn.clicked.connect(make_delete_func(field, i))
@@ -970,8 +971,7 @@ class CouponDeepDetailWindow(QMainWindow):
                             float_val = float(new_value) if new_value else None
                         except Exception:
                             float_val = None
-                        setattr(composition, field, float_val)
-                        composition.save()
+                        get_write_queue().save_fields(composition, **{field: float_val})
                 comp_table.cellChanged.connect(on_cell_changed)
             # Connect delete button after table is created
             if self.edit_mode:
@@ -985,7 +985,7 @@ class CouponDeepDetailWindow(QMainWindow):
                     msg.setStyleSheet("QLabel{min-width:250px; font-size:14px;} QPushButton{min-width:60px;}")
                     reply = msg.exec()
                     if reply == QMessageBox.StandardButton.Yes:
-                        composition.delete_instance()
+                        get_write_queue().delete_instance(composition)
                         comp_table.setRowCount(0)
                         comp_table.setColumnCount(0)
                 self.delete_composition_btn.clicked.connect(confirm_delete)
@@ -1002,6 +1002,7 @@ class WorkOrderDetailWindow(QMainWindow):
         self.edit_mode = edit_mode
         self.setWindowTitle(f"Work Order Details - ID: {work_order_id}")
         self.setGeometry(200, 200, 800, 500)
+        watch_for_deletion(self, WorkOrder, work_order_id)
         central_widget = QWidget()
         self.setCentralWidget(central_widget)
         layout = QVBoxLayout(central_widget)
@@ -1058,7 +1059,7 @@ class WorkOrderDetailWindow(QMainWindow):
                     msg.setStyleSheet("QLabel{min-width:250px; font-size:14px;} QPushButton{min-width:60px;}")
                     reply = msg.exec()
                     if reply == QMessageBox.StandardButton.Yes:
-                        part_list.delete_instance()
+                        get_write_queue().delete_instance(part_list)
                         self.close()
                 self.delete_partlist_btn.clicked.connect(confirm_delete)
             table = QTableWidget()
@@ -1066,12 +1067,8 @@ class WorkOrderDetailWindow(QMainWindow):
             part_fields = ["id", "name", "description", "file_path", "is_complete"]
             headers = ["ID", "Name", "Description", "File Path", "Is Complete", "Delete"] if self.edit_mode else ["ID", "Name", "Description", "File Path", "Is Complete"]
             table.setColumnCount(len(headers))
-            # Collect all non-null parts
-            parts = []
-            for i in range(128):
-                part = getattr(part_list, f'part_{i+1}', None)
-                if part:
-                    parts.append(part)
+            # All filled slots with one parts query
+            parts = resolve_parts(part_list)
             table.setRowCount(len(parts))
             table.setHorizontalHeaderLabels(headers)
             for row, part in enumerate(parts):
@@ -1089,7 +1086,7 @@ class WorkOrderDetailWindow(QMainWindow):
                     delete_btn.setText("🗑️")
                     delete_btn.setStyleSheet("color: #c00; font-size: 16px; font-weight: bold;")
                     delete_btn.setToolTip(f"Delete this part from list")
-                    def make_delete_func(row_idx, part_idx):
+                    def make_delete_func(button):
                         def delete_part():
                             msg = QMessageBox(self)
                             msg.setIcon(QMessageBox.Icon.Warning)
@@ -1100,31 +1097,31 @@ class WorkOrderDetailWindow(QMainWindow):
                             msg.setStyleSheet("QLabel{min-width:250px; font-size:14px;} QPushButton{min-width:60px;}")
                             reply = msg.exec()
                             if reply == QMessageBox.StandardButton.Yes:
+                                row = table.indexAt(button.pos()).row()
+                                part_idx = _current_part_slot(part_list, table, row) - 1
                                 # Shift up logic for part_1 (NOT NULL)
                                 if part_idx == 0:
-                                    for i in range(1, 128):
-                                        next_part = getattr(part_list, f'part_{i+1}', None)
-                                        setattr(part_list, f'part_{i}', next_part)
-                                    setattr(part_list, f'part_{128}', None)
+                                    values = {f'part_{i}': getattr(part_list, f'part_{i+1}_id') for i in range(1, 128)}
+                                    values['part_128'] = None
                                 else:
-                                    setattr(part_list, f'part_{part_idx+1}', None)
-                                part_list.save()
-                                table.removeRow(row_idx)
+                                    values = {f'part_{part_idx+1}': None}
+                                get_write_queue().save_fields(part_list, **values)
+                                table.removeRow(row)
                         return delete_part
-                    delete_btn.clicked.connect(make_delete_func(row, row))
+                    delete_btn.clicked.connect(make_delete_func(delete_btn))
                     table.setCellWidget(row, len(headers)-1, delete_btn)
             if self.edit_mode:
                 def on_cell_changed(row, col):
                     if col == 0 or col == len(headers)-1:
                         return
-                    part = parts[row]
+                    part_id = int(table.item(row, 0).text())
                     field = part_fields[col]
                     new_value = table.item(row, col).text()
                     if field == "is_complete":
-                        part.is_complete = new_value.lower() in ("yes", "true", "1")
+                        value = new_value.lower() in ("yes", "true", "1")
                     else:
-                        setattr(part, field, new_value)
-                    part.save()
+                        value = new_value
+                    get_write_queue().submit_update(Part, part_id, {field: value})
                 table.cellChanged.connect(on_cell_changed)
             table.resizeColumnsToContents()
         except Exception as e:
@@ -1138,6 +1135,7 @@ class JobDetailWindow(QMainWindow):
         self.edit_mode = edit_mode
         self.setWindowTitle(f"Job Details - ID: {job_id}")
         self.setGeometry(200, 200, 800, 500)
+        watch_for_deletion(self, Job, job_id)
         central_widget = QWidget()
         self.setCentralWidget(central_widget)
         layout = QVBoxLayout(central_widget)
@@ -1194,7 +1192,7 @@ class JobDetailWindow(QMainWindow):
                     msg.setStyleSheet("QLabel{min-width:250px; font-size:14px;} QPushButton{min-width:60px;}")
                     reply = msg.exec()
                     if reply == QMessageBox.StandardButton.Yes:
-                        part_list.delete_instance()
+                        get_write_queue().delete_instance(part_list)
                         self.close()
                 self.delete_partlist_btn.clicked.connect(confirm_delete)
             table = QTableWidget()
@@ -1202,12 +1200,8 @@ class JobDetailWindow(QMainWindow):
             part_fields = ["id", "name", "description", "file_path", "is_complete"]
             headers = ["ID", "Name", "Description", "File Path", "Is Complete", "Delete"] if self.edit_mode else ["ID", "Name", "Description", "File Path", "Is Complete"]
             table.setColumnCount(len(headers))
-            # Collect all non-null parts
-            parts = []
-            for i in range(128):
-                part = getattr(part_list, f'part_{i+1}', None)
-                if part:
-                    parts.append(part)
+            # All filled slots with one parts query
+            parts = resolve_parts(part_list)
             table.setRowCount(len(parts))
             table.setHorizontalHeaderLabels(headers)
             for row, part in enumerate(parts):
@@ -1225,7 +1219,7 @@ class JobDetailWindow(QMainWindow):
                     delete_btn.setText("🗑️")
                     delete_btn.setStyleSheet("color: #c00; font-size: 16px; font-weight: bold;")
                     delete_btn.setToolTip(f"Delete this part from list")
-                    def make_delete_func(row_idx, part_idx):
+                    def make_delete_func(button):
                         def delete_part():
                             msg = QMessageBox(self)
                             msg.setIcon(QMessageBox.Icon.Warning)
@@ -1236,31 +1230,31 @@ class JobDetailWindow(QMainWindow):
                             msg.setStyleSheet("QLabel{min-width:250px; font-size:14px;} QPushButton{min-width:60px;}")
                             reply = msg.exec()
                             if reply == QMessageBox.StandardButton.Yes:
+                                row = table.indexAt(button.pos()).row()
+                                part_idx = _current_part_slot(part_list, table, row) - 1
                                 # Shift up logic for part_1 (NOT NULL)
                                 if part_idx == 0:
-                                    for i in range(1, 128):
-                                        next_part = getattr(part_list, f'part_{i+1}', None)
-                                        setattr(part_list, f'part_{i}', next_part)
-                                    setattr(part_list, f'part_{128}', None)
+                                    values = {f'part_{i}': getattr(part_list, f'part_{i+1}_id') for i in range(1, 128)}
+                                    values['part_128'] = None
                                 else:
-                                    setattr(part_list, f'part_{part_idx+1}', None)
-                                part_list.save()
-                                table.removeRow(row_idx)
+                                    values = {f'part_{part_idx+1}': None}
+                                get_write_queue().save_fields(part_list, **values)
+                                table.removeRow(row)
                         return delete_part
-                    delete_btn.clicked.connect(make_delete_func(row, row))
+                    delete_btn.clicked.connect(make_delete_func(delete_btn))
                     table.setCellWidget(row, len(headers)-1, delete_btn)
             if self.edit_mode:
                 def on_cell_changed(row, col):
                     if col == 0 or col == len(headers)-1:
                         return
-                    part = parts[row]
+                    part_id = int(table.item(row, 0).text())
                     field = part_fields[col]
                     new_value = table.item(row, col).text()
                     if field == "is_complete":
-                        part.is_complete = new_value.lower() in ("yes", "true", "1")
+                        value = new_value.lower() in ("yes", "true", "1")
                     else:
-                        setattr(part, field, new_value)
-                    part.save()
+                        value = new_value
+                    get_write_queue().submit_update(Part, part_id, {field: value})
                 table.cellChanged.connect(on_cell_changed)
             table.resizeColumnsToContents()
         except Exception as e:
@@ -0,0 +1,75 @@
+"""
+Table header with a filter box under each column label
+
+Clicking a label still emits sectionClicked (used for sorting); editing a
+box emits filters_changed with {column: text} once typing pauses.
+"""
+
+from PyQt6.QtWidgets import QHeaderView, QLineEdit
+from PyQt6.QtCore import Qt, QSize, QTimer, pyqtSignal
+
+FILTER_DELAY_MS = 300
+
+
+class FilterHeader(QHeaderView):
+    filters_changed = pyqtSignal(dict)
+
+    def __init__(self, parent=None):
+        super().__init__(Qt.Orientation.Horizontal, parent)
+        self.setSectionsClickable(True)
+        self.setSortIndicatorShown(True)
+        self.editors = []
+        self.sectionResized.connect(self.position_editors)
+        self.sectionMoved.connect(self.position_editors)
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(FILTER_DELAY_MS)
+        self._timer.timeout.connect(lambda: self.filters_changed.emit(self.filters()))
+
+    def set_filter_columns(self, count, enabled=()):
+        """One box per column; columns not in enabled get none (e.g. buttons)"""
+        for editor in self.editors:
+            if editor is not None:
+                editor.deleteLater()
+        self.editors = []
+        for column in range(count):
+            if column not in enabled:
+                self.editors.append(None)
+                continue
+            editor = QLineEdit(self)
+            editor.setPlaceholderText("Filter")
+            editor.setClearButtonEnabled(True)
+            editor.setToolTip("Text matches the start (* is a wildcard); >, <, >=, <=, =, != compare")
+            editor.textChanged.connect(self._timer.start)
+            editor.show()
+            self.editors.append(editor)
+        self.updateGeometries()
+        self.position_editors()
+
+    def filters(self):
+        return {column: editor.text() for column, editor in enumerate(self.editors)
+                if editor is not None and editor.text().strip()}
+
+    def _editor_height(self):
+        # Also called from the QHeaderView constructor, before editors exists
+        editors = [editor for editor in getattr(self, 'editors', ()) if editor is not None]
+        return editors[0].sizeHint().height() if editors else 0
+
+    def sizeHint(self):
+        size = super().sizeHint()
+        return QSize(size.width(), size.height() + self._editor_height())
+
+    def updateGeometries(self):
+        # Leave room below the labels for the boxes
+        self.setViewportMargins(0, 0, 0, self._editor_height())
+        super().updateGeometries()
+        self.position_editors()
+
+    def position_editors(self, *args):
+        height = self._editor_height()
+        top = super().sizeHint().height()
+        for column, editor in enumerate(getattr(self, 'editors', ())):
+            if editor is not None:
+                editor.setGeometry(self.sectionViewportPosition(column), top,
+                                   self.sectionSize(column), height)
+                editor.setVisible(not self.isSectionHidden(column))
@@ -0,0 +1,187 @@
+"""
+Integrity check dialog: scans every foreign key in the background and
+repairs dangling references in bulk
+
+The scan runs on its own thread with its own connection (WAL lets it read
+while the GUI keeps working). Repairs are queued on the write queue so they
+run on the writer thread, one transaction per repair.
+"""
+
+import peewee as pw
+from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QProgressBar, QPushButton,
+                             QTreeWidget, QTreeWidgetItem, QInputDialog, QMessageBox)
+from PyQt6.QtCore import Qt, QThread, pyqtSignal
+
+from database.connection import database
+from gui.write_queue import get_write_queue
+from models.integrity import scan, repair, delete_dangling
+
+
+class IntegrityScanThread(QThread):
+    progress = pyqtSignal(int, int)
+    scanned = pyqtSignal(list)
+    failed = pyqtSignal(str)
+
+    def run(self):
+        try:
+            found = scan(progress=self.progress.emit, should_stop=self.isInterruptionRequested)
+            if not self.isInterruptionRequested():
+                self.scanned.emit(found)
+        except Exception as e:
+            self.failed.emit(str(e))
+        finally:
+            if not database.is_closed():
+                database.close()
+
+
+class IntegrityDialog(QDialog):
+    """Dangling references grouped by foreign key, with bulk repair actions"""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Integrity Check")
+        self.resize(700, 500)
+        self.scan_thread = None
+        self.checks = []
+        layout = QVBoxLayout(self)
+        self.status_label = QLabel()
+        layout.addWidget(self.status_label)
+        self.progress_bar = QProgressBar()
+        layout.addWidget(self.progress_bar)
+        self.tree = QTreeWidget()
+        self.tree.setHeaderLabels(["Reference", "Row ID", "Missing ID"])
+        self.tree.setSelectionMode(QTreeWidget.SelectionMode.ExtendedSelection)
+        self.tree.itemSelectionChanged.connect(self._update_buttons)
+        layout.addWidget(self.tree)
+        buttons = QHBoxLayout()
+        self.rescan_btn = QPushButton("Rescan")
+        self.rescan_btn.clicked.connect(self.start_scan)
+        buttons.addWidget(self.rescan_btn)
+        buttons.addStretch()
+        self.clear_btn = QPushButton("Set to NULL")
+        self.clear_btn.setToolTip("Clear the selected references (nullable columns only)")
+        self.clear_btn.clicked.connect(self._clear_selected)
+        buttons.addWidget(self.clear_btn)
+        self.repoint_btn = QPushButton("Re-point...")
+        self.repoint_btn.setToolTip("Point the selected references at an existing row")
+        self.repoint_btn.clicked.connect(self._repoint_selected)
+        buttons.addWidget(self.repoint_btn)
+        self.delete_btn = QPushButton("Delete Rows")
+        self.delete_btn.setToolTip("Delete the rows holding the selected references")
+        self.delete_btn.setStyleSheet("background-color: #c00; color: white; font-weight: bold;")
+        self.delete_btn.clicked.connect(self._delete_selected)
+        buttons.addWidget(self.delete_btn)
+        close_btn = QPushButton("Close")
+        close_btn.clicked.connect(self.close)
+        buttons.addWidget(close_btn)
+        layout.addLayout(buttons)
+        self._update_buttons()
+        self.start_scan()
+
+    def start_scan(self):
+        if self.scan_thread is not None and self.scan_thread.isRunning():
+            return
+        self.tree.clear()
+        self.rescan_btn.setEnabled(False)
+        self.status_label.setText("Scanning foreign keys...")
+        self.progress_bar.setValue(0)
+        self.scan_thread = IntegrityScanThread(self)
+        self.scan_thread.progress.connect(self._on_progress)
+        self.scan_thread.scanned.connect(self._on_scanned)
+        self.scan_thread.failed.connect(self._on_failed)
+        self.scan_thread.finished.connect(lambda: self.rescan_btn.setEnabled(True))
+        self.scan_thread.start()
+
+    def _on_progress(self, done, total):
+        self.progress_bar.setMaximum(total)
+        self.progress_bar.setValue(done)
+
+    def _on_failed(self, error):
+        self.status_label.setText(f"Scan failed: {error}")
+
+    def _on_scanned(self, checks):
+        self.checks = checks
+        self.tree.clear()
+        total = sum(len(check.rows) for check in checks)
+        if not checks:
+            self.status_label.setText("No dangling references found.")
+        else:
+            self.status_label.setText(f"{total} dangling reference{'s' if total != 1 else ''} "
+                                      f"in {len(checks)} column{'s' if len(checks) != 1 else ''}.")
+        for index, check in enumerate(checks):
+            table = check.model._meta.table_name
+            parent = check.field.rel_model._meta.table_name
+            top = QTreeWidgetItem([f"{table}.{check.field.column_name} -> {parent}", "", str(len(check.rows))])
+            top.setData(0, Qt.ItemDataRole.UserRole, (index, None))
+            for row_id, missing_id in check.rows:
+                child = QTreeWidgetItem(["", str(row_id), str(missing_id)])
+                child.setData(0, Qt.ItemDataRole.UserRole, (index, row_id))
+                top.addChild(child)
+            self.tree.addTopLevelItem(top)
+        self.tree.resizeColumnToContents(0)
+        self._update_buttons()
+
+    def selected_items(self):
+        """(model, field, row ids or None for the whole column) for the selection"""
+        columns, rows = set(), {}
+        for item in self.tree.selectedItems():
+            index, row_id = item.data(0, Qt.ItemDataRole.UserRole)
+            if row_id is None:
+                columns.add(index)
+            else:
+                rows.setdefault(index, set()).add(row_id)
+        selected = [(self.checks[i].model, self.checks[i].field, None) for i in sorted(columns)]
+        selected += [(self.checks[i].model, self.checks[i].field, sorted(ids))
+                     for i, ids in sorted(rows.items()) if i not in columns]
+        return selected
+
+    def _update_buttons(self):
+        selected = self.selected_items() if self.checks else []
+        self.clear_btn.setEnabled(bool(selected) and all(field.null and not field.primary_key
+                                                         for _, field, _ in selected))
+        self.repoint_btn.setEnabled(bool(selected) and all(not field.primary_key for _, field, _ in selected)
+                                    and len({field.rel_model for _, field, _ in selected}) == 1)
+        self.delete_btn.setEnabled(bool(selected))
+
+    def _submit(self, fn, description):
+        def on_done(success):
+            if not success:
+                QMessageBox.warning(self, "Repair Failed", f"Could not {description}.")
+            self.start_scan()
+        get_write_queue().submit_call(fn, on_done=on_done)
+
+    def _clear_selected(self):
+        selected = self.selected_items()
+        self._submit(lambda: repair(selected), "clear the references")
+
+    def _repoint_selected(self):
+        selected = self.selected_items()
+        parent = selected[0][1].rel_model
+        text, ok = QInputDialog.getText(self, "Re-point References",
+                                        f"ID of the {parent._meta.table_name} row to point at:")
+        if not ok or not text.strip():
+            return
+        target_id = text.strip()
+        if isinstance(parent._meta.primary_key, pw.IntegerField):
+            target_id = int(target_id) if target_id.isdigit() else None
+        if target_id is None or not parent.select().where(parent._meta.primary_key == target_id).exists():
+            QMessageBox.warning(self, "Re-point References", f"No {parent._meta.table_name} row with ID {text.strip()}.")
+            return
+        self._submit(lambda: repair(selected, target_id), "re-point the references")
+
+    def _delete_selected(self):
+        selected = self.selected_items()
+        count = sum(len(row_ids) if row_ids is not None else
+                    len(next(c.rows for c in self.checks if c.model is model and c.field is field))
+                    for model, field, row_ids in selected)
+        reply = QMessageBox.question(self, "Confirm Delete",
+                                     f"Delete {count} row{'s' if count != 1 else ''} with dangling references?",
+                                     QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
+                                     QMessageBox.StandardButton.No)
+        if reply == QMessageBox.StandardButton.Yes:
+            self._submit(lambda: delete_dangling(selected), "delete the rows")
+
+    def closeEvent(self, event):
+        if self.scan_thread is not None and self.scan_thread.isRunning():
+            self.scan_thread.requestInterruption()
+            self.scan_thread.wait()
+        super().closeEvent(event)
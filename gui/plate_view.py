@@ -0,0 +1,269 @@
+"""
+Plate layout view: coupons drawn at their X/Y positions on the plate
+
+All coupons are painted by one QGraphicsItem from NumPy arrays instead of
+one item per coupon, so loading thousands of them costs a few array copies.
+What gets painted depends on the zoom (level of detail, in pixels per mm):
+    far     one drawPoints() call for the visible coupons
+    middle  circles, stamped from a pixmap rendered once per colour and size
+            (blitting is several times cheaper than rasterising each ellipse)
+    near    circles plus direction glyphs and slot numbers
+Only coupons inside the exposed rectangle are considered, so panning a
+zoomed-in view paints a handful of them. Clicking a coupon emits
+coupon_clicked with its id and slot (0 when it isn't in an array slot).
+
+Scene coordinates are plate millimetres with Y flipped (scene y = -y), so
+the plate's Y axis points up on screen.
+"""
+
+import numpy as np
+from PyQt6.QtWidgets import QGraphicsView, QGraphicsScene, QGraphicsItem, QStyleOptionGraphicsItem
+from PyQt6.QtGui import QPainter, QPen, QBrush, QColor, QPolygonF, QFont, QPixmap, QTransform
+from PyQt6.QtCore import Qt, QRectF, QPointF, QLineF, pyqtSignal
+
+# Drawn coupon radius (mm); coupons have no stored footprint
+COUPON_RADIUS = 4.0
+# Pixels across a coupon below which it's drawn as a point, and above which glyphs are added
+POINT_BELOW_PX = 4.0
+GLYPHS_ABOVE_PX = 24.0
+# Largest coupon (pixels) drawn from a cached stamp; bigger ones are drawn as ellipses
+STAMP_UP_TO_PX = 96.0
+# Plate outline margin around the coupons (mm)
+PLATE_MARGIN = 10.0
+
+PRESET_COLOR = QColor(0x2C, 0x7B, 0xB6)
+COUPON_COLOR = QColor(0x1A, 0x96, 0x41)
+SELECTED_COLOR = QColor(0xD7, 0x19, 0x1C)
+
+# Build direction -> glyph angle in degrees (None: out of the plate, drawn as a dot)
+DIRECTION_ANGLES = {'X': 0.0, 'Y': 90.0, 'XY': 45.0, 'YZ': 90.0, 'ZX': 0.0, 'Z': None}
+
+
+class CouponLayerItem(QGraphicsItem):
+    """Every coupon of the view in one item"""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setFlag(QGraphicsItem.GraphicsItemFlag.ItemUsesExtendedStyleOption)
+        self.ids = np.empty(0, dtype=np.int64)
+        self.slots = np.empty(0, dtype=np.int64)
+        self.xy = np.empty((0, 2))
+        self.preset = np.empty(0, dtype=bool)
+        self.directions = []
+        self.selected = None
+        self._bounds = QRectF()
+        self._points = []
+        self._rects = []
+        self._stamps = {}
+
+    def set_coupons(self, coupons):
+        """coupons: ArrayCoupon tuples (models.coupons.loader) or anything with the same fields"""
+        self.prepareGeometryChange()
+        self.ids = np.array([coupon.id for coupon in coupons], dtype=np.int64)
+        self.slots = np.array([getattr(coupon, 'slot', 0) for coupon in coupons], dtype=np.int64)
+        self.xy = np.array([(coupon.x_position, -coupon.y_position) for coupon in coupons],
+                           dtype=float).reshape(-1, 2)
+        self.preset = np.array([bool(coupon.is_preset) for coupon in coupons], dtype=bool)
+        self.directions = [coupon.direction for coupon in coupons]
+        self.selected = None
+        # Built once here so painting only has to pick the visible ones
+        self._points = [QPointF(x, y) for x, y in self.xy]
+        self._rects = [QRectF(x - COUPON_RADIUS, y - COUPON_RADIUS, 2 * COUPON_RADIUS, 2 * COUPON_RADIUS)
+                       for x, y in self.xy]
+        if len(self.xy):
+            low, high = self.xy.min(axis=0), self.xy.max(axis=0)
+            pad = COUPON_RADIUS + PLATE_MARGIN
+            self._bounds = QRectF(low[0] - pad, low[1] - pad, high[0] - low[0] + 2 * pad, high[1] - low[1] + 2 * pad)
+        else:
+            self._bounds = QRectF(-50, -50, 100, 100)
+        self.update()
+
+    def boundingRect(self):
+        return self._bounds
+
+    def index_at(self, pos, tolerance=0.0):
+        """Index of the coupon under scene point pos, or None"""
+        if not len(self.xy):
+            return None
+        distance = np.hypot(self.xy[:, 0] - pos.x(), self.xy[:, 1] - pos.y())
+        index = int(np.argmin(distance))
+        return index if distance[index] <= COUPON_RADIUS + tolerance else None
+
+    def _visible(self, rect):
+        x, y = self.xy[:, 0], self.xy[:, 1]
+        inside = ((x >= rect.left() - COUPON_RADIUS) & (x <= rect.right() + COUPON_RADIUS) &
+                  (y >= rect.top() - COUPON_RADIUS) & (y <= rect.bottom() + COUPON_RADIUS))
+        return np.flatnonzero(inside)
+
+    def paint(self, painter, option, widget=None):
+        painter.setPen(QPen(QColor(0x60, 0x60, 0x60), 0))
+        painter.setBrush(QBrush(QColor(0xF4, 0xF4, 0xF4)))
+        painter.drawRect(self._bounds)
+        if not len(self.xy):
+            return
+        lod = QStyleOptionGraphicsItem.levelOfDetailFromTransform(painter.worldTransform())
+        diameter_px = 2 * COUPON_RADIUS * lod
+        # Antialiasing only pays off once coupons are more than a few pixels across
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing, diameter_px >= 2 * POINT_BELOW_PX)
+        visible = self._visible(option.exposedRect)
+        for preset, color in ((True, PRESET_COLOR), (False, COUPON_COLOR)):
+            group = visible[self.preset[visible] == preset]
+            if not len(group):
+                continue
+            if diameter_px < POINT_BELOW_PX:
+                # Cosmetic pen: the width is in pixels whatever the zoom
+                pen = QPen(color, max(2.0, diameter_px), Qt.PenStyle.SolidLine, Qt.PenCapStyle.RoundCap)
+                pen.setCosmetic(True)
+                painter.setPen(pen)
+                painter.drawPoints(QPolygonF([self._points[i] for i in group]))
+                continue
+            if diameter_px <= STAMP_UP_TO_PX and painter.worldTransform().isAffine():
+                self._paint_stamps(painter, group, color, diameter_px)
+                continue
+            painter.setPen(QPen(color.darker(150), 0))
+            painter.setBrush(QBrush(color.lighter(130)))
+            for i in group:
+                painter.drawEllipse(self._rects[i])
+        if diameter_px >= GLYPHS_ABOVE_PX:
+            self._paint_glyphs(painter, visible)
+        if self.selected is not None:
+            painter.setPen(QPen(SELECTED_COLOR, 3 / lod))
+            painter.setBrush(Qt.BrushStyle.NoBrush)
+            painter.drawEllipse(self._rects[self.selected])
+
+    def _stamp(self, color, diameter_px):
+        # Quarter-pixel steps so a zoom doesn't fill the cache with near-identical sizes
+        key = (color.rgb(), round(diameter_px * 4))
+        stamp = self._stamps.get(key)
+        if stamp is None:
+            if len(self._stamps) > 32:
+                self._stamps.clear()
+            size = int(np.ceil(diameter_px)) + 2
+            stamp = QPixmap(size, size)
+            stamp.fill(Qt.GlobalColor.transparent)
+            stamp_painter = QPainter(stamp)
+            stamp_painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+            stamp_painter.setPen(QPen(color.darker(150), 1))
+            stamp_painter.setBrush(QBrush(color.lighter(130)))
+            offset = (size - diameter_px) / 2
+            stamp_painter.drawEllipse(QRectF(offset, offset, diameter_px, diameter_px))
+            stamp_painter.end()
+            self._stamps[key] = stamp
+        return stamp
+
+    def _paint_stamps(self, painter, group, color, diameter_px):
+        stamp = self._stamp(color, diameter_px)
+        transform = painter.worldTransform()
+        # Coupon centres in device pixels, mapped with NumPy rather than one QTransform.map per point
+        xy = self.xy[group]
+        device_x = xy[:, 0] * transform.m11() + xy[:, 1] * transform.m21() + transform.dx()
+        device_y = xy[:, 0] * transform.m12() + xy[:, 1] * transform.m22() + transform.dy()
+        half = stamp.width() / 2
+        painter.save()
+        painter.setWorldTransform(QTransform())
+        for x, y in zip((device_x - half).tolist(), (device_y - half).tolist()):
+            painter.drawPixmap(QPointF(x, y), stamp)
+        painter.restore()
+
+    def _paint_glyphs(self, painter, visible):
+        arm = COUPON_RADIUS * 0.7
+        lines, dots = [], []
+        for i in visible:
+            x, y = self.xy[i]
+            direction = self.directions[i]
+            if direction not in DIRECTION_ANGLES:
+                # OTHER: a cross
+                lines += [QLineF(x - arm, y - arm, x + arm, y + arm), QLineF(x - arm, y + arm, x + arm, y - arm)]
+                continue
+            angle = DIRECTION_ANGLES[direction]
+            if angle is None:
+                dots.append(QPointF(x, y))
+                continue
+            # Scene Y is flipped, so a positive plate angle is negative on screen
+            theta = np.radians(-angle)
+            dx, dy = arm * np.cos(theta), arm * np.sin(theta)
+            lines.append(QLineF(x - dx, y - dy, x + dx, y + dy))
+            if 'Z' in direction:
+                dots.append(QPointF(x, y))
+        painter.setPen(QPen(QColor(0x20, 0x20, 0x20), COUPON_RADIUS * 0.15, Qt.PenStyle.SolidLine,
+                            Qt.PenCapStyle.RoundCap))
+        if lines:
+            painter.drawLines(lines)
+        if dots:
+            painter.setPen(QPen(QColor(0x20, 0x20, 0x20), COUPON_RADIUS * 0.4, Qt.PenStyle.SolidLine,
+                                Qt.PenCapStyle.RoundCap))
+            painter.drawPoints(QPolygonF(dots))
+        font = QFont(painter.font())
+        font.setPointSizeF(COUPON_RADIUS * 0.45)
+        painter.setFont(font)
+        painter.setPen(QPen(QColor(0x30, 0x30, 0x30), 0))
+        for i in visible:
+            if self.slots[i]:
+                rect = self._rects[i].translated(0, COUPON_RADIUS * 1.05)
+                painter.drawText(rect, Qt.AlignmentFlag.AlignHCenter | Qt.AlignmentFlag.AlignTop, str(self.slots[i]))
+
+
+class PlateLayoutView(QGraphicsView):
+    """Zoom with the wheel, pan by dragging, click a coupon to open it"""
+    coupon_clicked = pyqtSignal(int, int)   # coupon id, slot
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setScene(QGraphicsScene(self))
+        self.layer = CouponLayerItem()
+        self.scene().addItem(self.layer)
+        self.setDragMode(QGraphicsView.DragMode.ScrollHandDrag)
+        self.setTransformationAnchor(QGraphicsView.ViewportAnchor.AnchorUnderMouse)
+        self.setViewportUpdateMode(QGraphicsView.ViewportUpdateMode.SmartViewportUpdate)
+        self.setOptimizationFlag(QGraphicsView.OptimizationFlag.DontSavePainterState)
+        self.setMouseTracking(True)
+        self._press_pos = None
+
+    def set_coupons(self, coupons, refit=True):
+        """Show coupons; refit=False keeps the current zoom and scroll (e.g. after an edit)"""
+        self.layer.set_coupons(coupons)
+        self.scene().setSceneRect(self.layer.boundingRect())
+        if refit:
+            self.fit()
+
+    def fit(self):
+        self.fitInView(self.layer.boundingRect(), Qt.AspectRatioMode.KeepAspectRatio)
+
+    def wheelEvent(self, event):
+        factor = 1.15 ** (event.angleDelta().y() / 120)
+        self.scale(factor, factor)
+
+    def mousePressEvent(self, event):
+        self._press_pos = event.position()
+        super().mousePressEvent(event)
+
+    def mouseReleaseEvent(self, event):
+        super().mouseReleaseEvent(event)
+        # A click, not the end of a pan
+        if (event.button() == Qt.MouseButton.LeftButton and self._press_pos is not None
+                and (event.position() - self._press_pos).manhattanLength() < 4):
+            pos = self.mapToScene(event.position().toPoint())
+            index = self.layer.index_at(pos, tolerance=2 / max(self.transform().m11(), 1e-9))
+            if index is not None:
+                self.layer.selected = index
+                self.layer.update()
+                self.coupon_clicked.emit(int(self.layer.ids[index]), int(self.layer.slots[index]))
+        self._press_pos = None
+
+    def mouseMoveEvent(self, event):
+        super().mouseMoveEvent(event)
+        if event.buttons() != Qt.MouseButton.NoButton:
+            return
+        index = self.layer.index_at(self.mapToScene(event.position().toPoint()))
+        if index is None:
+            self.setToolTip("")
+            return
+        x, y = self.layer.xy[index]
+        slot = f"Slot {self.layer.slots[index]}, " if self.layer.slots[index] else ""
+        self.setToolTip(f"{slot}coupon {self.layer.ids[index]} at ({x:.2f}, {-y:.2f}), "
+                        f"{self.layer.directions[index]}")
+
+    def keyPressEvent(self, event):
+        if event.key() == Qt.Key.Key_F:
+            self.fit()
+            return
+        super().keyPressEvent(event)
@@ -0,0 +1,188 @@
+"""
+Process map: laser power against scan speed for every feature setting
+
+Points are coloured by energy density band (models.settings.analytics).
+Rather than one QPainter call per point, the whole scatter is rasterised
+with NumPy into an image that is rebuilt only when the data, the filter or
+the widget size changes; paintEvent just blits it and draws the axes, so
+100k points stay smooth.
+"""
+
+import numpy as np
+from PyQt6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QComboBox, QToolTip
+from PyQt6.QtGui import QPainter, QImage, QColor, QPen
+from PyQt6.QtCore import Qt, QRect, pyqtSlot
+
+from models.settings.setting import FEATURE_TYPES
+from models.settings import analytics
+
+# ARGB per band: unknown, lack of fusion, nominal, keyhole
+BAND_COLORS = np.array([0xFFB0B0B0, 0xFF2C7BB6, 0xFF1A9641, 0xFFD7191C], dtype=np.uint32)
+BACKGROUND = 0xFFFFFFFF
+MARGINS = (60, 16, 16, 40)  # left, top, right, bottom
+TICKS = 5
+
+
+def _limits(values):
+    low, high = float(values.min()), float(values.max())
+    if high <= low:
+        high = low + 1.0
+    pad = (high - low) * 0.05
+    return low - pad, high + pad
+
+
+class ProcessMapCanvas(QWidget):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setMouseTracking(True)
+        self.setMinimumSize(300, 200)
+        self.x = self.y = np.empty(0)
+        self.band = np.empty(0, dtype=np.int8)
+        self.index = np.empty(0, dtype=np.int64)
+        self.data = None
+        self.x_limits = self.y_limits = (0.0, 1.0)
+        self._image = None
+        self._pixels = None
+
+    def set_points(self, data, mask):
+        self.data = data
+        self.index = np.flatnonzero(mask)
+        self.x = data.scan_speed[self.index]
+        self.y = data.power[self.index]
+        self.band = data.band[self.index]
+        if len(self.index):
+            self.x_limits = _limits(self.x)
+            self.y_limits = _limits(self.y)
+        self._image = None
+        self.update()
+
+    def plot_rect(self):
+        left, top, right, bottom = MARGINS
+        return QRect(left, top, max(1, self.width() - left - right), max(1, self.height() - top - bottom))
+
+    def _to_pixels(self, rect):
+        (x0, x1), (y0, y1) = self.x_limits, self.y_limits
+        px = ((self.x - x0) / (x1 - x0) * (rect.width() - 1)).round().astype(np.int64)
+        py = ((y1 - self.y) / (y1 - y0) * (rect.height() - 1)).round().astype(np.int64)
+        return px, py
+
+    def _render(self, rect):
+        width, height = rect.width(), rect.height()
+        image = np.full((height, width), BACKGROUND, dtype=np.uint32)
+        px, py = self._to_pixels(rect)
+        self._pixels = (px, py)
+        # Out-of-window bands last so they stay visible on top of nominal points
+        order = np.argsort(self.band == analytics.NOMINAL, kind='stable')[::-1]
+        px, py, colors = px[order], py[order], BAND_COLORS[self.band[order]]
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                x, y = px + dx, py + dy
+                inside = (x >= 0) & (x < width) & (y >= 0) & (y < height)
+                image[y[inside], x[inside]] = colors[inside]
+        self._image = QImage(image.tobytes(), width, height, width * 4, QImage.Format.Format_ARGB32).copy()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), QColor(BACKGROUND))
+        rect = self.plot_rect()
+        if self._image is None or self._image.width() != rect.width() or self._image.height() != rect.height():
+            self._render(rect)
+        painter.drawImage(rect.topLeft(), self._image)
+        painter.setPen(QPen(QColor('#444')))
+        painter.drawRect(rect.adjusted(0, 0, -1, -1))
+        (x0, x1), (y0, y1) = self.x_limits, self.y_limits
+        for i in range(TICKS + 1):
+            fx = rect.left() + i * (rect.width() - 1) / TICKS
+            fy = rect.bottom() - i * (rect.height() - 1) / TICKS
+            painter.drawText(int(fx) - 30, rect.bottom() + 4, 60, 16, Qt.AlignmentFlag.AlignCenter,
+                             f"{x0 + i * (x1 - x0) / TICKS:.4g}")
+            painter.drawText(0, int(fy) - 8, MARGINS[0] - 6, 16, Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter,
+                             f"{y0 + i * (y1 - y0) / TICKS:.4g}")
+        painter.drawText(rect.left(), self.height() - 18, rect.width(), 16, Qt.AlignmentFlag.AlignCenter,
+                         "Scan speed")
+        painter.save()
+        painter.translate(12, rect.center().y())
+        painter.rotate(-90)
+        painter.drawText(-60, -8, 120, 16, Qt.AlignmentFlag.AlignCenter, "Power")
+        painter.restore()
+        if not len(self.index):
+            painter.drawText(rect, Qt.AlignmentFlag.AlignCenter, "No feature settings with power and speed")
+        painter.end()
+
+    def resizeEvent(self, event):
+        self._image = None
+        super().resizeEvent(event)
+
+    def mouseMoveEvent(self, event):
+        if self._pixels is None or not len(self.index):
+            return
+        rect = self.plot_rect()
+        mx, my = event.position().x() - rect.left(), event.position().y() - rect.top()
+        px, py = self._pixels
+        distance = (px - mx) ** 2 + (py - my) ** 2
+        nearest = int(np.argmin(distance))
+        if distance[nearest] > 36:
+            QToolTip.hideText()
+            return
+        row, data = self.index[nearest], self.data
+        code = data.feature_code[row]
+        feature = FEATURE_TYPES[code] if 0 <= code < len(FEATURE_TYPES) else '?'
+        energy = data.energy_density[row]
+        QToolTip.showText(event.globalPosition().toPoint(),
+                          f"Setting {data.setting_id[row]} - {feature}\n"
+                          f"Power {data.power[row]:.4g}, speed {data.scan_speed[row]:.4g}\n"
+                          f"E = {'n/a' if np.isnan(energy) else f'{energy:.4g}'} J/mm³ "
+                          f"({analytics.BAND_NAMES[data.band[row]]})", self)
+
+
+class ProcessMapWidget(QWidget):
+    """Tab with the process map and a feature filter"""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.version = None
+        self.data = None
+        layout = QVBoxLayout(self)
+        controls = QHBoxLayout()
+        controls.addWidget(QLabel("Feature:"))
+        self.feature_combo = QComboBox()
+        self.feature_combo.addItem("All features", None)
+        for code, feature_type in enumerate(FEATURE_TYPES):
+            self.feature_combo.addItem(feature_type.replace('_', ' ').title(), code)
+        self.feature_combo.currentIndexChanged.connect(self.update_points)
+        controls.addWidget(self.feature_combo)
+        controls.addStretch()
+        self.legend = QLabel()
+        controls.addWidget(self.legend)
+        layout.addLayout(controls)
+        self.canvas = ProcessMapCanvas()
+        layout.addWidget(self.canvas)
+        self.refresh()
+
+    @pyqtSlot()
+    @pyqtSlot(list)
+    def refresh(self, events=None):
+        """Reload if feature_settings changed since the last draw (one cheap read otherwise)"""
+        try:
+            data = analytics.process_data()
+        except Exception as e:
+            print(f"Error loading process map data: {e}")
+            return
+        if data.version == self.version and self.canvas.data is not None:
+            return
+        self.version = data.version
+        self.data = data
+        self.update_points()
+
+    def update_points(self):
+        data = self.data
+        if data is None:
+            return
+        mask = np.isfinite(data.power) & np.isfinite(data.scan_speed)
+        code = self.feature_combo.currentData()
+        if code is not None:
+            mask &= data.feature_code == code
+        self.canvas.set_points(data, mask)
+        counts = np.bincount(data.band[mask], minlength=len(analytics.BAND_NAMES))
+        self.legend.setText("   ".join(
+            f"<span style='color:#{int(color) & 0xFFFFFF:06x}'>&#9679;</span> {name}: {count}"
+            for name, color, count in zip(analytics.BAND_NAMES, BAND_COLORS, counts)))
@@ -0,0 +1,114 @@
+"""
+Registry of open detail windows
+
+Windows are keyed by (window class, entity id): asking for a window that is
+already open raises and focuses it instead of building a second one. Closed
+windows are either destroyed or, when cache_size > 0, kept hidden in a small
+LRU so reopening one is instant. The registry holds the only long-lived
+references, and drops them once Qt destroys a window.
+
+Hidden windows are a snapshot of the data they were built from, so any
+committed change empties the cache; open windows are left alone.
+"""
+
+from collections import OrderedDict
+from functools import partial
+
+from PyQt6.QtCore import QObject, QEvent, Qt, pyqtSlot
+
+from gui.change_notifier import get_change_notifier
+
+DEFAULT_CACHE_SIZE = 4
+
+
+class WindowRegistry(QObject):
+    def __init__(self, cache_size=DEFAULT_CACHE_SIZE, parent=None):
+        super().__init__(parent)
+        self.cache_size = cache_size
+        self._open = {}
+        self._hidden = OrderedDict()
+        get_change_notifier().changes.connect(self.on_changes)
+
+    def open(self, window_cls, entity_id, **kwargs):
+        """Show the window for entity_id, reusing an open or cached one"""
+        key = (window_cls, entity_id)
+        window = self._open.get(key) or self._hidden.pop(key, None)
+        if window is not None and 'edit_mode' in kwargs and getattr(window, 'edit_mode', None) != kwargs['edit_mode']:
+            # Built for the other mode; replace it
+            self._discard(key, window)
+            window = None
+        if window is None:
+            window = window_cls(entity_id, **kwargs)
+            self._track(key, window)
+        self._open[key] = window
+        if window.isMinimized():
+            window.showNormal()
+        else:
+            window.show()
+        window.raise_()
+        window.activateWindow()
+        return window
+
+    def get(self, window_cls, entity_id):
+        """The open window for entity_id, if any"""
+        return self._open.get((window_cls, entity_id))
+
+    def open_windows(self):
+        return list(self._open.values())
+
+    def clear_cache(self):
+        for key, window in list(self._hidden.items()):
+            self._discard(key, window)
+
+    @pyqtSlot(list)
+    def on_changes(self, events):
+        self.clear_cache()
+
+    def _track(self, key, window):
+        if self.cache_size <= 0:
+            window.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
+        window.installEventFilter(self)
+        window.destroyed.connect(partial(self._forget, key, id(window)))
+
+    def eventFilter(self, obj, event):
+        # Spontaneous hides come from the window system (e.g. minimising)
+        if event.type() == QEvent.Type.Hide and not event.spontaneous():
+            self._on_hidden(obj)
+        return False
+
+    def _on_hidden(self, window):
+        key = next((k for k, w in self._open.items() if w is window), None)
+        if key is None:
+            return
+        del self._open[key]
+        if self.cache_size <= 0:
+            return  # WA_DeleteOnClose destroys it
+        self._hidden[key] = window
+        while len(self._hidden) > self.cache_size:
+            old_key, old_window = self._hidden.popitem(last=False)
+            self._discard(old_key, old_window)
+
+    def _discard(self, key, window):
+        if self._open.get(key) is window:
+            del self._open[key]
+        if self._hidden.get(key) is window:
+            del self._hidden[key]
+        window.removeEventFilter(self)
+        window.close()
+        window.deleteLater()
+
+    def _forget(self, key, window_id, *args):
+        for windows in (self._open, self._hidden):
+            window = windows.get(key)
+            if window is not None and id(window) == window_id:
+                del windows[key]
+
+
+_window_registry = None
+
+
+def get_window_registry():
+    global _window_registry
+    if _window_registry is None:
+        _window_registry = WindowRegistry()
+    return _window_registry
@@ -0,0 +1,202 @@
+"""
+Single-writer queue for database writes coming from the GUI
+
+Edits and deletes are queued and applied on one background thread so the Qt
+main thread never waits on the SQLite write lock. Whatever has piled up
+while a transaction runs is applied together in the next one, and repeated
+updates to the same row are merged into a single UPDATE. Results come back
+through Qt signals, which are delivered on the main thread.
+
+With the database in WAL mode the GUI keeps reading its last committed
+snapshot while the writer works.
+"""
+
+import itertools
+import queue
+import threading
+
+from PyQt6.QtCore import QObject, pyqtSignal, pyqtSlot
+
+from database.connection import database
+
+_STOP = object()
+
+
+class _Operation:
+    def __init__(self, ticket, model_cls, pk, kind, values=None, fn=None):
+        self.tickets = [ticket]
+        self.model_cls = model_cls
+        self.pk = pk
+        self.kind = kind
+        self.values = dict(values or {})
+        self.fn = fn
+
+    @property
+    def key(self):
+        return (self.model_cls, self.pk)
+
+    def apply(self):
+        if self.kind == 'call':
+            self.fn()
+            return
+        pk_field = self.model_cls._meta.primary_key
+        if self.kind == 'update':
+            self.model_cls.update(**self.values).where(pk_field == self.pk).execute()
+        elif self.kind == 'delete':
+            self.model_cls.delete().where(pk_field == self.pk).execute()
+
+
+def _coalesce(operations):
+    """Merge consecutive updates of the same row; deletes and calls act as barriers"""
+    merged = []
+    pending_updates = {}
+    for op in operations:
+        if op.kind == 'update':
+            target = pending_updates.get(op.key)
+            if target is not None:
+                target.values.update(op.values)
+                target.tickets.extend(op.tickets)
+                continue
+            pending_updates[op.key] = op
+        elif op.kind == 'delete':
+            pending_updates.pop(op.key, None)
+        else:
+            pending_updates.clear()
+        merged.append(op)
+    return merged
+
+
+class WriteQueue(QObject):
+    """Background writer; submit_* methods return a ticket echoed by the signals
+
+    on_done, when given, is called on the main thread with True/False once
+    that particular write has been committed or has failed.
+    """
+    write_succeeded = pyqtSignal(int)
+    write_failed = pyqtSignal(int, str)
+    batch_committed = pyqtSignal(int)
+
+    def __init__(self, max_batch=500, parent=None):
+        super().__init__(parent)
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._tickets = itertools.count(1)
+        self._callbacks = {}
+        self.write_succeeded.connect(self._on_succeeded)
+        self.write_failed.connect(self._on_failed)
+        self._thread = threading.Thread(target=self._run, name='dmls-writer', daemon=True)
+        self._thread.start()
+
+    def submit_update(self, model_cls, pk, values, on_done=None):
+        return self._put(model_cls, pk, 'update', values=values, on_done=on_done)
+
+    def submit_delete(self, model_cls, pk, on_done=None):
+        return self._put(model_cls, pk, 'delete', on_done=on_done)
+
+    def submit_call(self, fn, on_done=None):
+        """Run fn on the writer thread inside the current write transaction"""
+        return self._put(None, None, 'call', fn=fn, on_done=on_done)
+
+    def save_fields(self, instance, on_done=None, **values):
+        """Apply values to a loaded model instance and queue the matching UPDATE"""
+        for name, value in values.items():
+            setattr(instance, name, value)
+        return self.submit_update(type(instance), instance.get_id(), values, on_done=on_done)
+
+    def delete_instance(self, instance, on_done=None):
+        return self.submit_delete(type(instance), instance.get_id(), on_done=on_done)
+
+    def flush(self):
+        """Block until everything submitted so far has been written"""
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait()
+
+    def stop(self):
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+
+    def _put(self, model_cls, pk, kind, values=None, fn=None, on_done=None):
+        ticket = next(self._tickets)
+        if on_done is not None:
+            self._callbacks[ticket] = on_done
+        self._queue.put(_Operation(ticket, model_cls, pk, kind, values, fn))
+        return ticket
+
+    # These slots run on the main thread: signals emitted by the writer are queued
+    @pyqtSlot(int)
+    def _on_succeeded(self, ticket):
+        self._finish(ticket, True)
+
+    @pyqtSlot(int, str)
+    def _on_failed(self, ticket, error):
+        self._finish(ticket, False)
+
+    def _finish(self, ticket, success):
+        callback = self._callbacks.pop(ticket, None)
+        if callback is not None:
+            callback(success)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            batch, events, stop = [], [], False
+            while True:
+                if item is _STOP:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    events.append(item)
+                else:
+                    batch.append(item)
+                if stop or len(batch) >= self.max_batch:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                self._write(_coalesce(batch))
+            for event in events:
+                event.set()
+            if stop:
+                database.close()
+                return
+
+    def _write(self, operations):
+        try:
+            with database.atomic():
+                for op in operations:
+                    op.apply()
+        except Exception:
+            # Something in the group failed; retry one by one so only the bad write is lost
+            for op in operations:
+                self._write_single(op)
+            return
+        for op in operations:
+            for ticket in op.tickets:
+                self.write_succeeded.emit(ticket)
+        self.batch_committed.emit(sum(len(op.tickets) for op in operations))
+
+    def _write_single(self, op):
+        try:
+            with database.atomic():
+                op.apply()
+        except Exception as e:
+            for ticket in op.tickets:
+                self.write_failed.emit(ticket, f"{type(e).__name__}: {e}")
+            return
+        for ticket in op.tickets:
+            self.write_succeeded.emit(ticket)
+        self.batch_committed.emit(len(op.tickets))
+
+
+_write_queue = None
+
+
+def get_write_queue():
+    """The application-wide writer, started on first use"""
+    global _write_queue
+    if _write_queue is None:
+        _write_queue = WriteQueue()
+    return _write_queue
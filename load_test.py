@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Load test for the local JSON API server
+
+Start the server first (python -m server), then e.g.:
+    python load_test.py --concurrency 32 --requests 5000
+    python load_test.py --etag --paths /api/builds /api/powders/316L-S312328-1-0
+
+Each client keeps one keep-alive connection open and issues GET requests
+round-robin over the given paths. With --etag the client replays the last
+ETag it saw for a path so the server can answer 304.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+DEFAULT_PATHS = ['/api/builds', '/api/powders', '/api/jobs', '/api/coupon-arrays',
+                 '/api/builds/1', '/api/coupon-arrays/1']
+
+
+async def _read_response(reader):
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("Server closed the connection")
+    status = int(status_line.split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get('content-length', 0))
+    if length:
+        await reader.readexactly(length)
+    return status, headers
+
+
+async def client(host, port, paths, count, use_etag, latencies, statuses):
+    reader, writer = await asyncio.open_connection(host, port)
+    etags = {}
+    try:
+        for i in range(count):
+            path = paths[i % len(paths)]
+            request = f"GET {path} HTTP/1.1\r\nHost: {host}\r\n"
+            if use_etag and path in etags:
+                request += f"If-None-Match: {etags[path]}\r\n"
+            start = time.perf_counter()
+            writer.write((request + "\r\n").encode('latin-1'))
+            await writer.drain()
+            status, headers = await _read_response(reader)
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+            if 'etag' in headers:
+                etags[path] = headers['etag']
+    finally:
+        writer.close()
+
+
+async def run(args):
+    latencies, statuses = [], {}
+    per_client = max(1, args.requests // args.concurrency)
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        client(args.host, args.port, args.paths, per_client, args.etag, latencies, statuses)
+        for _ in range(args.concurrency)])
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    pct = lambda p: latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000
+    print(f"{len(latencies)} requests in {elapsed:.2f}s ({len(latencies) / elapsed:.0f} req/s), "
+          f"concurrency {args.concurrency}")
+    print(f"latency ms: mean {statistics.mean(latencies) * 1000:.2f}  p50 {pct(0.50):.2f}  "
+          f"p95 {pct(0.95):.2f}  p99 {pct(0.99):.2f}  max {latencies[-1] * 1000:.2f}")
+    print("status counts: " + ", ".join(f"{k}: {v}" for k, v in sorted(statuses.items())))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the DMLS API server on localhost")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--etag', action='store_true', help="Send If-None-Match with the last seen ETag")
+    parser.add_argument('--paths', nargs='+', default=DEFAULT_PATHS)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
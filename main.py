@@ -6,17 +6,28 @@ Main application entry point
 
 import sys
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QTableWidget, QTableWidgetItem, 
-                             QVBoxLayout, QHBoxLayout, QWidget, QHeaderView, QTabWidget, QPushButton, QLabel, QToolBar, QStyle, QMessageBox)
+                             QVBoxLayout, QHBoxLayout, QWidget, QHeaderView, QTabWidget, QPushButton, QLabel, QToolBar, QStyle, QMessageBox,
+                             QAbstractItemView)
 from PyQt6.QtCore import Qt, QTimer, QSize
 from database.connection import init_database
 from models.builds.build import Build
 from models.jobs.job import Job
 from models.jobs.work_order import WorkOrder
+from models.jobs.part_resolver import resolve_parts
+from models.delete_plan import plan_delete, execute_plan
+from models.list_views import (BUILD_LIST, WORK_ORDER_LIST, JOB_LIST, SETTING_LIST,
+                               POWDER_LIST, PLATE_LIST, COUPON_ARRAY_LIST)
 from models.settings.setting import Setting
 from models.powders.powder import Powder
 from models.plates.plate import Plate
 from models.coupons.coupon_array import CouponArray
 from gui.detail_windows import PowderDetailWindow, SettingDetailWindow, CouponArrayDetailWindow, CouponDetailWindow, WorkOrderDetailWindow, JobDetailWindow
+from gui.write_queue import get_write_queue
+from gui.change_notifier import get_change_notifier
+from gui.window_registry import get_window_registry
+from gui.process_map import ProcessMapWidget
+from gui.filter_header import FilterHeader
+from database.change_bus import change_bus, EXTERNAL
 import peewee as pw
 
 
@@ -26,7 +37,7 @@ def find_non_nullable_dependencies(model_cls, pk):
     import peewee as pw
     dependencies = []
     obj = model_cls.get_by_id(pk)
-    from models.builds.build import Build
+    from models.settings.setting import Setting, FEATURE_TYPES
     from models.jobs.job import Job
     from models.jobs.work_order import WorkOrder
     from models.jobs.part_list import PartList
@@ -61,16 +72,18 @@ def find_non_nullable_dependencies(model_cls, pk):
     if isinstance(obj, Job):
         pass
     if isinstance(obj, Setting):
-        for field in [
-            'hatch_up_skin', 'hatch_infill', 'hatch_down_skin', 'contour_on_part',
-            'contour_standard', 'contour_down', 'edge', 'core', 'support']:
-            val = getattr(obj, field, None)
-            if val is not None:
+        features = obj.feature_map()
+        for field in FEATURE_TYPES:
+            if field in features:
                 dependencies.append(f"Setting (ID {obj.id}) - {field}")
     # Add more as needed for other models
     return dependencies
 
 
+# Rows fetched per query as a table is scrolled
+PAGE_SIZE = 200
+
+
 class DatabaseTableWidget(QTableWidget):
     """Reusable table widget for displaying database data"""
     def __init__(self, parent=None, model_cls=None, exclude_columns=None):
@@ -79,8 +92,105 @@ class DatabaseTableWidget(QTableWidget):
         self.exclude_columns = exclude_columns or []
         self.edit_mode = False
         self.delete_col_index = None
+        self.details_col_index = None
+        self.details_callback = None
+        # Primary key of each displayed row, kept in step with the rows
+        self.row_keys = []
+        self.list_view = None
+        self.depends_on = set()
+        # Sorting and filtering happen in SQL; rows arrive a page at a time
+        self.sort_column = None
+        self.sort_descending = False
+        self.filters = {}
+        self.has_more = False
+        self._last_row = None
         self._suppress_cell_changed = False
+        self.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
         self.cellChanged.connect(self._on_cell_changed)
+        self.verticalScrollBar().valueChanged.connect(self._on_scroll)
+
+    def set_list_view(self, list_view, depends_on=()):
+        """Load rows from a models.list_views.ListView.
+
+        Header clicks sort and the header's filter boxes filter, both in SQL;
+        more rows are fetched as the table is scrolled to the bottom.
+        depends_on lists other tables whose changes can alter what the rows
+        display.
+        """
+        self.list_view = list_view
+        self.depends_on = set(depends_on)
+        header = FilterHeader(self)
+        self.setHorizontalHeader(header)
+        header.set_filter_columns(len(list_view.columns),
+                                  [c for c in range(len(list_view.columns)) if list_view.filterable(c)])
+        header.setSortIndicator(-1, Qt.SortOrder.AscendingOrder)
+        header.sectionClicked.connect(self._on_header_clicked)
+        header.filters_changed.connect(self._on_filters_changed)
+
+    def _fetch(self, **options):
+        try:
+            return self.list_view.rows(sort=self.sort_column, descending=self.sort_descending,
+                                       filters=self.filters, **options)
+        except Exception as e:
+            # Typically a filter value the column can't compare against
+            print(f"Error loading rows: {e}")
+            return []
+
+    def fetch_page(self, limit=PAGE_SIZE):
+        """First limit rows in the current sort and filter order"""
+        rows = self._fetch(limit=limit)
+        self.has_more = len(rows) == limit
+        return rows
+
+    def fetch_more(self):
+        if not self.has_more or self._last_row is None:
+            return
+        after = self.list_view.sort_key(self._last_row, self.sort_column)
+        rows = self._fetch(after=after, limit=PAGE_SIZE)
+        self.has_more = len(rows) == PAGE_SIZE
+        self._suppress_cell_changed = True
+        try:
+            for row_data in rows:
+                self._append_row(row_data)
+        finally:
+            self._suppress_cell_changed = False
+
+    def reload(self, keep_loaded=False):
+        """Re-query from the top; keep_loaded re-fetches as many rows as are shown"""
+        scroll = self.verticalScrollBar().value()
+        rows = self.fetch_page(max(PAGE_SIZE, len(self.row_keys)) if keep_loaded else PAGE_SIZE)
+        self._suppress_cell_changed = True
+        try:
+            self.setRowCount(0)
+            self.row_keys = []
+            for row_data in rows:
+                self._append_row(row_data)
+        finally:
+            self._suppress_cell_changed = False
+        if keep_loaded:
+            self.verticalScrollBar().setValue(scroll)
+        else:
+            self.resizeColumnsToContents()
+
+    def _on_scroll(self, value):
+        if self.has_more and value >= self.verticalScrollBar().maximum() - 5:
+            self.fetch_more()
+
+    def _on_header_clicked(self, column):
+        if self.list_view is None or column >= len(self.list_view.columns) or not self.list_view.sortable(column):
+            return
+        if self.sort_column == column:
+            self.sort_descending = not self.sort_descending
+        else:
+            self.sort_column, self.sort_descending = column, False
+        order = Qt.SortOrder.DescendingOrder if self.sort_descending else Qt.SortOrder.AscendingOrder
+        self.horizontalHeader().setSortIndicator(column, order)
+        self.reload()
+
+    def _on_filters_changed(self, filters):
+        self.filters = filters
+        self.reload()
 
     def set_edit_mode(self, enabled):
         self.edit_mode = enabled
@@ -101,40 +211,62 @@ class DatabaseTableWidget(QTableWidget):
             self.setHorizontalHeaderItem(col, QTableWidgetItem(""))
             self.delete_col_index = col
             for row in range(self.rowCount()):
-                btn = QPushButton()
-                btn.setIcon(self.style().standardIcon(QStyle.StandardPixmap.SP_TrashIcon))
-                btn.setIconSize(QSize(24, 24))
-                btn.setStyleSheet("background-color: #c00; border-radius: 4px; margin: 2px;")
-                btn.setToolTip("Delete this row")
-                btn.clicked.connect(lambda _, r=row: self._confirm_delete(r))
-                self.setCellWidget(row, col, btn)
+                self._add_delete_button(row)
         self.resizeColumnsToContents()
 
-    def _confirm_delete(self, row):
-        pk = self.item(row, 0).text()
-        dependencies = find_non_nullable_dependencies(self.model_cls, pk)
+    def _add_delete_button(self, row):
+        btn = QPushButton()
+        btn.setIcon(self.style().standardIcon(QStyle.StandardPixmap.SP_TrashIcon))
+        btn.setIconSize(QSize(24, 24))
+        btn.setStyleSheet("background-color: #c00; border-radius: 4px; margin: 2px;")
+        btn.setToolTip("Delete this row")
+        btn.clicked.connect(lambda _, key=self.row_keys[row]: self._confirm_delete(key))
+        self.setCellWidget(row, self.delete_col_index, btn)
+
+    def selected_keys(self):
+        return [self.row_keys[row] for row in sorted({index.row() for index in self.selectedIndexes()})]
+
+    def keyPressEvent(self, event):
+        if (event.key() == Qt.Key.Key_Delete and self.edit_mode and self.model_cls
+                and self.state() != QAbstractItemView.State.EditingState and self.selected_keys()):
+            self._confirm_delete_rows(self.selected_keys())
+            return
+        super().keyPressEvent(event)
+
+    def _confirm_delete(self, key):
+        # The trash button deletes the whole selection when its row is part of it
+        selected = self.selected_keys()
+        self._confirm_delete_rows(selected if key in selected else [key])
+
+    def _confirm_delete_rows(self, keys):
+        plan = plan_delete(self.model_cls, keys)
         msg = QMessageBox(self)
         msg.setIcon(QMessageBox.Icon.Warning)
         msg.setWindowTitle("Confirm Delete")
-        warn_text = "Are you sure you want to delete this item?"
-        if dependencies:
-            warn_text += "\n\nWarning: This item is referenced by the following (deletion will break these references):\n"
-            for dep in dependencies:
-                warn_text += f"- {dep}\n"
+        if len(keys) == 1:
+            warn_text = "Are you sure you want to delete this item?"
+        else:
+            warn_text = f"Are you sure you want to delete these {len(keys)} items?"
+        warn_text += "\n\nThis will:\n" + "".join(f"- {line}\n" for line in plan.summary())
+        if plan.broken:
+            warn_text += "\nDangling references can be repaired later from the integrity check."
         msg.setText(warn_text)
         msg.setStandardButtons(QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
         msg.setDefaultButton(QMessageBox.StandardButton.No)
         msg.setStyleSheet("QLabel{min-width:250px; font-size:14px;} QPushButton{min-width:60px;}")
         reply = msg.exec()
         if reply == QMessageBox.StandardButton.Yes:
-            self._delete_row(row)
+            self._delete_rows(plan, keys)
 
-    def _delete_row(self, row):
-        if self.model_cls:
-            pk = self.item(row, 0).text()
-            obj = self.model_cls.get_by_id(pk)
-            obj.delete_instance()
-            self.removeRow(row)
+    def _delete_rows(self, plan, keys):
+        def on_done(success):
+            if not success:
+                QMessageBox.warning(self, "Delete Failed", "Could not delete the selected rows.")
+                self.reload(keep_loaded=True)
+        get_write_queue().submit_call(lambda: execute_plan(plan), on_done=on_done)
+        for key in keys:
+            if key in self.row_keys:
+                self._remove_row(self.row_keys.index(key))
 
     def _on_cell_changed(self, row, col):
         if self._suppress_cell_changed or not self.edit_mode:
@@ -142,61 +274,37 @@ class DatabaseTableWidget(QTableWidget):
         if self.delete_col_index is not None and col == self.delete_col_index:
             return
         if self.model_cls:
-            pk = self.item(row, 0).text()
-            obj = self.model_cls.get_by_id(pk)
-            field = self.horizontalHeaderItem(col).text().lower().replace(" ", "_")
+            pk = self.row_keys[row]
+            name = self.horizontalHeaderItem(col).text().lower().replace(" ", "_")
+            meta = self.model_cls._meta
+            field = meta.fields.get(name) or meta.columns.get(name)
+            if field is None:
+                return
             value = self.item(row, col).text()
             # Type conversion for booleans
-            if hasattr(obj, field):
-                attr = getattr(obj, field)
-                if isinstance(attr, bool):
-                    value = value.lower() in ("yes", "true", "1")
-                setattr(obj, field, value)
-                obj.save()
+            if isinstance(field, pw.BooleanField):
+                value = value.lower() in ("yes", "true", "1")
+            # Queued for the writer thread so the UI never waits on a lock
+            get_write_queue().submit_update(self.model_cls, pk, {field.name: value})
 
     def load_data(self, headers, data, add_details_column=False, details_callback=None):
         self._suppress_cell_changed = True
         # Remove details column from editable columns
         self.exclude_columns = []
-        details_col_index = None
+        self.details_col_index = None
+        self.details_callback = details_callback if add_details_column else None
         if add_details_column:
             headers = headers + ["Details"]
-            details_col_index = len(headers) - 1
-            self.exclude_columns.append(details_col_index)
+            self.details_col_index = len(headers) - 1
+            self.exclude_columns.append(self.details_col_index)
+        self.delete_col_index = None
         super().setColumnCount(len(headers))
         super().setHorizontalHeaderLabels(headers)
         super().setRowCount(len(data))
+        self.row_keys = [row_data[0] for row_data in data]
+        self._last_row = data[-1] if data else None
         for row, row_data in enumerate(data):
-            for col, value in enumerate(row_data):
-                item = QTableWidgetItem(str(value))
-                if col in self.exclude_columns:
-                    item.setFlags(item.flags() & ~Qt.ItemFlag.ItemIsEditable)
-                super().setItem(row, col, item)
-            if add_details_column and details_callback:
-                details_label = QLabel("Details")
-                details_label.setStyleSheet("""
-                    QLabel {
-                        background-color: rgba(0, 60, 100, 0.8);
-                        color: white;
-                        padding: 2px 6px;
-                        border-radius: 2px;
-                        font-size: 10px;
-                        border: 1px solid #666666;
-                        margin: 2px;
-                    }
-                    QLabel:hover {
-                        background-color: rgba(0, 80, 140, 0.9);
-                    }
-                """)
-                details_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-                details_label.setCursor(Qt.CursorShape.PointingHandCursor)
-                def make_mouse_press_event(row):
-                    def mousePressEvent(event):
-                        if event.button() == Qt.MouseButton.LeftButton:
-                            details_callback(row)
-                    return mousePressEvent
-                details_label.mousePressEvent = make_mouse_press_event(row)
-                super().setCellWidget(row, details_col_index, details_label)
+            self._populate_row(row, row_data)
         self._suppress_cell_changed = False
         self._update_delete_column()
         if self.edit_mode:
@@ -205,6 +313,94 @@ class DatabaseTableWidget(QTableWidget):
             self.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
         self.resizeColumnsToContents()
 
+    def _populate_row(self, row, row_data):
+        for col, value in enumerate(row_data):
+            item = QTableWidgetItem(str(value))
+            if col in self.exclude_columns:
+                item.setFlags(item.flags() & ~Qt.ItemFlag.ItemIsEditable)
+            super().setItem(row, col, item)
+        if self.details_callback:
+            details_label = QLabel("Details")
+            details_label.setStyleSheet("""
+                QLabel {
+                    background-color: rgba(0, 60, 100, 0.8);
+                    color: white;
+                    padding: 2px 6px;
+                    border-radius: 2px;
+                    font-size: 10px;
+                    border: 1px solid #666666;
+                    margin: 2px;
+                }
+                QLabel:hover {
+                    background-color: rgba(0, 80, 140, 0.9);
+                }
+            """)
+            details_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+            details_label.setCursor(Qt.CursorShape.PointingHandCursor)
+            # Capture the key, not the row index: rows move as changes are applied
+            def make_mouse_press_event(key):
+                def mousePressEvent(event):
+                    if event.button() == Qt.MouseButton.LeftButton:
+                        self.details_callback(key)
+                return mousePressEvent
+            details_label.mousePressEvent = make_mouse_press_event(row_data[0])
+            super().setCellWidget(row, self.details_col_index, details_label)
+
+    def apply_changes(self, events):
+        """Bring the rows up to date with change bus events, touching only rows that changed"""
+        if self.list_view is None or self.model_cls is None:
+            return
+        meta = self.model_cls._meta
+        table = meta.table_name
+        # rowid only identifies the row when the primary key is the rowid
+        rowid_is_key = isinstance(meta.primary_key, pw.AutoField)
+        changed, deleted = set(), set()
+        for event in events:
+            if event.op == EXTERNAL or event.table in self.depends_on or (event.table == table and not rowid_is_key):
+                self.reload(keep_loaded=True)
+                return
+            if event.table == table:
+                (deleted if event.op == 'DELETE' else changed).add(event.rowid)
+        if not changed and not deleted:
+            return
+        # Rows that no longer match the filters come back missing and are removed
+        rows = self._fetch(keys=list(changed)) if changed else []
+        found = {row_data[0] for row_data in rows}
+        for key in (deleted | changed) - found:
+            if key in self.row_keys:
+                self._remove_row(self.row_keys.index(key))
+        positions = {key: row for row, key in enumerate(self.row_keys)}
+        # New rows, or rows whose sort value moved, need re-querying to land in order
+        for row_data in rows:
+            row = positions.get(row_data[0])
+            if row is None or (self.sort_column and
+                               self.item(row, self.sort_column).text() != str(row_data[self.sort_column])):
+                self.reload(keep_loaded=True)
+                return
+        self._suppress_cell_changed = True
+        try:
+            for row_data in rows:
+                row = positions[row_data[0]]
+                for col, value in enumerate(row_data):
+                    item = self.item(row, col)
+                    if item is None or item.text() != str(value):
+                        self.setItem(row, col, QTableWidgetItem(str(value)))
+        finally:
+            self._suppress_cell_changed = False
+
+    def _append_row(self, row_data):
+        row = self.rowCount()
+        self.insertRow(row)
+        self.row_keys.append(row_data[0])
+        self._last_row = row_data
+        self._populate_row(row, row_data)
+        if self.delete_col_index is not None:
+            self._add_delete_button(row)
+
+    def _remove_row(self, row):
+        self.removeRow(row)
+        del self.row_keys[row]
+
 
 class DatabaseViewerWindow(QMainWindow):
     def __init__(self):
@@ -212,8 +408,13 @@ class DatabaseViewerWindow(QMainWindow):
         self.setWindowTitle("DMLS Database Viewer")
         self.setGeometry(100, 100, 1400, 800)
         
-        # Store detail windows to prevent garbage collection
-        self.detail_windows = []
+        # Detail windows are kept (and reused) by the window registry
+        self.window_registry = get_window_registry()
+        
+        # Report background write results
+        write_queue = get_write_queue()
+        write_queue.batch_committed.connect(self.on_writes_committed)
+        write_queue.write_failed.connect(self.on_write_failed)
         
         # Create central widget and layout
         central_widget = QWidget()
@@ -240,6 +441,13 @@ class DatabaseViewerWindow(QMainWindow):
         self.edit_btn.setToolTip("Toggle edit mode for all tables")
         self.edit_btn.toggled.connect(self.toggle_edit_mode)
         self.toolbar.addWidget(self.edit_btn)
+        self.integrity_btn = QPushButton()
+        self.integrity_btn.setIcon(self.style().standardIcon(QStyle.StandardPixmap.SP_MessageBoxWarning))
+        self.integrity_btn.setIconSize(QSize(32, 32))
+        self.integrity_btn.setFixedSize(40, 40)
+        self.integrity_btn.setToolTip("Check for references to deleted rows")
+        self.integrity_btn.clicked.connect(self.show_integrity_check)
+        self.toolbar.addWidget(self.integrity_btn)
         
         # Create tab widget
         self.tab_widget = QTabWidget()
@@ -254,7 +462,11 @@ class DatabaseViewerWindow(QMainWindow):
         self.create_powders_tab()
         self.create_plates_tab()
         self.create_coupon_arrays_tab()
+        self.create_process_map_tab()
         self.update_create_button_tooltip()
+        
+        # Keep the tabs current as rows change
+        get_change_notifier().changes.connect(self.on_database_changes)
     
     def create_builds_tab(self):
         """Create tab for builds table"""
@@ -265,42 +477,20 @@ class DatabaseViewerWindow(QMainWindow):
         self.builds_table = table
         
         try:
-            builds = Build.select()
-            if builds.exists():
-                headers = [
-                    "ID", "Name", "Description", "DateTime", 
-                    "Powder Weight Required", "Powder Weight Loaded",
-                    "Powder ID", "Setting ID", "Plate Description", "Coupon Array ID"
-                ]
-                data = []
-                for build in builds:
-                    try:
-                        powder_id = build.powder.id if build.powder else 'None'
-                    except Exception:
-                        powder_id = 'Missing (deleted)'
-                    try:
-                        setting_id = build.setting.id if build.setting else 'None'
-                    except Exception:
-                        setting_id = 'Missing (deleted)'
-                    try:
-                        plate_description = build.plate.description if build.plate else 'None'
-                    except Exception:
-                        plate_description = 'Missing (deleted)'
-                    try:
-                        coupon_array_id = build.coupon_array.id if build.coupon_array else 'None'
-                    except Exception:
-                        coupon_array_id = 'Missing (deleted)'
-                    data.append([
-                        build.id, build.name, build.description, build.datetime,
-                        build.powder_weight_required, build.powder_weight_loaded,
-                        powder_id, setting_id, plate_description, coupon_array_id
-                    ])
-                table.load_data(headers, data)
-                
-                # Add double-click functionality for setting ID column (column 7)
-                table.cellDoubleClicked.connect(self.on_build_table_double_click)
-                
-                print(f"Loaded {len(data)} builds")
+            headers = [
+                "ID", "Name", "Description", "DateTime", 
+                "Powder Weight Required", "Powder Weight Loaded",
+                "Powder ID", "Setting ID", "Plate Description", "Coupon Array ID", "Jobs"
+            ]
+            # Rows show values from these tables too, so their changes refresh the tab
+            table.set_list_view(BUILD_LIST, depends_on=('plates', 'jobs'))
+            data = table.fetch_page()
+            table.load_data(headers, data)
+            
+            # Add double-click functionality for setting ID column (column 7)
+            table.cellDoubleClicked.connect(self.on_build_table_double_click)
+            
+            print(f"Loaded {len(data)} builds")
         except Exception as e:
             print(f"Error loading builds: {e}")
     
@@ -309,26 +499,13 @@ class DatabaseViewerWindow(QMainWindow):
         table = DatabaseTableWidget(model_cls=WorkOrder)
         self.tab_widget.addTab(table, "Work Orders")
         try:
-            work_orders = WorkOrder.select()
-            if work_orders.exists():
-                headers = ["ID", "Name", "Description", "PVID", "Part List"]
-                data = []
-                for wo in work_orders:
-                    try:
-                        part_list_id = wo.part_list.id if wo.part_list else 'None'
-                    except Exception:
-                        part_list_id = 'None'
-                    data.append([
-                        wo.id, wo.name, wo.description, wo.pvid,
-                        part_list_id
-                    ])
-                def work_order_details_callback(row):
-                    wo_id = data[row][0]
-                    window = WorkOrderDetailWindow(wo_id, edit_mode=self.edit_mode)
-                    self.detail_windows.append(window)
-                    window.show()
-                table.load_data(headers, data, add_details_column=True, details_callback=work_order_details_callback)
-                print(f"Loaded {len(data)} work orders")
+            headers = ["ID", "Name", "Description", "PVID", "Part List", "Jobs"]
+            table.set_list_view(WORK_ORDER_LIST, depends_on=('jobs',))
+            data = table.fetch_page()
+            def work_order_details_callback(wo_id):
+                self.window_registry.open(WorkOrderDetailWindow, wo_id, edit_mode=self.edit_mode)
+            table.load_data(headers, data, add_details_column=True, details_callback=work_order_details_callback)
+            print(f"Loaded {len(data)} work orders")
         except Exception as e:
             print(f"Error loading work orders: {e}")
     
@@ -337,35 +514,13 @@ class DatabaseViewerWindow(QMainWindow):
         table = DatabaseTableWidget(model_cls=Job)
         self.tab_widget.addTab(table, "Jobs")
         try:
-            jobs = Job.select()
-            if jobs.exists():
-                headers = ["ID", "Name", "Description", "Part List", "Work Order ID", "Build ID"]
-                data = []
-                for job in jobs:
-                    try:
-                        part_list_id = job.part_list.id if job.part_list else 'None'
-                    except Exception:
-                        part_list_id = 'None'
-                    try:
-                        work_order_id = job.work_order.id if job.work_order else 'None'
-                    except Exception:
-                        work_order_id = 'None'
-                    try:
-                        build_id = job.build.id if job.build else 'None'
-                    except Exception:
-                        build_id = 'None'
-                    data.append([
-                        job.id, job.name, job.description, part_list_id,
-                        work_order_id,
-                        build_id
-                    ])
-                def job_details_callback(row):
-                    job_id = data[row][0]
-                    window = JobDetailWindow(job_id, edit_mode=self.edit_mode)
-                    self.detail_windows.append(window)
-                    window.show()
-                table.load_data(headers, data, add_details_column=True, details_callback=job_details_callback)
-                print(f"Loaded {len(data)} jobs")
+            headers = ["ID", "Name", "Description", "Part List", "Work Order ID", "Build ID"]
+            table.set_list_view(JOB_LIST)
+            data = table.fetch_page()
+            def job_details_callback(job_id):
+                self.window_registry.open(JobDetailWindow, job_id, edit_mode=self.edit_mode)
+            table.load_data(headers, data, add_details_column=True, details_callback=job_details_callback)
+            print(f"Loaded {len(data)} jobs")
         except Exception as e:
             print(f"Error loading jobs: {e}")
     
@@ -375,22 +530,16 @@ class DatabaseViewerWindow(QMainWindow):
         self.tab_widget.addTab(table, "Settings")
         
         try:
-            settings = Setting.select()
-            if settings.exists():
-                headers = ["ID", "Name", "Description", "Is Preset"]
-                data = []
-                for setting in settings:
-                    data.append([
-                        setting.id, setting.name, setting.description, setting.is_preset
-                    ])
-                
-                # Create callback function for details buttons
-                def settings_details_callback(row):
-                    setting_id = data[row][0]  # ID is first column
-                    self.show_setting_details(setting_id)
-                
-                table.load_data(headers, data, add_details_column=True, details_callback=settings_details_callback)
-                print(f"Loaded {len(data)} settings")
+            headers = ["ID", "Name", "Description", "Is Preset"]
+            table.set_list_view(SETTING_LIST)
+            data = table.fetch_page()
+            
+            # Create callback function for details buttons
+            def settings_details_callback(setting_id):
+                self.show_setting_details(setting_id)
+            
+            table.load_data(headers, data, add_details_column=True, details_callback=settings_details_callback)
+            print(f"Loaded {len(data)} settings")
         except Exception as e:
             print(f"Error loading settings: {e}")
     
@@ -400,23 +549,16 @@ class DatabaseViewerWindow(QMainWindow):
         self.tab_widget.addTab(table, "Powders")
         
         try:
-            powders = Powder.select()
-            if powders.exists():
-                headers = ["ID", "Description", "Material ID", "Manufacturer Lot", "Subgroup", "Revision", "Initiation Timestamp", "Quantity (Kg)"]
-                data = []
-                for powder in powders:
-                    data.append([
-                        powder.id, powder.description, powder.mat_id, powder.man_lot,
-                        powder.subgroup, powder.rev, powder.init_date_time, powder.quantity
-                    ])
-                
-                # Create callback function for details buttons
-                def powders_details_callback(row):
-                    powder_id = data[row][0]  # ID is first column
-                    self.show_powder_details(powder_id)
-                
-                table.load_data(headers, data, add_details_column=True, details_callback=powders_details_callback)
-                print(f"Loaded {len(data)} powders")
+            headers = ["ID", "Description", "Material ID", "Manufacturer Lot", "Subgroup", "Revision", "Initiation Timestamp", "Quantity (Kg)"]
+            table.set_list_view(POWDER_LIST)
+            data = table.fetch_page()
+            
+            # Create callback function for details buttons
+            def powders_details_callback(powder_id):
+                self.show_powder_details(powder_id)
+            
+            table.load_data(headers, data, add_details_column=True, details_callback=powders_details_callback)
+            print(f"Loaded {len(data)} powders")
         except Exception as e:
             print(f"Error loading powders: {e}")
     
@@ -426,17 +568,11 @@ class DatabaseViewerWindow(QMainWindow):
         self.tab_widget.addTab(table, "Plates")
         
         try:
-            plates = Plate.select()
-            if plates.exists():
-                headers = ["ID", "Description", "Material", "Foreign Keys", "Stamped Heights"]
-                data = []
-                for plate in plates:
-                    data.append([
-                        plate.id, plate.description, plate.material,
-                        str(plate.foreign_keys_list), str(plate.stamped_heights)
-                    ])
-                table.load_data(headers, data)
-                print(f"Loaded {len(data)} plates")
+            headers = ["ID", "Description", "Material", "Foreign Keys", "Stamped Heights"]
+            table.set_list_view(PLATE_LIST)
+            data = table.fetch_page()
+            table.load_data(headers, data)
+            print(f"Loaded {len(data)} plates")
         except Exception as e:
             print(f"Error loading plates: {e}")
     
@@ -446,32 +582,40 @@ class DatabaseViewerWindow(QMainWindow):
         self.tab_widget.addTab(table, "Coupon Arrays")
         
         try:
-            coupon_arrays = CouponArray.select()
-            if coupon_arrays.exists():
-                headers = ["ID", "Name", "Description", "Is Preset", "Coupon Count"]
-                data = []
-                for ca in coupon_arrays:
-                    # Count non-None coupons
-                    coupon_count = sum(1 for i in range(1, 257) if getattr(ca, f'coupon_{i}', None) is not None)
-                    data.append([ca.id, ca.name, ca.description, ca.is_preset, coupon_count])
-                
-                # Create callback function for details buttons
-                def coupon_arrays_details_callback(row):
-                    coupon_array_id = data[row][0]  # ID is first column
-                    self.show_coupon_array_details(coupon_array_id)
-                
-                table.load_data(headers, data, add_details_column=True, details_callback=coupon_arrays_details_callback)
-                print(f"Loaded {len(data)} coupon arrays")
+            headers = ["ID", "Name", "Description", "Is Preset", "Coupon Count"]
+            table.set_list_view(COUPON_ARRAY_LIST)
+            data = table.fetch_page()
+            
+            # Create callback function for details buttons
+            def coupon_arrays_details_callback(coupon_array_id):
+                self.show_coupon_array_details(coupon_array_id)
+            
+            table.load_data(headers, data, add_details_column=True, details_callback=coupon_arrays_details_callback)
+            print(f"Loaded {len(data)} coupon arrays")
         except Exception as e:
             print(f"Error loading coupon arrays: {e}")
     
+    def create_process_map_tab(self):
+        """Create tab plotting power against scan speed for all feature settings"""
+        self.process_map = ProcessMapWidget()
+        self.tab_widget.addTab(self.process_map, "Process Map")
+        get_change_notifier().changes.connect(self.process_map.refresh)
+    
+    def on_database_changes(self, events):
+        """Apply committed changes (from this or another process) to the open tabs"""
+        for i in range(self.tab_widget.count()):
+            widget = self.tab_widget.widget(i)
+            if isinstance(widget, DatabaseTableWidget):
+                try:
+                    widget.apply_changes(events)
+                except Exception as e:
+                    print(f"Error refreshing {self.tab_widget.tabText(i)}: {e}")
+    
     def show_powder_details(self, powder_id):
         """Show powder details (composition and results)"""
         try:
             print(f"Opening powder details for ID: {powder_id}")
-            window = PowderDetailWindow(powder_id, edit_mode=self.edit_mode)
-            self.detail_windows.append(window)  # Store reference to prevent garbage collection
-            window.show()
+            self.window_registry.open(PowderDetailWindow, powder_id, edit_mode=self.edit_mode)
         except Exception as e:
             print(f"Error showing powder details: {e}")
     
@@ -479,9 +623,7 @@ class DatabaseViewerWindow(QMainWindow):
         """Show setting details"""
         try:
             print(f"Opening setting details for ID: {setting_id}")
-            window = SettingDetailWindow(setting_id, edit_mode=self.edit_mode)
-            self.detail_windows.append(window)  # Store reference to prevent garbage collection
-            window.show()
+            self.window_registry.open(SettingDetailWindow, setting_id, edit_mode=self.edit_mode)
         except Exception as e:
             print(f"Error showing setting details: {e}")
     
@@ -489,9 +631,7 @@ class DatabaseViewerWindow(QMainWindow):
         """Show coupon array details"""
         try:
             print(f"Opening coupon array details for ID: {coupon_array_id}")
-            window = CouponArrayDetailWindow(coupon_array_id)
-            self.detail_windows.append(window)  # Store reference to prevent garbage collection
-            window.show()
+            self.window_registry.open(CouponArrayDetailWindow, coupon_array_id)
         except Exception as e:
             print(f"Error showing coupon array details: {e}")
     
@@ -517,12 +657,8 @@ class DatabaseViewerWindow(QMainWindow):
             preset_label = QLabel(f"Preset: {'Yes' if part_list.is_preset else 'No'}")
             preset_label.setStyleSheet("font-size: 13px; margin: 0 10px 10px 10px;")
             layout.addWidget(preset_label)
-            # Collect all non-null parts
-            parts = []
-            for i in range(128):
-                part = getattr(part_list, f'part_{i+1}', None)
-                if part:
-                    parts.append(part)
+            # All filled slots with one parts query
+            parts = resolve_parts(part_list)
             if not parts:
                 layout.addWidget(QLabel("No parts in this Part List."))
             else:
@@ -581,6 +717,20 @@ class DatabaseViewerWindow(QMainWindow):
             import traceback
             traceback.print_exc()
 
+    def on_writes_committed(self, count):
+        self.statusBar().showMessage(f"Saved {count} change{'s' if count != 1 else ''}", 3000)
+
+    def on_write_failed(self, ticket, error):
+        print(f"Write {ticket} failed: {error}")
+        QMessageBox.warning(self, "Save Failed", f"A change could not be saved to the database:\n\n{error}")
+
+    def show_integrity_check(self):
+        """Scan every foreign key for dangling references in the background"""
+        from gui.integrity_dialog import IntegrityDialog
+        dialog = IntegrityDialog(self)
+        dialog.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
+        dialog.show()
+
     def toggle_edit_mode(self, checked):
         self.edit_mode = checked
         for i in range(self.tab_widget.count()):
@@ -605,13 +755,17 @@ def main():
     app.setApplicationName("DMLS Powder Tracking Manager")
     app.setApplicationVersion("1.0.0")
     
-    # Initialize database
+    # Initialize database (change hooks must be registered before connecting)
+    change_bus.install()
     init_database()
     
     # Create and show database viewer window
     window = DatabaseViewerWindow()
     window.show()
     
+    # Let queued writes finish before the process exits
+    app.aboutToQuit.connect(get_write_queue().stop)
+    
     sys.exit(app.exec())
 
 
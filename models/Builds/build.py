@@ -7,8 +7,8 @@ from models.coupons.coupon_array import CouponArray
 
 class Build(BaseModel):
     id = pw.AutoField()
-    datetime = pw.DateTimeField()
-    name = pw.CharField()
+    datetime = pw.DateTimeField(index=True)
+    name = pw.CharField(index=True)
     description = pw.CharField()
     powder_weight_required = pw.FloatField(null=True)
     powder_weight_loaded = pw.FloatField(null=True)
@@ -0,0 +1,349 @@
+"""
+Machine build logs attached to builds, stored as per-layer chunks of typed arrays
+
+A machine log is a delimited text file (comma, semicolon or tab) with a
+header row, one sample per line:
+    layer       layer number (column 'layer', 'layer_number' or 'layer_no')
+    timestamp   epoch seconds or ISO 8601 ('timestamp', 'time' or 'datetime')
+    ...         any number of numeric channels: oxygen level, recoater
+                events (0/1), laser power, ...
+Empty or non-numeric cells become NaN.
+
+ingest_log() memory-maps the file and parses it a block of lines at a time
+with np.loadtxt, so memory stays bounded by the block size and the chunk
+size rather than the log size. Samples are grouped into chunks of
+LAYERS_PER_CHUNK consecutive layers. Each chunk is stored as one
+build_log_chunks row holding an np.save'd structured array: layer int32,
+time float64 (epoch seconds), one float32 per channel. Chunks are indexed
+by (log, first_layer), so a range such as layers 800-900 of a build reads
+only the two or three chunks that overlap it.
+
+A build can have several logs (a restarted job); the same file is only
+ingested once per build, recognised by its content hash.
+"""
+
+import hashlib
+import io
+import mmap
+import re
+from collections import namedtuple
+from datetime import datetime
+
+import numpy as np
+import peewee as pw
+
+from database.connection import database
+from models.base import BaseModel
+from models.builds.build import Build
+
+LAYERS_PER_CHUNK = 50
+# Bytes of log text parsed at a time (cut at a line end)
+BLOCK_BYTES = 8 << 20
+
+LAYER_COLUMNS = ('layer', 'layer_number', 'layer_no')
+TIME_COLUMNS = ('timestamp', 'time', 'datetime')
+
+# An empty cell: between two delimiters, or between a delimiter and the line start/end
+_EMPTY_CELLS = {delimiter: re.compile(rb'(?<=%s)(?=%s|\r?$)|^(?=%s)' % ((re.escape(delimiter.encode()),) * 3),
+                                      re.MULTILINE)
+                for delimiter in (',', ';', '\t')}
+
+# One layer of layer_summary(); channel statistics are dicts keyed by channel name
+LayerSummary = namedtuple('LayerSummary', ['layer', 'start', 'duration', 'samples', 'mean', 'max'])
+
+
+class BuildLog(BaseModel):
+    id = pw.AutoField()
+    build = pw.ForeignKeyField(Build, backref='logs', on_delete='CASCADE')
+    path = pw.CharField()
+    content_hash = pw.CharField()
+    channels = pw.CharField()  # channel names, comma separated, in array order
+    first_layer = pw.IntegerField(null=True)
+    last_layer = pw.IntegerField(null=True)
+    samples = pw.IntegerField(default=0)
+    ingested_at = pw.DateTimeField()
+
+    class Meta:
+        table_name = 'build_logs'
+        indexes = (
+            (('build', 'content_hash'), True),
+        )
+
+    def channel_names(self):
+        return self.channels.split(',') if self.channels else []
+
+
+class BuildLogChunk(BaseModel):
+    id = pw.AutoField()
+    log = pw.ForeignKeyField(BuildLog, backref='chunks', on_delete='CASCADE')
+    first_layer = pw.IntegerField()
+    last_layer = pw.IntegerField()
+    samples = pw.IntegerField()
+    data = pw.BlobField()  # np.save of the chunk's structured array
+
+    class Meta:
+        table_name = 'build_log_chunks'
+        indexes = (
+            (('log', 'first_layer'), False),
+        )
+
+
+def sample_dtype(channels):
+    return np.dtype([('layer', '<i4'), ('time', '<f8')] + [(name, '<f4') for name in channels])
+
+
+def _encode(samples):
+    buffer = io.BytesIO()
+    np.save(buffer, samples, allow_pickle=False)
+    return buffer.getvalue()
+
+
+def _decode(data):
+    return np.load(io.BytesIO(data), allow_pickle=False)
+
+
+def _header(line):
+    text = line.decode('utf-8-sig').strip()
+    delimiter = max((',', ';', '\t'), key=text.count)
+    names = [name.strip().lower().replace(' ', '_') for name in text.split(delimiter)]
+    layer = next((names.index(name) for name in LAYER_COLUMNS if name in names), None)
+    when = next((names.index(name) for name in TIME_COLUMNS if name in names), None)
+    if layer is None or when is None:
+        raise ValueError(f"Log header needs a layer column ({', '.join(LAYER_COLUMNS)}) "
+                         f"and a time column ({', '.join(TIME_COLUMNS)})")
+    return delimiter, names, layer, when
+
+
+def _numbers(block, delimiter, columns):
+    """(rows, len(columns)) float array of block's columns"""
+    try:
+        filled = _EMPTY_CELLS[delimiter].sub(b'nan', block)
+        return np.loadtxt(io.BytesIO(filled), delimiter=delimiter, usecols=columns, dtype=np.float64, ndmin=2,
+                          encoding='utf-8')
+    except ValueError:
+        pass
+    # Text in a numeric column: fall back to a cell at a time
+    rows = []
+    for line in block.decode('utf-8').splitlines():
+        if not line.strip():
+            continue
+        cells = line.split(delimiter)
+        row = []
+        for column in columns:
+            try:
+                row.append(float(cells[column]))
+            except (IndexError, ValueError):
+                row.append(np.nan)
+        rows.append(row)
+    return np.array(rows, dtype=np.float64).reshape(-1, len(columns))
+
+
+def _iso_times(block, delimiter, column):
+    """Epoch seconds of an ISO 8601 time column"""
+    text = np.loadtxt(io.BytesIO(block), delimiter=delimiter, usecols=[column], dtype='U40', ndmin=1,
+                      encoding='utf-8')
+    stamps = np.char.replace(np.char.strip(text), ' ', 'T').astype('datetime64[ms]')
+    return stamps.astype(np.int64) / 1000.0
+
+
+def _blocks(mapped, start, block_bytes):
+    while start < len(mapped):
+        end = start + block_bytes
+        if end >= len(mapped):
+            end = len(mapped)
+        else:
+            cut = mapped.rfind(b'\n', start, end)
+            if cut < 0:
+                # A line longer than a block
+                cut = mapped.find(b'\n', end)
+            end = len(mapped) if cut < 0 else cut + 1
+        block = mapped[start:end]
+        start = end
+        if block.strip():
+            yield block
+
+
+def read_log(path, block_bytes=BLOCK_BYTES):
+    """(channels, iterator of structured sample arrays), one array per block of lines"""
+    f = open(path, 'rb')
+    try:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except ValueError:
+        f.close()
+        raise ValueError(f"{path} is empty")
+    try:
+        header_end = mapped.find(b'\n') + 1 or len(mapped)
+        delimiter, names, layer, when = _header(mapped[:header_end])
+        line_end = mapped.find(b'\n', header_end)
+        first_line = mapped[header_end:line_end if line_end >= 0 else len(mapped)]
+    except ValueError:
+        mapped.close()
+        f.close()
+        raise
+    channel_columns = [i for i in range(len(names)) if i not in (layer, when) and names[i]]
+    channels = []
+    for i in channel_columns:
+        # Field names must be unique and can't shadow layer/time
+        name = names[i]
+        while name in ('layer', 'time') or name in channels:
+            name += '_'
+        channels.append(name)
+    dtype = sample_dtype(channels)
+    # Numeric (epoch) times parse with the other columns; ISO ones need their own pass
+    try:
+        float(first_line.decode('utf-8').split(delimiter)[when])
+        numeric_time = True
+    except (IndexError, ValueError):
+        numeric_time = False
+
+    def arrays():
+        try:
+            for block in _blocks(mapped, header_end, block_bytes):
+                if numeric_time:
+                    values = _numbers(block, delimiter, [layer] + channel_columns + [when])
+                    times = values[:, -1]
+                else:
+                    values = _numbers(block, delimiter, [layer] + channel_columns)
+                    times = _iso_times(block, delimiter, when)
+                # Lines without a layer number can't be placed in a chunk
+                keep = ~np.isnan(values[:, 0])
+                samples = np.empty(int(keep.sum()), dtype=dtype)
+                samples['layer'] = values[keep, 0]
+                samples['time'] = times[keep]
+                for i, name in enumerate(channels, start=1):
+                    samples[name] = values[keep, i]
+                yield samples
+        finally:
+            mapped.close()
+            f.close()
+
+    return channels, arrays()
+
+
+def _file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _chunk_rows(log_id, samples, layers_per_chunk):
+    """build_log_chunks rows for samples, one per layers_per_chunk-layer group"""
+    keys = samples['layer'] // layers_per_chunk
+    order = np.argsort(keys, kind='stable')
+    keys, samples = keys[order], samples[order]
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    rows = []
+    for start, end in zip(starts, np.r_[starts[1:], len(samples)]):
+        chunk = samples[start:end]
+        rows.append(dict(log=log_id, first_layer=int(chunk['layer'].min()), last_layer=int(chunk['layer'].max()),
+                         samples=len(chunk), data=_encode(chunk)))
+    return rows
+
+
+def ingest_log(build_id, path, layers_per_chunk=LAYERS_PER_CHUNK, block_bytes=BLOCK_BYTES):
+    """Store a machine log for a build; returns the BuildLog id
+
+    A file already ingested for this build (same content hash) isn't read
+    again; its existing id is returned. Everything is written in one
+    transaction, so a log that fails to parse leaves nothing behind.
+    """
+    content_hash = _file_hash(path)
+    existing = (BuildLog.select(BuildLog.id)
+                .where((BuildLog.build == build_id) & (BuildLog.content_hash == content_hash)).scalar())
+    if existing is not None:
+        return existing
+    channels, arrays = read_log(path, block_bytes)
+    with database.atomic():
+        log_id = BuildLog.insert(build=build_id, path=str(path), content_hash=content_hash,
+                                 channels=','.join(channels), ingested_at=datetime.now()).execute()
+        pending = np.empty(0, dtype=sample_dtype(channels))
+        count, first, last = 0, None, None
+        for samples in arrays:
+            if not len(samples):
+                continue
+            count += len(samples)
+            low, high = int(samples['layer'].min()), int(samples['layer'].max())
+            first = low if first is None else min(first, low)
+            last = high if last is None else max(last, high)
+            pending = np.concatenate([pending, samples])
+            # Chunks before the latest layer's are complete while the log runs forward
+            done = pending['layer'] // layers_per_chunk < pending['layer'][-1] // layers_per_chunk
+            if done.any():
+                BuildLogChunk.insert_many(_chunk_rows(log_id, pending[done], layers_per_chunk)).execute()
+                pending = pending[~done]
+        if len(pending):
+            BuildLogChunk.insert_many(_chunk_rows(log_id, pending, layers_per_chunk)).execute()
+        BuildLog.update(first_layer=first, last_layer=last, samples=count).where(BuildLog.id == log_id).execute()
+    return log_id
+
+
+def build_logs(build_id):
+    """BuildLog rows of a build, oldest first"""
+    return list(BuildLog.select().where(BuildLog.build == build_id).order_by(BuildLog.id))
+
+
+def layer_samples(build_id, first_layer=None, last_layer=None, log_id=None):
+    """Structured array of the samples in a layer range (both ends included), in time order
+
+    Only chunks overlapping the range are read. With several logs on the
+    build, their samples are merged; channels missing from a log are NaN.
+    """
+    logs = [log for log in build_logs(build_id) if log_id is None or log.id == log_id]
+    channels = list(dict.fromkeys(name for log in logs for name in log.channel_names()))
+    dtype = sample_dtype(channels)
+    query = (BuildLogChunk.select(BuildLogChunk.data)
+             .where(BuildLogChunk.log.in_([log.id for log in logs]))
+             .order_by(BuildLogChunk.log, BuildLogChunk.first_layer, BuildLogChunk.id))
+    if first_layer is not None:
+        query = query.where(BuildLogChunk.last_layer >= first_layer)
+    if last_layer is not None:
+        query = query.where(BuildLogChunk.first_layer <= last_layer)
+    parts = []
+    for (data,) in query.tuples():
+        chunk = _decode(data)
+        keep = np.ones(len(chunk), dtype=bool)
+        if first_layer is not None:
+            keep &= chunk['layer'] >= first_layer
+        if last_layer is not None:
+            keep &= chunk['layer'] <= last_layer
+        chunk = chunk[keep]
+        if chunk.dtype != dtype:
+            widened = np.empty(len(chunk), dtype=dtype)
+            for name in dtype.names:
+                # layer and time are in every log; only float channels can be missing
+                widened[name] = chunk[name] if name in chunk.dtype.names else np.nan
+            chunk = widened
+        parts.append(chunk)
+    if not parts:
+        return np.empty(0, dtype=dtype)
+    samples = np.concatenate(parts)
+    return samples[np.argsort(samples['time'], kind='stable')]
+
+
+def layer_summary(build_id, first_layer=None, last_layer=None):
+    """LayerSummary per layer in the range: start time, duration, sample count, channel mean and max
+
+    NaN samples are left out of the channel statistics.
+    """
+    samples = layer_samples(build_id, first_layer, last_layer)
+    if not len(samples):
+        return []
+    samples = samples[np.argsort(samples['layer'], kind='stable')]
+    layers, starts, counts = np.unique(samples['layer'], return_index=True, return_counts=True)
+    start_times = np.minimum.reduceat(samples['time'], starts)
+    durations = np.maximum.reduceat(samples['time'], starts) - start_times
+    channels = [name for name in samples.dtype.names if name not in ('layer', 'time')]
+    means, maxima = {}, {}
+    for name in channels:
+        values = samples[name].astype(np.float64)
+        present = ~np.isnan(values)
+        sums = np.add.reduceat(np.where(present, values, 0.0), starts)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means[name] = sums / np.add.reduceat(present.astype(np.int64), starts)
+        maxima[name] = np.fmax.reduceat(values, starts)
+    return [LayerSummary(int(layer), float(start_times[i]), float(durations[i]), int(counts[i]),
+                         {name: float(means[name][i]) for name in channels},
+                         {name: float(maxima[name][i]) for name in channels})
+            for i, layer in enumerate(layers)]
@@ -0,0 +1,275 @@
+"""
+Chunked, compressed per-build monitoring arrays with random access by layer
+
+Melt-pool samples or layer images can run to gigabytes per build, so they
+live in their own files (monitoring_dir()/build_<id>_<kind>.dmon) rather
+than the database. Every layer holds an array of shape (rows, *item_shape)
+of one dtype: rows melt-pool samples of item_shape (channels,), or one
+image of item_shape (height, width).
+
+File layout (little-endian):
+    b'DMON' version:u4 meta_len:u4 meta    JSON: dtype, item_shape, codec
+    chunk, chunk, ...                      compressed layer data
+    chunk table  (n, 3) u8                 file offset, compressed size, raw size
+    layer index  (m, 4) i8                 layer, chunk, offset in chunk, rows
+    trailer      chunk_table_offset:u8 chunks:u8 layers:u8 b'DMON'
+Layers are packed into chunks of about CHUNK_BYTES uncompressed (a bigger
+layer gets a chunk to itself), then compressed with zlib or lzma from the
+standard library. The layer index is sorted by layer.
+
+MonitoringReader memory-maps the file and views both tables with
+np.frombuffer, so opening a store costs a few hundred bytes of reads. A
+layer read decompresses only its chunk. Decompressed chunks are kept in an
+LRU cache of cache_chunks entries, so scrubbing back and forth through
+neighbouring layers mostly hits the cache, and memory stays at about
+cache_chunks * CHUNK_BYTES however big the file is.
+
+MonitoringWriter writes to a temporary file and renames it on close, so
+readers never see a half-written store.
+"""
+
+import json
+import lzma
+import mmap
+import os
+import struct
+import threading
+import zlib
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+
+from database.connection import database
+
+CHUNK_BYTES = 4 << 20
+CACHE_CHUNKS = 8
+CODECS = ('zlib', 'lzma')
+
+MAGIC = b'DMON'
+VERSION = 1
+_HEADER = struct.Struct('<4sII')
+_TRAILER = struct.Struct('<QQQ4s')
+
+MonitoringInfo = namedtuple('MonitoringInfo', [
+    'path', 'dtype', 'item_shape', 'codec', 'layers', 'first_layer', 'last_layer', 'chunks',
+    'raw_bytes', 'stored_bytes',
+])
+
+
+def monitoring_dir():
+    """$DMLS_MONITORING_DIR, or 'monitoring' next to the database file in use
+
+    Looked up on every call: the database can be pointed elsewhere after
+    import (dmls --db, database.init()).
+    """
+    return os.environ.get('DMLS_MONITORING_DIR') or os.path.join(
+        os.path.dirname(os.path.abspath(database.database)), 'monitoring')
+
+
+def monitoring_path(build_id, kind):
+    """Where a build's monitoring store of a kind ('meltpool', 'layer_image', ...) lives"""
+    return os.path.join(monitoring_dir(), f'build_{int(build_id)}_{kind}.dmon')
+
+
+def _compress(codec, data, level):
+    if codec == 'lzma':
+        return lzma.compress(data, preset=level)
+    return zlib.compress(data, level)
+
+
+def _decompress(codec, data):
+    if codec == 'lzma':
+        return lzma.decompress(data)
+    return zlib.decompress(data)
+
+
+class MonitoringWriter:
+    """Append layers to a new store; use as a context manager or call close()"""
+    def __init__(self, path, dtype, item_shape=(), codec='zlib', level=None, chunk_bytes=CHUNK_BYTES):
+        if codec not in CODECS:
+            raise ValueError(f"Unknown codec {codec!r}; expected one of {', '.join(CODECS)}")
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self.item_shape = tuple(int(size) for size in item_shape)
+        self.codec = codec
+        # Fast settings by default: monitoring data is written once per layer during the build
+        self.level = (1 if codec == 'zlib' else 0) if level is None else level
+        self.chunk_bytes = chunk_bytes
+        self._chunks = []   # (file offset, compressed size, raw size)
+        self._layers = {}   # layer -> (chunk, offset in chunk, rows)
+        self._pending = []
+        self._pending_bytes = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._temporary = f'{path}.tmp'
+        self._file = open(self._temporary, 'wb')
+        meta = json.dumps({'dtype': self.dtype.str, 'item_shape': self.item_shape, 'codec': codec}).encode()
+        self._file.write(_HEADER.pack(MAGIC, VERSION, len(meta)) + meta)
+
+    def append(self, layer, array):
+        """Store array (rows x item_shape, or a single item) as layer"""
+        layer = int(layer)
+        if layer in self._layers:
+            raise ValueError(f"Layer {layer} is already stored")
+        array = np.ascontiguousarray(array, dtype=self.dtype)
+        if array.shape == self.item_shape:
+            array = array.reshape((1,) + self.item_shape)
+        if array.shape[1:] != self.item_shape:
+            raise ValueError(f"Layer {layer} has shape {array.shape}; items must be {self.item_shape}")
+        data = array.tobytes()
+        if self._pending and self._pending_bytes + len(data) > self.chunk_bytes:
+            self._flush()
+        self._layers[layer] = (len(self._chunks), self._pending_bytes, len(array))
+        self._pending.append(data)
+        self._pending_bytes += len(data)
+        if self._pending_bytes >= self.chunk_bytes:
+            self._flush()
+
+    def _flush(self):
+        if not self._pending:
+            return
+        raw = b''.join(self._pending)
+        compressed = _compress(self.codec, raw, self.level)
+        self._chunks.append((self._file.tell(), len(compressed), len(raw)))
+        self._file.write(compressed)
+        self._pending, self._pending_bytes = [], 0
+
+    def close(self):
+        if self._file is None:
+            return
+        self._flush()
+        chunk_table_offset = self._file.tell()
+        self._file.write(np.array(self._chunks, dtype='<u8').reshape(-1, 3).tobytes())
+        index = sorted((layer, chunk, offset, rows) for layer, (chunk, offset, rows) in self._layers.items())
+        self._file.write(np.array(index, dtype='<i8').reshape(-1, 4).tobytes())
+        self._file.write(_TRAILER.pack(chunk_table_offset, len(self._chunks), len(index), MAGIC))
+        self._file.close()
+        self._file = None
+        os.replace(self._temporary, self.path)
+
+    def discard(self):
+        """Drop everything written so far; the store at path is left as it was"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            os.remove(self._temporary)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+
+class MonitoringReader:
+    """Lazy, random access by layer to a store written by MonitoringWriter"""
+    def __init__(self, path, cache_chunks=CACHE_CHUNKS):
+        self.path = path
+        self.cache_chunks = cache_chunks
+        self._cache = OrderedDict()   # chunk -> decompressed bytes, least recently used first
+        self._lock = threading.Lock()
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, meta_len = _HEADER.unpack_from(self._map, 0)
+            if magic != MAGIC or len(self._map) < _HEADER.size + _TRAILER.size:
+                raise ValueError(f"{path} is not a monitoring store")
+            if version != VERSION:
+                raise ValueError(f"{path} has format version {version}; this reader knows {VERSION}")
+            meta = json.loads(bytes(self._map[_HEADER.size:_HEADER.size + meta_len]))
+            trailer = _TRAILER.unpack_from(self._map, len(self._map) - _TRAILER.size)
+            table_offset, chunks, layers, end_magic = trailer
+            if end_magic != MAGIC:
+                raise ValueError(f"{path} is truncated")
+        except (ValueError, struct.error):
+            self._map.close()
+            raise
+        self.dtype = np.dtype(meta['dtype'])
+        self.item_shape = tuple(meta['item_shape'])
+        self.codec = meta['codec']
+        self._item_bytes = self.dtype.itemsize * int(np.prod(self.item_shape, dtype=np.int64))
+        # Views into the map; nothing is copied
+        self._chunks = np.frombuffer(self._map, dtype='<u8', count=chunks * 3, offset=table_offset).reshape(-1, 3)
+        self._index = np.frombuffer(self._map, dtype='<i8', count=layers * 4,
+                                    offset=table_offset + chunks * 24).reshape(-1, 4)
+        self.layers = self._index[:, 0].copy()
+
+    def __len__(self):
+        return len(self.layers)
+
+    def __contains__(self, layer):
+        i = np.searchsorted(self.layers, layer)
+        return i < len(self.layers) and self.layers[i] == layer
+
+    def info(self):
+        return MonitoringInfo(self.path, self.dtype.str, self.item_shape, self.codec, len(self),
+                              int(self.layers[0]) if len(self) else None,
+                              int(self.layers[-1]) if len(self) else None,
+                              len(self._chunks), int(self._chunks[:, 2].sum()), len(self._map))
+
+    def _chunk(self, chunk):
+        with self._lock:
+            data = self._cache.get(chunk)
+            if data is not None:
+                self._cache.move_to_end(chunk)
+                return data
+        offset, size, _ = (int(value) for value in self._chunks[chunk])
+        with memoryview(self._map) as view:
+            data = _decompress(self.codec, view[offset:offset + size])
+        with self._lock:
+            self._cache[chunk] = data
+            self._cache.move_to_end(chunk)
+            while len(self._cache) > self.cache_chunks:
+                self._cache.popitem(last=False)
+        return data
+
+    def read(self, layer):
+        """The layer's array (read-only, shape rows x item_shape); KeyError if it isn't stored"""
+        i = int(np.searchsorted(self.layers, layer))
+        if i == len(self.layers) or self.layers[i] != layer:
+            raise KeyError(layer)
+        _, chunk, offset, rows = (int(value) for value in self._index[i])
+        data = self._chunk(chunk)
+        return np.frombuffer(data, dtype=self.dtype, count=rows * self._item_bytes // self.dtype.itemsize,
+                             offset=offset).reshape((rows,) + self.item_shape)
+
+    def __getitem__(self, layer):
+        return self.read(layer)
+
+    def iter_layers(self, first_layer=None, last_layer=None):
+        """(layer, array) for the stored layers in a range (ends included), one chunk in memory at a time"""
+        start = 0 if first_layer is None else int(np.searchsorted(self.layers, first_layer, side='left'))
+        stop = len(self.layers) if last_layer is None else int(np.searchsorted(self.layers, last_layer, side='right'))
+        for i in range(start, stop):
+            layer = int(self.layers[i])
+            yield layer, self.read(layer)
+
+    def close(self):
+        self._cache.clear()
+        # The table views hold exports of the map; drop them before closing it
+        self._chunks = self._index = None
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def open_monitoring(build_id, kind, cache_chunks=CACHE_CHUNKS):
+    """MonitoringReader for a build's store of a kind (FileNotFoundError if there is none)"""
+    return MonitoringReader(monitoring_path(build_id, kind), cache_chunks)
+
+
+def build_monitoring(build_id):
+    """{kind: path} of the monitoring stores a build has"""
+    prefix = f'build_{int(build_id)}_'
+    directory = monitoring_dir()
+    if not os.path.isdir(directory):
+        return {}
+    return {name[len(prefix):-len('.dmon')]: os.path.join(directory, name)
+            for name in sorted(os.listdir(directory))
+            if name.startswith(prefix) and name.endswith('.dmon')}
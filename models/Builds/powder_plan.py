@@ -0,0 +1,213 @@
+"""
+Powder requirement estimates for builds and lot allocation across the queue
+
+estimate_requirements() sums the STL volume (models.jobs.part_geometry) of
+every part in the part lists of a build's jobs, turns it into a mass with
+the density of the build's powder material and scales it for supports and
+feed overhead:
+    estimated_kg = volume_mm3 * density_g_cm3 / 1e6 * (1 + support_factor) * overhead_factor
+A weight entered on the build (powder_weight_required) takes precedence
+over the estimate; both are reported.
+
+allocate_lots() then hands out powder lots to the builds in queue order
+(build datetime, then id), within the build's material:
+    1. the lot already assigned to the build, if it covers it on its own
+    2. otherwise the smallest lot that covers it on its own (best fit, so
+       big lots stay whole for big builds)
+    3. otherwise the largest lots until the rest fits in one lot, then the
+       best fit for the rest, so a split build uses as few lots as possible
+A build that the material's remaining lots can't cover gets nothing and is
+reported with its shortfall, leaving the powder for the builds after it.
+Lots are kept sorted by remaining weight, so each build costs a couple of
+bisections; hundreds of builds and lots plan in milliseconds.
+
+Powder.quantity is taken as the weight available now; the plan is not
+written anywhere.
+"""
+
+import bisect
+from collections import namedtuple, defaultdict
+
+import peewee as pw
+
+from models.builds.build import Build
+from models.powders.powder import Powder
+from models.jobs.job import Job
+from models.jobs.part_resolver import resolve_part_list_ids
+from models.jobs.part_geometry import measure_paths
+
+# Typical density of the solid alloy (g/cm^3), keyed by upper-case Powder.mat_id
+MATERIAL_DENSITY = {
+    '316L': 7.99,
+    '17-4PH': 7.80,
+    '15-5PH': 7.80,
+    'IN625': 8.44,
+    'IN718': 8.19,
+    'TI64': 4.43,
+    'ALSI10MG': 2.67,
+    'COCR': 8.30,
+    'MS1': 8.00,
+}
+
+SUPPORT_FACTOR = 0.15   # support material, as a fraction of the part mass
+OVERHEAD_FACTOR = 1.5   # powder fed per kg melted (dosing and recoating losses); adjust per machine
+
+# Below this a lot counts as used up (kg)
+EPSILON = 1e-9
+
+_IN_CHUNK = 900
+
+BuildRequirement = namedtuple('BuildRequirement', [
+    'build_id', 'name', 'datetime', 'powder_id', 'mat_id', 'volume', 'parts', 'parts_without_geometry',
+    'estimated_kg', 'entered_kg', 'required_kg',
+])
+Allocation = namedtuple('Allocation', ['powder_id', 'kg'])
+# allocations: tuple of Allocation; assigned_covers: the build's own lot holds required_kg on its own
+BuildPlan = namedtuple('BuildPlan', ['requirement', 'allocations', 'shortfall_kg', 'assigned_covers'])
+# remaining: {powder_id: kg} after every allocation
+PowderPlan = namedtuple('PowderPlan', ['builds', 'remaining'])
+
+
+def density(mat_id):
+    """g/cm^3 for a material id, or None when unknown"""
+    return MATERIAL_DENSITY.get((mat_id or '').upper())
+
+
+def pending_build_ids():
+    """Builds that haven't been loaded with powder yet"""
+    return [build_id for (build_id,) in
+            Build.select(Build.id).where(Build.powder_weight_loaded.is_null()).order_by(Build.id).tuples()]
+
+
+def estimate_requirements(build_ids=None, support_factor=SUPPORT_FACTOR, overhead_factor=OVERHEAD_FACTOR,
+                          workers=None):
+    """BuildRequirement per build (pending builds when build_ids is None), in queue order
+
+    STL files that aren't cached yet are measured (workers: process pool
+    size). Parts without a readable file are counted in
+    parts_without_geometry and left out of the volume.
+    """
+    build_ids = pending_build_ids() if build_ids is None else list(build_ids)
+    builds, jobs = [], defaultdict(list)
+    for start in range(0, len(build_ids), _IN_CHUNK):
+        chunk = build_ids[start:start + _IN_CHUNK]
+        builds.extend(Build
+                      .select(Build.id, Build.name, Build.datetime, Build.powder_weight_required,
+                              Build.powder, Powder.mat_id)
+                      .join(Powder, on=(Build.powder == Powder.id), join_type=pw.JOIN.LEFT_OUTER)
+                      .where(Build.id.in_(chunk)).tuples())
+        for build_id, part_list_id in (Job.select(Job.build, Job.part_list)
+                                       .where(Job.build.in_(chunk) & Job.part_list.is_null(False)).tuples()):
+            jobs[build_id].append(part_list_id)
+    part_lists = resolve_part_list_ids(part_list_id for ids in jobs.values() for part_list_id in ids)
+    paths = {part.file_path for parts in part_lists.values() for part in parts if part.file_path}
+    volumes = {geometry.path: geometry.volume for geometry in measure_paths(sorted(paths), workers)
+               if geometry.error is None}
+    requirements = []
+    for build_id, name, when, entered, powder_id, mat_id in builds:
+        parts = [part for part_list_id in jobs[build_id] for part in part_lists.get(part_list_id, [])]
+        measured = [volumes[part.file_path] for part in parts if part.file_path in volumes]
+        volume = sum(measured)
+        material_density = density(mat_id)
+        estimated = None
+        if measured and material_density is not None:
+            estimated = volume * material_density / 1e6 * (1 + support_factor) * overhead_factor
+        required = entered if entered is not None else estimated
+        requirements.append(BuildRequirement(build_id, name, when, powder_id, mat_id, volume, len(parts),
+                                             len(parts) - len(measured), estimated, entered, required))
+    requirements.sort(key=lambda requirement: (str(requirement.datetime), requirement.build_id))
+    return requirements
+
+
+class _Lots:
+    """Remaining weight of one material's lots, sorted for best-fit lookups"""
+    def __init__(self, quantities):
+        self.remaining = dict(quantities)
+        self.order = sorted((kg, powder_id) for powder_id, kg in self.remaining.items())
+        # The weights alone, for bisecting without comparing powder ids of whatever type
+        self.weights = [kg for kg, _ in self.order]
+
+    def total(self):
+        return sum(self.remaining.values())
+
+    def best_fit(self, kg):
+        """powder_id of the smallest lot holding kg, or None"""
+        index = bisect.bisect_left(self.weights, kg - EPSILON)
+        return self.order[index][1] if index < len(self.order) else None
+
+    def largest(self):
+        return self.order[-1][1]
+
+    def take(self, powder_id, kg):
+        left = self.remaining[powder_id]
+        index = bisect.bisect_left(self.order, (left, powder_id))
+        self.order.pop(index)
+        self.weights.pop(index)
+        left -= kg
+        if left > EPSILON:
+            self.remaining[powder_id] = left
+            index = bisect.bisect_left(self.order, (left, powder_id))
+            self.order.insert(index, (left, powder_id))
+            self.weights.insert(index, left)
+        else:
+            del self.remaining[powder_id]
+        return Allocation(powder_id, kg)
+
+
+def _allocate_one(lots, requirement):
+    need = requirement.required_kg
+    assigned = requirement.powder_id
+    if lots.remaining.get(assigned, 0.0) >= need - EPSILON:
+        return [lots.take(assigned, min(need, lots.remaining[assigned]))]
+    powder_id = lots.best_fit(need)
+    if powder_id is not None:
+        return [lots.take(powder_id, need)]
+    allocations = []
+    while need > EPSILON and lots.best_fit(need) is None:
+        powder_id = lots.largest()
+        kg = lots.remaining[powder_id]
+        allocations.append(lots.take(powder_id, kg))
+        need -= kg
+    if need > EPSILON:
+        allocations.append(lots.take(lots.best_fit(need), need))
+    return allocations
+
+
+def allocate_lots(requirements, quantities=None):
+    """PowderPlan for requirements (in the order given, e.g. from estimate_requirements())
+
+    quantities: {powder_id: kg} to plan with instead of Powder.quantity.
+    Builds without a required weight or a known material get no allocation
+    and no shortfall.
+    """
+    materials = dict(Powder.select(Powder.id, Powder.mat_id).tuples())
+    if quantities is None:
+        quantities = dict(Powder.select(Powder.id, Powder.quantity).where(Powder.quantity > 0).tuples())
+    by_material = defaultdict(dict)
+    for powder_id, kg in quantities.items():
+        if kg and kg > EPSILON and powder_id in materials:
+            by_material[materials[powder_id]][powder_id] = kg
+    lots = {mat_id: _Lots(lot_quantities) for mat_id, lot_quantities in by_material.items()}
+    plans = []
+    for requirement in requirements:
+        need = requirement.required_kg
+        assigned_kg = quantities.get(requirement.powder_id) or 0.0
+        assigned_covers = need is not None and assigned_kg >= need - EPSILON
+        material_lots = lots.get(requirement.mat_id)
+        if need is None or need <= 0 or requirement.mat_id is None:
+            plans.append(BuildPlan(requirement, (), 0.0, assigned_covers))
+        elif material_lots is None or material_lots.total() < need - EPSILON:
+            available = material_lots.total() if material_lots else 0.0
+            plans.append(BuildPlan(requirement, (), need - available, assigned_covers))
+        else:
+            plans.append(BuildPlan(requirement, tuple(_allocate_one(material_lots, requirement)), 0.0,
+                                   assigned_covers))
+    remaining = {}
+    for material_lots in lots.values():
+        remaining.update(material_lots.remaining)
+    return PowderPlan(plans, remaining)
+
+
+def plan_powder(build_ids=None, support_factor=SUPPORT_FACTOR, overhead_factor=OVERHEAD_FACTOR, workers=None):
+    """Estimate the pending (or given) builds and allocate lots to them"""
+    return allocate_lots(estimate_requirements(build_ids, support_factor, overhead_factor, workers))
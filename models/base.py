@@ -1,6 +1,19 @@
 import peewee as pw
 from database.connection import database
+from database.counters import install_counter_triggers, forget_counters
  
 class BaseModel(pw.Model):
     class Meta:
-        database = database 
\ No newline at end of file
+        database = database
+
+    @classmethod
+    def create_table(cls, safe=True, **options):
+        super().create_table(safe=safe, **options)
+        # Triggers keeping row_counts exact (no-op for tables without counters)
+        install_counter_triggers(cls._meta.database, cls._meta.table_name)
+
+    @classmethod
+    def drop_table(cls, safe=True, drop_sequences=True, **options):
+        super().drop_table(safe=safe, drop_sequences=drop_sequences, **options)
+        # row_counts isn't dropped with the table; stale counts would be added to after a re-create
+        forget_counters(cls._meta.database, cls._meta.table_name)
@@ -1,6 +1,7 @@
 import peewee as pw
 from enum import Enum
 from models.base import BaseModel
+from models.coupons.coupon_position import install_position_index
 
 class DirectionEnum(str, Enum):
     X = "X"
@@ -22,4 +23,9 @@ class Coupon(BaseModel):
     direction = pw.CharField(choices=[(e.value, e.name) for e in DirectionEnum])  # Required field
 
     class Meta:
-        table_name = 'coupons' 
\ No newline at end of file
+        table_name = 'coupons'
+
+    @classmethod
+    def create_table(cls, safe=True, **options):
+        super().create_table(safe=safe, **options)
+        install_position_index(cls._meta.database)
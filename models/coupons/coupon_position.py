@@ -0,0 +1,63 @@
+"""
+R-tree index over coupon positions
+
+coupon_positions is an SQLite rtree virtual table with one box per coupon
+(a point in the plate's XY plane: min == max), keyed by the coupon id. Z is
+left out on purpose: coupons on one plate usually share a height, and with
+zero-volume boxes the tree loses the areas it uses to choose subtrees,
+making every search close to a full scan.
+
+Triggers on coupons keep it in step with every insert, position update and
+delete, from any connection, so it never has to be rebuilt by hand. Queries
+live in models.coupons.spatial.
+"""
+
+import peewee as pw
+from playhouse.sqlite_ext import VirtualModel
+
+from database.connection import database
+
+
+class CouponPosition(VirtualModel):
+    id = pw.IntegerField(primary_key=True)  # coupons.id
+    min_x = pw.FloatField()
+    max_x = pw.FloatField()
+    min_y = pw.FloatField()
+    max_y = pw.FloatField()
+
+    class Meta:
+        database = database
+        table_name = 'coupon_positions'
+        extension_module = 'rtree'
+
+
+_POINT = '{0}.id, {0}.x_position, {0}.x_position, {0}.y_position, {0}.y_position'
+
+TRIGGERS = [
+    'CREATE TRIGGER IF NOT EXISTS coupons_position_insert AFTER INSERT ON coupons BEGIN '
+    f'INSERT INTO coupon_positions VALUES ({_POINT.format("NEW")}); END',
+    'CREATE TRIGGER IF NOT EXISTS coupons_position_update '
+    'AFTER UPDATE OF id, x_position, y_position ON coupons BEGIN '
+    'DELETE FROM coupon_positions WHERE id = OLD.id; '
+    f'INSERT INTO coupon_positions VALUES ({_POINT.format("NEW")}); END',
+    'CREATE TRIGGER IF NOT EXISTS coupons_position_delete AFTER DELETE ON coupons BEGIN '
+    'DELETE FROM coupon_positions WHERE id = OLD.id; END',
+]
+
+
+def install_position_index(db):
+    """Create coupon_positions and the triggers on coupons (called when coupons is created)
+
+    The index is refilled too: dropping coupons drops the triggers but not
+    the index, which would otherwise keep the old rows.
+    """
+    CouponPosition.create_table(safe=True)
+    for sql in TRIGGERS:
+        db.execute_sql(sql)
+    rebuild_position_index(db)
+
+
+def rebuild_position_index(db):
+    """Refill coupon_positions from coupons"""
+    db.execute_sql('DELETE FROM coupon_positions')
+    db.execute_sql(f'INSERT INTO coupon_positions SELECT {_POINT.format("coupons")} FROM coupons')
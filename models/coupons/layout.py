@@ -0,0 +1,141 @@
+"""
+Generate coupon array layouts with NumPy and insert them in bulk
+
+Patterns fill a rectangular plate envelope (width x depth, origin at the
+plate corner) inside a margin:
+    grid       rows and columns spacing_x / spacing_y apart
+    hex        every other row shifted by half a spacing, rows spacing*sqrt(3)/2
+               apart, so each coupon is the same distance from six neighbours
+    staggered  like grid, but every other row shifted by half spacing_x
+The pattern can be rotated about the envelope centre; points that fall
+outside the envelope after rotation are dropped. Coupons are numbered row
+by row (front to back, left to right) and take slots 1, 2, ... in that
+order.
+
+find_collisions() checks pairs of points for a minimum clearance one
+block of pairs at a time, so memory stays bounded however many points
+there are. create_layout_array() then inserts the coupons and the array
+row in one transaction.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+from database.connection import database
+from models.coupons.coupon import Coupon, DirectionEnum
+from models.coupons.coupon_array import CouponArray
+from models.coupons.preset_clone import COUPON_SLOTS, SLOT_FIELDS
+
+PATTERNS = ('grid', 'hex', 'staggered')
+
+# first/second: indices into the points array
+Collision = namedtuple('Collision', ['first', 'second', 'distance'])
+
+# Points per side of a pairwise distance block (block x block distances at a time)
+_BLOCK = 1024
+
+# 7 values per coupon row; stay below SQLITE_MAX_VARIABLE_NUMBER on older SQLite builds
+_INSERT_CHUNK = 100
+
+
+def _axis(start, stop, step):
+    if step <= 0:
+        raise ValueError("Spacing must be positive")
+    # Small tolerance so a row landing exactly on the far margin is kept
+    return np.arange(start, stop + step * 1e-9, step)
+
+
+def layout_points(pattern, width, depth, spacing_x, spacing_y=None, margin=0.0, angle=0.0):
+    """(n, 2) array of XY positions for pattern inside the plate envelope
+
+    spacing_y defaults to spacing_x (hex uses spacing_x only). angle rotates
+    the pattern counter-clockwise, in degrees, about the envelope centre.
+    """
+    if pattern not in PATTERNS:
+        raise ValueError(f"Unknown pattern {pattern!r}; expected one of {', '.join(PATTERNS)}")
+    spacing_y = spacing_x if spacing_y is None else spacing_y
+    if pattern == 'hex':
+        spacing_y = spacing_x * np.sqrt(3) / 2
+    low_x, high_x, low_y, high_y = margin, width - margin, margin, depth - margin
+    if high_x < low_x or high_y < low_y:
+        return np.empty((0, 2))
+    xs, ys = _axis(low_x, high_x, spacing_x), _axis(low_y, high_y, spacing_y)
+    grid_x, grid_y = np.meshgrid(xs, ys)
+    if pattern in ('hex', 'staggered'):
+        # Odd rows shift by half a spacing
+        grid_x = grid_x + (np.arange(len(ys)) % 2)[:, None] * (spacing_x / 2)
+    points = np.column_stack([grid_x.ravel(), grid_y.ravel()])
+    if angle:
+        theta = np.radians(angle)
+        rotation = np.array([[np.cos(theta), -np.sin(theta)], [np.sin(theta), np.cos(theta)]])
+        centre = np.array([width / 2, depth / 2])
+        points = (points - centre) @ rotation.T + centre
+    inside = ((points[:, 0] >= low_x - 1e-9) & (points[:, 0] <= high_x + 1e-9) &
+              (points[:, 1] >= low_y - 1e-9) & (points[:, 1] <= high_y + 1e-9))
+    return points[inside]
+
+
+def find_collisions(points, clearance, block=_BLOCK):
+    """Collision for each pair of points closer than clearance (centre to centre)
+
+    Points are sorted by X and compared block x block with broadcasting; a
+    block whose X range starts clearance or more past the current one ends
+    the scan for it, so a plate costs about n * block distances rather than
+    n^2. Each pair is reported once, as (lower index, higher index) into
+    points.
+    """
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    order = np.argsort(points[:, 0], kind='stable')
+    ordered = points[order]
+    limit = clearance * clearance
+    found = []
+    for start in range(0, len(ordered), block):
+        first = ordered[start:start + block]
+        for other_start in range(start, len(ordered), block):
+            second = ordered[other_start:other_start + block]
+            if second[0, 0] - first[-1, 0] >= clearance:
+                break
+            squared = ((first[:, None, :] - second[None, :, :]) ** 2).sum(axis=-1)
+            close = squared < limit
+            if other_start == start:
+                close &= np.triu(np.ones(close.shape, dtype=bool), k=1)
+            for i, j in zip(*np.nonzero(close)):
+                a, b = int(order[start + i]), int(order[other_start + j])
+                found.append(Collision(min(a, b), max(a, b), float(np.sqrt(squared[i, j]))))
+    return sorted(found)
+
+
+def create_layout_array(points, name, z=0.0, direction=DirectionEnum.Z, clearance=None,
+                        is_preset=False, description=None):
+    """Insert one coupon per point and a coupon array holding them; returns the array id
+
+    Raises ValueError for more points than slots, or for points closer than
+    clearance when one is given. The coupons and the array row are written
+    in one transaction.
+    """
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    if len(points) > COUPON_SLOTS:
+        raise ValueError(f"{len(points)} positions don't fit in a {COUPON_SLOTS}-slot coupon array")
+    if clearance is not None:
+        collisions = find_collisions(points, clearance)
+        if collisions:
+            first = collisions[0]
+            raise ValueError(f"{len(collisions)} coupon pairs are closer than {clearance} "
+                             f"(e.g. positions {first.first + 1} and {first.second + 1}: {first.distance:.3f})")
+    direction = DirectionEnum(direction).value
+    rows = [dict(name=f"{name} {slot}", description=None, is_preset=is_preset,
+                 x_position=round(float(x), 4), y_position=round(float(y), 4), z_position=z,
+                 direction=direction)
+            for slot, (x, y) in enumerate(points, start=1)]
+    with database.atomic():
+        start = (Coupon.select(Coupon.id).order_by(Coupon.id.desc()).limit(1).scalar() or 0) + 1
+        for begin in range(0, len(rows), _INSERT_CHUNK):
+            Coupon.insert_many(rows[begin:begin + _INSERT_CHUNK]).execute()
+        # New rows get ids above the previous maximum, in insertion order
+        coupon_ids = [coupon_id for (coupon_id,) in
+                      Coupon.select(Coupon.id).where(Coupon.id >= start).order_by(Coupon.id).tuples()]
+        if len(coupon_ids) != len(rows):
+            raise RuntimeError("Inserted coupons could not be matched to their slots")
+        return CouponArray.insert(name=name, description=description, is_preset=is_preset,
+                                  **dict(zip(SLOT_FIELDS, coupon_ids))).execute()
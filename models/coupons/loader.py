@@ -0,0 +1,30 @@
+"""
+Load the coupons of a coupon array with their positions, in slot order
+
+load_array_coupons() reads the array's slot ids and then every coupon they
+point at with one IN query, instead of dereferencing coupon_1 .. coupon_256
+one slot at a time. Slots pointing at a deleted coupon are skipped.
+"""
+
+from collections import namedtuple
+
+from models.coupons.coupon import Coupon
+from models.coupons.coupon_array import CouponArray
+from models.coupons.preset_clone import slot_ids
+
+COUPON_FIELDS = ['id', 'name', 'x_position', 'y_position', 'z_position', 'direction', 'is_preset']
+
+# slot is 1-based, matching the coupon_<slot> column
+ArrayCoupon = namedtuple('ArrayCoupon', ['slot'] + COUPON_FIELDS)
+
+
+def load_array_coupons(coupon_array_id):
+    """ArrayCoupon tuples for the filled slots of a coupon array ([] if it doesn't exist)"""
+    coupon_array = CouponArray.get_or_none(CouponArray.id == coupon_array_id)
+    if coupon_array is None:
+        return []
+    slots = slot_ids(coupon_array)
+    fields = [getattr(Coupon, name) for name in COUPON_FIELDS]
+    found = {row[0]: row for row in
+             Coupon.select(*fields).where(Coupon.id.in_({coupon_id for _, coupon_id in slots})).tuples()}
+    return [ArrayCoupon(slot, *found[coupon_id]) for slot, coupon_id in slots if coupon_id in found]
@@ -0,0 +1,155 @@
+"""
+Clone coupon array presets without creating coupons one row at a time
+
+clone_coupon_array() copies an array in one transaction:
+    full           every coupon and its composition is copied with one
+                   INSERT ... SELECT each, then the new array row points at
+                   the copies
+    copy_on_write  only the array row is copied (INSERT ... SELECT); its
+                   slots keep pointing at the preset's coupons
+
+A slot of a non-preset array is shared when its coupon is a preset coupon
+or sits in a preset array.
+private_slot() copies just that coupon (and composition) and re-points the
+slot, so a copy-on-write array costs one row plus one coupon per edited slot
+and edits never leak back into the preset.
+"""
+
+import peewee as pw
+
+from database.connection import database
+from models.coupons.coupon import Coupon
+from models.coupons.coupon_array import CouponArray
+from models.coupons.coupon_composition import CouponComposition
+
+COUPON_SLOTS = 256
+SLOT_FIELDS = [f'coupon_{slot}' for slot in range(1, COUPON_SLOTS + 1)]
+
+# Stay below SQLITE_MAX_VARIABLE_NUMBER on older SQLite builds (two values per pair)
+_VALUES_CHUNK = 450
+
+
+def _slot_field(slot):
+    return CouponArray._meta.fields[SLOT_FIELDS[slot - 1]]
+
+
+def slot_ids(coupon_array):
+    """[(slot, coupon_id)] for the filled slots, without touching the coupons table"""
+    slots = []
+    for slot, name in enumerate(SLOT_FIELDS, start=1):
+        coupon_id = getattr(coupon_array, f'{name}_id', None)
+        if coupon_id is not None:
+            slots.append((slot, coupon_id))
+    return slots
+
+
+def copy_coupons(coupon_ids):
+    """Copy coupons and their compositions as non-preset rows; returns {old id: new id}
+
+    Coupons are copied with one INSERT ... SELECT in id order. Within the
+    write transaction SQLite hands out consecutive rowids after the current
+    maximum, so the n-th old id maps to first new id + n; the count of new
+    rows is checked before relying on it. Compositions follow with one
+    INSERT ... SELECT joined to that mapping.
+    """
+    old_ids = sorted(set(coupon_ids))
+    if not old_ids:
+        return {}
+    copied = [Coupon.name, Coupon.description, Coupon.x_position, Coupon.y_position,
+              Coupon.z_position, Coupon.direction]
+    with database.atomic():
+        start = Coupon.select(pw.fn.COALESCE(pw.fn.MAX(Coupon.id), 0)).scalar() + 1
+        Coupon.insert_from(
+            Coupon.select(*copied, pw.Value(False)).where(Coupon.id.in_(old_ids)).order_by(Coupon.id),
+            copied + [Coupon.is_preset]).execute()
+        new_ids = list(Coupon.select(Coupon.id).where(Coupon.id >= start).order_by(Coupon.id).tuples())
+        if len(new_ids) != len(old_ids) or new_ids[-1][0] != start + len(old_ids) - 1:
+            raise RuntimeError("Copied coupons were not numbered consecutively")
+        mapping = {old_id: start + n for n, old_id in enumerate(old_ids)}
+        pairs = list(mapping.items())
+        elements = [field for field in CouponComposition._meta.sorted_fields if not field.primary_key]
+        for begin in range(0, len(pairs), _VALUES_CHUNK):
+            ids = pw.ValuesList(pairs[begin:begin + _VALUES_CHUNK]).cte('ids', columns=('old_id', 'new_id'))
+            CouponComposition.insert_from(
+                CouponComposition
+                .select(ids.c.new_id, *elements)
+                .join(ids, on=(CouponComposition.coupon == ids.c.old_id))
+                .with_cte(ids),
+                [CouponComposition.coupon] + elements).execute()
+    return mapping
+
+
+def clone_coupon_array(coupon_array_id, name=None, copy_on_write=False):
+    """Copy a coupon array (normally a preset) as a new non-preset array; returns its id
+
+    copy_on_write needs a preset source: coupons count as shared only while
+    they belong to a preset, so a copy-on-write clone of an ordinary array
+    would edit that array's coupons in place (ValueError).
+    """
+    slot_columns = [getattr(CouponArray, field_name) for field_name in SLOT_FIELDS]
+    with database.atomic():
+        source = CouponArray.get_by_id(coupon_array_id)
+        if copy_on_write and not source.is_preset:
+            raise ValueError(f"Coupon array {coupon_array_id} is not a preset; "
+                             "only presets can be cloned copy-on-write")
+        if name is None:
+            name = f"{source.name or 'Coupon Array'} (copy)"
+        if copy_on_write:
+            # The new row keeps the preset's coupon ids
+            return CouponArray.insert_from(
+                CouponArray
+                .select(pw.Value(name), CouponArray.description, pw.Value(False), *slot_columns)
+                .where(CouponArray.id == coupon_array_id),
+                [CouponArray.name, CouponArray.description, CouponArray.is_preset] + slot_columns).execute()
+        slots = slot_ids(source)
+        mapping = copy_coupons(coupon_id for _, coupon_id in slots)
+        values = {SLOT_FIELDS[slot - 1]: mapping[coupon_id] for slot, coupon_id in slots}
+        return CouponArray.insert(name=name, description=source.description, is_preset=False,
+                                  **values).execute()
+
+
+def preset_coupon_ids():
+    """Ids of coupons an edit must not touch: preset coupons and those in preset arrays"""
+    slot_columns = [getattr(CouponArray, field_name) for field_name in SLOT_FIELDS]
+    ids = {coupon_id for (coupon_id,) in Coupon.select(Coupon.id).where(Coupon.is_preset).tuples()}
+    # Presets are few, so reading their slot columns is cheap
+    for row in CouponArray.select(*slot_columns).where(CouponArray.is_preset).tuples():
+        ids.update(coupon_id for coupon_id in row if coupon_id is not None)
+    return ids
+
+
+def shared_slots(coupon_array):
+    """Slots of a non-preset array that still point at preset coupons"""
+    if coupon_array.is_preset:
+        return []
+    shared = preset_coupon_ids()
+    return [slot for slot, coupon_id in slot_ids(coupon_array) if coupon_id in shared]
+
+
+def private_slot(coupon_array_id, slot):
+    """Id of a coupon in slot that can be edited without touching a preset
+
+    A shared slot gets its own copy of the coupon first; otherwise the
+    current coupon id (or None for an empty slot) is returned as is.
+    """
+    field = _slot_field(slot)
+    with database.atomic():
+        is_preset, coupon_id = (CouponArray
+                                .select(CouponArray.is_preset, field)
+                                .where(CouponArray.id == coupon_array_id)
+                                .tuples()
+                                .get())
+        if coupon_id is None or is_preset or coupon_id not in preset_coupon_ids():
+            return coupon_id
+        new_id = copy_coupons([coupon_id])[coupon_id]
+        CouponArray.update({field: new_id}).where(CouponArray.id == coupon_array_id).execute()
+        return new_id
+
+
+def update_slot(coupon_array_id, slot, values):
+    """Update the coupon in slot with values, copying it first if it is shared"""
+    with database.atomic():
+        coupon_id = private_slot(coupon_array_id, slot)
+        if coupon_id is not None:
+            Coupon.update(values).where(Coupon.id == coupon_id).execute()
+        return coupon_id
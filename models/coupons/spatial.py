@@ -0,0 +1,164 @@
+"""
+Region, radius, nearest and collision queries over coupon positions
+
+Every query goes through the coupon_positions R-tree
+(models.coupons.coupon_position), so only coupons in the bounding box of
+the search are read, then the exact test runs on the coupons' own columns
+(R-tree boxes are stored as 32-bit floats and rounded outwards). The index
+covers the plate's XY plane; a z range or z coordinate, when given, is
+checked on the coupon itself. Searches can be scoped to one coupon array or
+to the coupon array of a build.
+"""
+
+import math
+from collections import namedtuple
+
+import peewee as pw
+
+from models.coupons.coupon import Coupon
+from models.coupons.coupon_array import CouponArray
+from models.coupons.coupon_position import CouponPosition
+from models.coupons.preset_clone import SLOT_FIELDS
+
+CouponPoint = namedtuple('CouponPoint', ['id', 'x', 'y', 'z'])
+# distance is in the XY plane, or 3D when the search had a z
+CouponDistance = namedtuple('CouponDistance', ['id', 'x', 'y', 'z', 'distance'])
+CouponOverlap = namedtuple('CouponOverlap', ['id', 'other_id', 'distance'])
+
+# Starting half-width (mm) of the nearest-neighbour search box; doubled until enough coupons are found
+_NEAREST_START = 10.0
+
+
+def scope_ids(coupon_array=None, build=None):
+    """Coupon ids of a coupon array (or a build's array); None when unscoped"""
+    if build is not None:
+        from models.builds.build import Build
+        coupon_array = (Build.select(Build.coupon_array_id.alias('id'))
+                        .where(Build.id == build).scalar())
+        if coupon_array is None:
+            return []
+    if coupon_array is None:
+        return None
+    row = (CouponArray.select(*[getattr(CouponArray, name) for name in SLOT_FIELDS])
+           .where(CouponArray.id == coupon_array).tuples().first())
+    return sorted({coupon_id for coupon_id in row or () if coupon_id is not None})
+
+
+def _box_query(min_x, max_x, min_y, max_y, min_z=None, max_z=None, ids=None):
+    """Coupons whose position box lies in the given box, joined through the R-tree"""
+    query = (Coupon
+             .select(Coupon.id, Coupon.x_position, Coupon.y_position, Coupon.z_position)
+             .join(CouponPosition, on=(CouponPosition.id == Coupon.id))
+             .where((CouponPosition.max_x >= min_x) & (CouponPosition.min_x <= max_x) &
+                    (CouponPosition.max_y >= min_y) & (CouponPosition.min_y <= max_y) &
+                    Coupon.x_position.between(min_x, max_x) & Coupon.y_position.between(min_y, max_y)))
+    if min_z is not None:
+        query = query.where(Coupon.z_position >= min_z)
+    if max_z is not None:
+        query = query.where(Coupon.z_position <= max_z)
+    if ids is not None:
+        query = query.where(Coupon.id.in_(ids))
+    return query
+
+
+def coupons_in_box(min_x, max_x, min_y, max_y, min_z=None, max_z=None, coupon_array=None, build=None):
+    """CouponPoint for each coupon inside the box (edges included)"""
+    ids = scope_ids(coupon_array, build)
+    if ids == []:
+        return []
+    query = _box_query(min_x, max_x, min_y, max_y, min_z, max_z, ids)
+    return [CouponPoint(*row) for row in query.order_by(Coupon.id).tuples()]
+
+
+def _distance(x, y, z, point):
+    if z is None:
+        return math.hypot(point.x - x, point.y - y)
+    return math.dist((point.x, point.y, point.z), (x, y, z))
+
+
+def _around(x, y, z, radius, ids):
+    zs = (None, None) if z is None else (z - radius, z + radius)
+    found = []
+    for row in _box_query(x - radius, x + radius, y - radius, y + radius, *zs, ids=ids).tuples():
+        point = CouponPoint(*row)
+        distance = _distance(x, y, z, point)
+        if distance <= radius:
+            found.append(CouponDistance(*point, distance))
+    return sorted(found, key=lambda found_point: (found_point.distance, found_point.id))
+
+
+def coupons_within(x, y, radius, z=None, coupon_array=None, build=None):
+    """CouponDistance for each coupon within radius of (x, y[, z]), nearest first"""
+    ids = scope_ids(coupon_array, build)
+    if ids == []:
+        return []
+    return _around(x, y, z, radius, ids)
+
+
+def nearest_coupons(x, y, count=1, z=None, coupon_array=None, build=None):
+    """The count coupons nearest to (x, y[, z]), nearest first
+
+    The search box starts small and doubles until it holds count coupons
+    within its inscribed radius, so a dense plate is answered from a
+    handful of R-tree pages. count is capped by the scoped coupons that have
+    a position (slots can point at deleted coupons), and the search stops
+    once the radius reaches every one of them.
+    """
+    ids = scope_ids(coupon_array, build)
+    if ids == []:
+        return []
+    query = (Coupon
+             .select(pw.fn.COUNT(Coupon.id if z is None else Coupon.z_position),
+                     pw.fn.MIN(Coupon.x_position), pw.fn.MAX(Coupon.x_position),
+                     pw.fn.MIN(Coupon.y_position), pw.fn.MAX(Coupon.y_position),
+                     pw.fn.MIN(Coupon.z_position), pw.fn.MAX(Coupon.z_position))
+             .join(CouponPosition, on=(CouponPosition.id == Coupon.id)))
+    if ids is not None:
+        query = query.where(Coupon.id.in_(ids))
+    indexed, min_x, max_x, min_y, max_y, min_z, max_z = query.tuples().get()
+    count = min(count, indexed)
+    if count <= 0:
+        return []
+    # Distance from (x, y[, z]) to the farthest corner of the coupons' bounds
+    reach = math.hypot(max(abs(x - min_x), abs(x - max_x)), max(abs(y - min_y), abs(y - max_y)))
+    if z is not None:
+        reach = math.hypot(reach, max(abs(z - min_z), abs(z - max_z)))
+    radius = _NEAREST_START
+    while True:
+        found = _around(x, y, z, radius, ids)
+        if len(found) >= count or radius >= reach:
+            return found[:count]
+        radius *= 2
+
+
+def overlapping_coupons(clearance, coupon_array=None, build=None):
+    """CouponOverlap for each pair of coupons closer than clearance in XY
+
+    clearance is the minimum centre-to-centre spacing, e.g. the coupon
+    footprint diameter plus the gap the machine needs. Each coupon probes
+    the R-tree with a box of +-clearance around it; only the coupons in that
+    box get the exact distance check.
+    """
+    ids = scope_ids(coupon_array, build)
+    if ids == []:
+        return []
+    other = Coupon.alias()
+    dx = Coupon.x_position - other.x_position
+    dy = Coupon.y_position - other.y_position
+    # CROSS JOIN keeps coupons as the outer loop so every coupon probes the
+    # R-tree; left to itself SQLite scans the R-tree and range-scans coupons
+    box = ((CouponPosition.min_x <= Coupon.x_position + clearance) &
+           (CouponPosition.max_x >= Coupon.x_position - clearance) &
+           (CouponPosition.min_y <= Coupon.y_position + clearance) &
+           (CouponPosition.max_y >= Coupon.y_position - clearance))
+    query = (Coupon
+             .select(Coupon.id, other.id, dx * dx + dy * dy)
+             .join(CouponPosition, pw.JOIN.CROSS)
+             .join_from(CouponPosition, other, pw.JOIN.CROSS)
+             .where(box & (other.id == CouponPosition.id) & (other.id > Coupon.id) &
+                    (dx * dx + dy * dy < clearance * clearance))
+             .order_by(Coupon.id, other.id))
+    if ids is not None:
+        query = query.where(Coupon.id.in_(ids) & other.id.in_(ids))
+    return [CouponOverlap(coupon_id, other_id, math.sqrt(squared))
+            for coupon_id, other_id, squared in query.tuples()]
@@ -0,0 +1,112 @@
+"""
+Set-based deletes: plan the full impact of deleting many rows, then apply it
+
+plan_delete(model, ids) walks every foreign key that points at model with
+one grouped query per key (not per row) and sorts the referencing rows into:
+    cascade   rows deleted along with them (CASCADE keys and keys that are
+              also the child's primary key, e.g. powder_compositions);
+              planned recursively
+    nullify   nullable references, set to NULL
+    broken    non-nullable references that will dangle (as deleting a
+              single row has always done); models.integrity finds them later
+execute_plan() then runs UPDATE/DELETE ... WHERE ... IN (...) statements for
+the whole plan in one transaction.
+"""
+
+from collections import namedtuple
+
+from database.connection import database
+from models.integrity import foreign_keys
+
+# Stay below SQLITE_MAX_VARIABLE_NUMBER on older SQLite builds
+_IN_CHUNK = 900
+
+# model/field: the referencing column; count: rows that reference the deleted set
+Reference = namedtuple('Reference', ['model', 'field', 'count'])
+
+
+class DeletePlan:
+    def __init__(self):
+        # model -> set of primary keys, in the order models were reached
+        self.deletes = {}
+        self.nullify = []
+        self.broken = []
+
+    def total(self):
+        return sum(len(ids) for ids in self.deletes.values())
+
+    def summary(self):
+        """Human readable lines describing the plan (slot columns of one table are grouped)"""
+        lines = [f"Delete {len(ids)} row{'s' if len(ids) != 1 else ''} from {model._meta.table_name}"
+                 for model, ids in self.deletes.items() if ids]
+        for refs, action in ((self.nullify, "Clear"), (self.broken, "Leave dangling:")):
+            by_table = {}
+            for ref in refs:
+                by_table.setdefault(ref.model._meta.table_name, []).append(ref)
+            for table, table_refs in by_table.items():
+                count = sum(ref.count for ref in table_refs)
+                columns = ', '.join(ref.field.column_name for ref in table_refs[:3])
+                if len(table_refs) > 3:
+                    columns += f" and {len(table_refs) - 3} more columns"
+                lines.append(f"{action} {count} reference{'s' if count != 1 else ''} in {table} ({columns})")
+        return lines
+
+
+def _chunks(ids):
+    ids = list(ids)
+    for start in range(0, len(ids), _IN_CHUNK):
+        yield ids[start:start + _IN_CHUNK]
+
+
+def _cascades(field):
+    return field.primary_key or (field.on_delete or '').upper() == 'CASCADE'
+
+
+def _referencing(child, field, target_ids):
+    """Primary keys of child rows whose field is in target_ids"""
+    found = set()
+    for chunk in _chunks(target_ids):
+        found.update(pk for (pk,) in child.select(child._meta.primary_key).where(field.in_(chunk)).tuples())
+    return found
+
+
+def plan_delete(model_cls, ids, keys=None):
+    """DeletePlan for deleting the rows of model_cls with primary keys in ids"""
+    keys = foreign_keys() if keys is None else keys
+    plan = DeletePlan()
+    # Everything that goes: the rows themselves and, recursively, their cascades
+    pending = [(model_cls, set(ids))]
+    while pending:
+        model, ids = pending.pop(0)
+        ids -= plan.deletes.setdefault(model, set())
+        if not ids:
+            continue
+        plan.deletes[model] |= ids
+        for child, field in keys:
+            if field.rel_model is model and _cascades(field):
+                child_ids = _referencing(child, field, ids)
+                if child_ids:
+                    pending.append((child, child_ids))
+    # Then one query per key into the deleted set, ignoring rows that go too
+    for child, field in keys:
+        if _cascades(field) or field.rel_model not in plan.deletes:
+            continue
+        rows = _referencing(child, field, plan.deletes[field.rel_model]) - plan.deletes.get(child, set())
+        if rows:
+            (plan.nullify if field.null else plan.broken).append(Reference(child, field, len(rows)))
+    return plan
+
+
+def execute_plan(plan):
+    """Apply a DeletePlan in one transaction; returns the number of rows deleted"""
+    deleted = 0
+    with database.atomic():
+        for ref in plan.nullify:
+            for chunk in _chunks(plan.deletes[ref.field.rel_model]):
+                ref.model.update({ref.field: None}).where(ref.field.in_(chunk)).execute()
+        # Children were reached after their parents; delete them first
+        for model, ids in reversed(list(plan.deletes.items())):
+            pk = model._meta.primary_key
+            for chunk in _chunks(ids):
+                deleted += model.delete().where(pk.in_(chunk)).execute()
+    return deleted
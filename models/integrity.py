@@ -0,0 +1,124 @@
+"""
+Referential integrity checks for every foreign key in the schema
+
+SQLite's foreign_keys pragma is off, so a deleted parent can leave children
+pointing at nothing. scan() finds those with one anti-join per foreign key
+(child LEFT JOIN parent WHERE parent IS NULL), including each of the 256
+coupon_array and 128 part_list slot columns, instead of dereferencing rows
+one at a time. repair() re-points or clears the references it found and
+delete_dangling() removes the rows, for any number of foreign keys, in one
+transaction.
+"""
+
+from collections import namedtuple
+
+import peewee as pw
+
+from database.connection import database
+
+# A foreign key with dangling references; rows are (row id, missing id) pairs
+ForeignKeyCheck = namedtuple('ForeignKeyCheck', ['model', 'field', 'rows'])
+
+
+def all_models():
+    from models.builds.build import Build
+    from models.builds.build_log import BuildLog, BuildLogChunk
+    from models.coupons.coupon import Coupon
+    from models.coupons.coupon_array import CouponArray
+    from models.coupons.coupon_composition import CouponComposition
+    from models.jobs.job import Job
+    from models.jobs.part import Part
+    from models.jobs.part_list import PartList
+    from models.jobs.work_order import WorkOrder
+    from models.plates.plate import Plate
+    from models.powders.powder import Powder
+    from models.powders.powder_composition import PowderComposition
+    from models.powders.powder_results import PowderResults
+    from models.settings.feature_settings import FeatureSetting
+    from models.settings.setting import Setting
+    return [Build, BuildLog, BuildLogChunk, Coupon, CouponArray, CouponComposition, Job, Part, PartList,
+            WorkOrder, Plate, Powder, PowderComposition, PowderResults, FeatureSetting, Setting]
+
+
+def foreign_keys(models=None):
+    """(model, field) for every foreign key of models whose tables exist"""
+    tables = set(database.get_tables())
+    return [(model, field)
+            for model in (models or all_models()) if model._meta.table_name in tables
+            for field in model._meta.sorted_fields
+            if isinstance(field, pw.ForeignKeyField) and field.rel_model._meta.table_name in tables]
+
+
+def _missing_parent(model, field):
+    parent = field.rel_model.alias()
+    parent_key = getattr(parent, field.rel_field.name)
+    return parent, parent_key, field.is_null(False) & parent_key.is_null()
+
+
+def dangling(model, field):
+    """[(row id, missing id)] for rows of model whose field points at no row"""
+    parent, parent_key, missing = _missing_parent(model, field)
+    return list(model
+                .select(model._meta.primary_key, field)
+                .join(parent, pw.JOIN.LEFT_OUTER, on=(field == parent_key))
+                .where(missing)
+                .tuples())
+
+
+def scan(models=None, progress=None, should_stop=None):
+    """ForeignKeyCheck for each foreign key with dangling references
+
+    progress(done, total) is called after each key; scanning ends early
+    when should_stop() returns True.
+    """
+    keys = foreign_keys(models)
+    found = []
+    for done, (model, field) in enumerate(keys, start=1):
+        if should_stop is not None and should_stop():
+            break
+        rows = dangling(model, field)
+        if rows:
+            found.append(ForeignKeyCheck(model, field, rows))
+        if progress is not None:
+            progress(done, len(keys))
+    return found
+
+
+def _dangling_rows(model, field, row_ids):
+    """WHERE clause for the rows in row_ids (None for all) whose field still points at no row"""
+    condition = field.is_null(False) & field.not_in(field.rel_model.select(field.rel_field))
+    if row_ids is not None:
+        condition &= model._meta.primary_key.in_(list(row_ids))
+    return condition
+
+
+def repair(items, target_id=None):
+    """Point the dangling references in items at target_id, or clear them when it is None
+
+    items are (model, field, row ids or None for all) triples. Only rows
+    whose reference is still dangling are changed; all of it happens in one
+    transaction. Returns the number of rows updated.
+    """
+    items = list(items)
+    for model, field, _ in items:
+        name = f"{model._meta.table_name}.{field.column_name}"
+        if field.primary_key:
+            raise ValueError(f"{name} is the primary key; delete the rows instead")
+        if target_id is None and not field.null:
+            raise ValueError(f"{name} can't be NULL; re-point it instead")
+        if target_id is not None and not field.rel_model.select().where(field.rel_field == target_id).exists():
+            raise ValueError(f"No {field.rel_model._meta.table_name} row with id {target_id}")
+    updated = 0
+    with database.atomic():
+        for model, field, row_ids in items:
+            updated += model.update({field: target_id}).where(_dangling_rows(model, field, row_ids)).execute()
+    return updated
+
+
+def delete_dangling(items):
+    """Delete the rows with dangling references in items, in one transaction; returns the count"""
+    deleted = 0
+    with database.atomic():
+        for model, field, row_ids in items:
+            deleted += model.delete().where(_dangling_rows(model, field, row_ids)).execute()
+    return deleted
@@ -7,7 +7,7 @@ from models.jobs.part_list import PartList
 
 class Job(BaseModel):
     id = pw.AutoField()
-    name = pw.CharField()
+    name = pw.CharField(index=True)
     description = pw.CharField()
     part_list = pw.ForeignKeyField(PartList, null=True, backref='jobs')
     work_order = pw.ForeignKeyField(WorkOrder, null=False, backref='jobs')
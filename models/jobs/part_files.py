@@ -0,0 +1,193 @@
+"""
+Catalog of the files parts point at: size, mtime and content hash per path
+
+part_files holds one row per distinct Part.file_path. scan_part_files()
+stats every path on a thread pool and hashes only files that are new or
+whose size or mtime changed, so a rescan of an unchanged tree costs one
+stat per file. Paths that can't be found are kept with missing set (their
+last hash stays, so a file that comes back unchanged isn't hashed again);
+catalog rows no longer referenced by any part are dropped.
+
+Threads rather than processes: stat() and file reads wait on the disk or
+the network share, and hashlib releases the GIL while hashing large
+buffers. The hash is SHA-256 of the contents, the same digest
+part_geometry stores.
+
+duplicate_files() groups paths with identical contents, and
+merge_duplicate_paths() points every part at one path per group.
+"""
+
+import hashlib
+import os
+from collections import namedtuple, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import peewee as pw
+
+from database.connection import database
+from models.base import BaseModel
+from models.jobs.part import Part
+
+WORKERS = 16
+_READ_BYTES = 1 << 20
+# Paths stat-ed per pool task; one future per file would cost more than a warm stat
+_STAT_BATCH = 256
+_IN_CHUNK = 900
+# 6 values per row; stay below SQLITE_MAX_VARIABLE_NUMBER on older SQLite builds
+_INSERT_CHUNK = 150
+
+ScanResult = namedtuple('ScanResult', ['paths', 'unchanged', 'hashed', 'missing', 'failed', 'dropped'])
+# paths: sorted paths sharing content_hash; part_ids: parts pointing at any of them
+DuplicateGroup = namedtuple('DuplicateGroup', ['content_hash', 'size', 'paths', 'part_ids'])
+MissingFile = namedtuple('MissingFile', ['path', 'part_ids', 'last_seen'])
+
+
+class PartFile(BaseModel):
+    path = pw.CharField(primary_key=True)
+    size = pw.BigIntegerField(null=True)
+    mtime_ns = pw.BigIntegerField(null=True)
+    content_hash = pw.CharField(null=True, index=True)
+    missing = pw.BooleanField(default=False)
+    last_seen = pw.DateTimeField(null=True)  # last scan that found the file
+
+    class Meta:
+        table_name = 'part_files'
+
+
+def hash_file(path):
+    """SHA-256 hex digest of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(_READ_BYTES), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _stat(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _stat_batch(paths):
+    return [_stat(path) for path in paths]
+
+
+def _hash(path):
+    try:
+        return hash_file(path)
+    except OSError:
+        return None
+
+
+def referenced_paths():
+    """Distinct non-empty Part.file_path values"""
+    return [path for (path,) in
+            Part.select(Part.file_path).distinct()
+            .where(Part.file_path.is_null(False) & (Part.file_path != '')).tuples()]
+
+
+def scan_part_files(workers=WORKERS, rehash=False):
+    """Bring part_files up to date with the files on disk; returns a ScanResult of counts
+
+    rehash hashes every file found, not only new and changed ones. Files
+    that disappear between stat and hash count as failed and are checked
+    again on the next scan.
+    """
+    paths = referenced_paths()
+    # last_seen is left out: parsing thousands of datetimes would cost more than the stats
+    catalog = {row[0]: row[1:] for row in
+               PartFile.select(PartFile.path, PartFile.size, PartFile.mtime_ns, PartFile.content_hash,
+                               PartFile.missing).tuples()}
+    now = datetime.now()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='part-files') as pool:
+        batches = [paths[start:start + _STAT_BATCH] for start in range(0, len(paths), _STAT_BATCH)]
+        stats = dict(zip(paths, (stat for batch in pool.map(_stat_batch, batches) for stat in batch)))
+        to_hash = [path for path, stat in stats.items() if stat is not None and (
+            rehash or path not in catalog or catalog[path][2] is None or catalog[path][:2] != stat)]
+        hashes = dict(zip(to_hash, pool.map(_hash, to_hash)))
+    rows, gone, unchanged, missing, failed = [], [], 0, 0, 0
+    for path, stat in stats.items():
+        old = catalog.get(path)
+        if stat is None:
+            missing += 1
+            if old is None:
+                rows.append((path, None, None, None, True, None))
+            elif not old[3]:
+                gone.append(path)
+        elif path in hashes:
+            if hashes[path] is None:
+                failed += 1
+                continue
+            rows.append((path, stat[0], stat[1], hashes[path], False, now))
+        else:
+            unchanged += 1
+            if old[3]:
+                rows.append((path, stat[0], stat[1], old[2], False, now))
+    dropped = [path for path in catalog if path not in stats]
+    fields = [PartFile.path, PartFile.size, PartFile.mtime_ns, PartFile.content_hash, PartFile.missing,
+              PartFile.last_seen]
+    with database.atomic():
+        for start in range(0, len(rows), _INSERT_CHUNK):
+            PartFile.insert_many(rows[start:start + _INSERT_CHUNK], fields=fields).on_conflict_replace().execute()
+        for start in range(0, len(gone), _IN_CHUNK):
+            PartFile.update(missing=True).where(PartFile.path.in_(gone[start:start + _IN_CHUNK])).execute()
+        for start in range(0, len(dropped), _IN_CHUNK):
+            PartFile.delete().where(PartFile.path.in_(dropped[start:start + _IN_CHUNK])).execute()
+        # One statement instead of rewriting every unchanged row
+        PartFile.update(last_seen=now).where(PartFile.missing == False).execute()
+    return ScanResult(len(paths), unchanged, len(hashes) - failed, missing, failed, len(dropped))
+
+
+def _part_ids_by_path(paths):
+    found = defaultdict(list)
+    paths = list(paths)
+    for start in range(0, len(paths), _IN_CHUNK):
+        for part_id, path in (Part.select(Part.id, Part.file_path)
+                              .where(Part.file_path.in_(paths[start:start + _IN_CHUNK])).tuples()):
+            found[path].append(part_id)
+    return found
+
+
+def duplicate_files():
+    """DuplicateGroup for each content hash shared by more than one present path"""
+    shared = (PartFile.select(PartFile.content_hash)
+              .where(PartFile.content_hash.is_null(False) & (PartFile.missing == False))
+              .group_by(PartFile.content_hash).having(pw.fn.COUNT(PartFile.path) > 1))
+    groups = defaultdict(list)
+    sizes = {}
+    for content_hash, path, size in (PartFile.select(PartFile.content_hash, PartFile.path, PartFile.size)
+                                     .where(PartFile.content_hash.in_(shared) & (PartFile.missing == False))
+                                     .order_by(PartFile.content_hash, PartFile.path).tuples()):
+        groups[content_hash].append(path)
+        sizes[content_hash] = size
+    part_ids = _part_ids_by_path(path for paths in groups.values() for path in paths)
+    return [DuplicateGroup(content_hash, sizes[content_hash], paths,
+                           sorted(part_id for path in paths for part_id in part_ids[path]))
+            for content_hash, paths in groups.items()]
+
+
+def missing_files():
+    """MissingFile for each referenced path the last scan couldn't find"""
+    rows = list(PartFile.select(PartFile.path, PartFile.last_seen)
+                .where(PartFile.missing == True).order_by(PartFile.path).tuples())
+    part_ids = _part_ids_by_path(path for path, _ in rows)
+    return [MissingFile(path, sorted(part_ids[path]), last_seen) for path, last_seen in rows]
+
+
+def merge_duplicate_paths(groups=None):
+    """Point the parts of each duplicate group at its first path; returns the parts updated
+
+    The other paths' catalog rows go too, as no part references them any more.
+    """
+    groups = duplicate_files() if groups is None else groups
+    updated = 0
+    with database.atomic():
+        for group in groups:
+            keep, others = group.paths[0], group.paths[1:]
+            updated += Part.update(file_path=keep).where(Part.file_path.in_(others)).execute()
+            PartFile.delete().where(PartFile.path.in_(others)).execute()
+    return updated
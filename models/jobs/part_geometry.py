@@ -0,0 +1,139 @@
+"""
+Cached STL geometry of parts: volume, surface area and bounding box
+
+part_geometry holds one row per STL path with the file's size, mtime and
+content hash next to its metrics. A cached row is used as long as the size
+and mtime still match the file. When either changed the file is hashed
+again, and if the content is the same (a touch or a copy) the metrics are
+kept without parsing the mesh.
+
+Files that need measuring are spread over a process pool
+(models.jobs.stl.measure_file); hashing and parsing are CPU-bound, so
+threads wouldn't help. A single file, or workers=1, is measured in this
+process. Files that can't be read are reported with an error and are not
+cached.
+"""
+
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import peewee as pw
+
+from database.connection import database
+from models.base import BaseModel
+from models.jobs.part import Part
+from models.jobs.stl import MeshMetrics, measure_file
+
+_IN_CHUNK = 900
+# 15 values per row; stay below SQLITE_MAX_VARIABLE_NUMBER on older SQLite builds
+_INSERT_CHUNK = 60
+
+# cached: True when the metrics came from part_geometry without parsing the file
+PathGeometry = namedtuple('PathGeometry', ['path'] + list(MeshMetrics._fields) + ['cached', 'error'])
+PartGeometry = namedtuple('PartGeometry', ['part_id', 'name'] + list(PathGeometry._fields))
+
+
+class GeometryCache(BaseModel):
+    path = pw.CharField(primary_key=True)
+    size = pw.BigIntegerField()
+    mtime_ns = pw.BigIntegerField()
+    content_hash = pw.CharField(index=True)
+    triangles = pw.IntegerField()
+    volume = pw.FloatField()
+    area = pw.FloatField()
+    min_x = pw.FloatField(null=True)
+    min_y = pw.FloatField(null=True)
+    min_z = pw.FloatField(null=True)
+    max_x = pw.FloatField(null=True)
+    max_y = pw.FloatField(null=True)
+    max_z = pw.FloatField(null=True)
+
+    class Meta:
+        table_name = 'part_geometry'
+
+
+_METRIC_FIELDS = [getattr(GeometryCache, name) for name in MeshMetrics._fields]
+
+
+def _cached_rows(paths):
+    rows = {}
+    fields = [GeometryCache.path, GeometryCache.size, GeometryCache.mtime_ns, GeometryCache.content_hash]
+    for start in range(0, len(paths), _IN_CHUNK):
+        chunk = paths[start:start + _IN_CHUNK]
+        for row in (GeometryCache.select(*fields, *_METRIC_FIELDS)
+                    .where(GeometryCache.path.in_(chunk)).tuples()):
+            rows[row[0]] = (row[1], row[2], row[3], MeshMetrics(*row[4:]))
+    return rows
+
+
+def _run(jobs, workers):
+    if workers == 1 or len(jobs) < 2:
+        return [measure_file(path, known_hash) for path, known_hash in jobs]
+    paths, known_hashes = zip(*jobs)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Big chunks for many small files, so the pool isn't dominated by messaging
+        chunksize = max(1, len(jobs) // ((workers or os.cpu_count() or 1) * 4))
+        return list(pool.map(measure_file, paths, known_hashes, chunksize=chunksize))
+
+
+def _store(measurements):
+    rows = [dict(path=m.path, size=m.size, mtime_ns=m.mtime_ns, content_hash=m.content_hash,
+                 **m.metrics._asdict())
+            for m in measurements]
+    with database.atomic():
+        for start in range(0, len(rows), _INSERT_CHUNK):
+            GeometryCache.insert_many(rows[start:start + _INSERT_CHUNK]).on_conflict_replace().execute()
+
+
+def measure_paths(paths, workers=None):
+    """PathGeometry for each distinct path, in the order given
+
+    workers is the process pool size (None: one per CPU). New and changed
+    measurements are written to part_geometry in one transaction.
+    """
+    paths = list(dict.fromkeys(paths))
+    cached = _cached_rows(paths)
+    results, jobs = {}, []
+    for path in paths:
+        row = cached.get(path)
+        try:
+            stat = os.stat(path)
+        except OSError as e:
+            results[path] = PathGeometry(path, *[None] * len(MeshMetrics._fields), False, str(e))
+            continue
+        if row is not None and (row[0], row[1]) == (stat.st_size, stat.st_mtime_ns):
+            results[path] = PathGeometry(path, *row[3], True, None)
+        else:
+            jobs.append((path, row[2] if row else None))
+    fresh = []
+    for measurement in _run(jobs, workers):
+        path = measurement.path
+        if measurement.error is not None:
+            results[path] = PathGeometry(path, *[None] * len(MeshMetrics._fields), False, measurement.error)
+            continue
+        # No metrics: same content as the cached row, only the size/mtime key moves on
+        metrics = measurement.metrics or cached[path][3]
+        fresh.append(measurement._replace(metrics=metrics))
+        results[path] = PathGeometry(path, *metrics, measurement.metrics is None, None)
+    if fresh:
+        _store(fresh)
+    return [results[path] for path in paths]
+
+
+def part_geometry(part_ids=None, workers=None):
+    """PartGeometry for parts with a file_path (every part when part_ids is None)"""
+    query = (Part.select(Part.id, Part.name, Part.file_path)
+             .where(Part.file_path.is_null(False) & (Part.file_path != ''))
+             .order_by(Part.id))
+    parts = []
+    if part_ids is None:
+        parts = list(query.tuples())
+    else:
+        part_ids = list(part_ids)
+        for start in range(0, len(part_ids), _IN_CHUNK):
+            parts.extend(query.where(Part.id.in_(part_ids[start:start + _IN_CHUNK])).tuples())
+        parts.sort()
+    measured = {geometry.path: geometry for geometry in measure_paths([path for _, _, path in parts], workers)}
+    return [PartGeometry(part_id, name, *measured[path]) for part_id, name, path in parts]
+
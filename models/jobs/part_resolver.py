@@ -0,0 +1,83 @@
+"""
+Resolve PartList slots (part_1 .. part_128) to Part rows in bulk
+
+Reading part_list.part_N one slot at a time costs a query per slot. These
+helpers read the slot ids already loaded on the PartList row, fetch all the
+referenced parts with one IN query and return PartRow tuples in slot order.
+resolve_part_lists() does the same for many part lists with a single parts
+query, e.g. for every job of a work order.
+"""
+
+from collections import namedtuple
+
+from models.jobs.part import Part
+from models.jobs.part_list import PartList
+
+PART_SLOTS = 128
+SLOT_FIELDS = [f'part_{slot}' for slot in range(1, PART_SLOTS + 1)]
+PART_FIELDS = ['id', 'name', 'description', 'file_path', 'is_complete']
+
+# slot is 1-based, matching the part_<slot> column
+PartRow = namedtuple('PartRow', ['slot'] + PART_FIELDS)
+
+# Stay below SQLITE_MAX_VARIABLE_NUMBER on older SQLite builds
+_IN_CHUNK = 900
+
+
+def slot_ids(part_list):
+    """[(slot, part_id)] for the filled slots, without touching the parts table"""
+    slots = []
+    for slot, name in enumerate(SLOT_FIELDS, start=1):
+        part_id = getattr(part_list, f'{name}_id', None)
+        if part_id is not None:
+            slots.append((slot, part_id))
+    return slots
+
+
+def fetch_parts(part_ids):
+    """{part_id: row tuple} for part_ids, one query per 900 ids"""
+    part_ids = list(set(part_ids))
+    fields = [getattr(Part, name) for name in PART_FIELDS]
+    found = {}
+    for start in range(0, len(part_ids), _IN_CHUNK):
+        chunk = part_ids[start:start + _IN_CHUNK]
+        for row in Part.select(*fields).where(Part.id.in_(chunk)).tuples():
+            found[row[0]] = row
+    return found
+
+
+def _rows(slots, found):
+    # Slots pointing at a deleted part are skipped
+    return [PartRow(slot, *found[part_id]) for slot, part_id in slots if part_id in found]
+
+
+def resolve_parts(part_list):
+    """PartRow tuples for part_list in slot order ([] for None)"""
+    if part_list is None:
+        return []
+    slots = slot_ids(part_list)
+    return _rows(slots, fetch_parts(part_id for _, part_id in slots))
+
+
+def resolve_part_lists(part_lists):
+    """{part_list_id: [PartRow]} for many PartList instances with one parts query"""
+    slots = {part_list.id: slot_ids(part_list) for part_list in part_lists if part_list is not None}
+    found = fetch_parts(part_id for filled in slots.values() for _, part_id in filled)
+    return {part_list_id: _rows(filled, found) for part_list_id, filled in slots.items()}
+
+
+def resolve_part_list_ids(part_list_ids):
+    """Like resolve_part_lists() but starting from ids: one part_lists query and one parts query"""
+    part_list_ids = [part_list_id for part_list_id in set(part_list_ids) if part_list_id is not None]
+    part_lists = []
+    for start in range(0, len(part_list_ids), _IN_CHUNK):
+        chunk = part_list_ids[start:start + _IN_CHUNK]
+        part_lists.extend(PartList.select().where(PartList.id.in_(chunk)))
+    return resolve_part_lists(part_lists)
+
+
+def resolve_job_parts(jobs):
+    """{job_id: [PartRow]} for jobs (e.g. work_order.jobs), two queries in total"""
+    jobs = list(jobs)
+    resolved = resolve_part_list_ids(job.part_list_id for job in jobs)
+    return {job.id: resolved.get(job.part_list_id, []) for job in jobs}
@@ -0,0 +1,123 @@
+"""
+STL reading and mesh metrics (volume, surface area, bounding box)
+
+Binary STL files are memory-mapped and viewed with np.frombuffer through a
+structured dtype matching the 50-byte triangle record, so the triangles
+are never copied into Python objects; they are converted to float64 a
+block at a time while the metrics accumulate, which keeps memory bounded
+for very large meshes. A file is read as binary when it holds at least the
+triangles its header counts (some exporters pad past the last one, and
+binary headers may start with "solid" too); otherwise it is parsed as
+ASCII STL. An ASCII file without a single facet is an error rather than
+an empty mesh.
+
+The metrics:
+    volume  |sum of v0 . (v1 x v2)| / 6 over all triangles (divergence
+            theorem; exact for a closed mesh, whatever its normals say)
+    area    sum of |(v1 - v0) x (v2 - v0)| / 2
+    bbox    min/max of every vertex
+Units are those of the file, normally millimetres.
+
+measure_file() is a plain function of a path so it can run in a worker
+process; the cache and the process pool live in models.jobs.part_geometry.
+"""
+
+import hashlib
+import mmap
+import os
+import re
+from collections import namedtuple
+
+import numpy as np
+
+HEADER_BYTES = 80
+# Normal, three vertices and the attribute byte count of one binary triangle
+TRIANGLE_DTYPE = np.dtype([('normal', '<f4', (3,)), ('vertices', '<f4', (3, 3)), ('attributes', '<u2')])
+
+# Triangles converted to float64 at a time
+_BLOCK = 1 << 20
+
+_VERTEX = re.compile(rb'vertex\s+(\S+)\s+(\S+)\s+(\S+)')
+
+MeshMetrics = namedtuple('MeshMetrics', [
+    'triangles', 'volume', 'area', 'min_x', 'min_y', 'min_z', 'max_x', 'max_y', 'max_z',
+])
+# What a worker sends back; error is None on success, metrics None on failure.
+# metrics is also None when content_hash equals the hash the caller already has.
+Measurement = namedtuple('Measurement', ['path', 'size', 'mtime_ns', 'content_hash', 'metrics', 'error'])
+
+
+def binary_triangle_count(buffer):
+    """Triangle count of a binary STL in buffer, or None if it isn't one"""
+    if len(buffer) < HEADER_BYTES + 4:
+        return None
+    count = int(np.frombuffer(buffer, dtype='<u4', count=1, offset=HEADER_BYTES)[0])
+    return count if len(buffer) >= HEADER_BYTES + 4 + count * TRIANGLE_DTYPE.itemsize else None
+
+
+def binary_triangles(buffer, count):
+    """(count, 3, 3) float32 view of the vertices in a binary STL buffer (no copy)"""
+    records = np.frombuffer(buffer, dtype=TRIANGLE_DTYPE, count=count, offset=HEADER_BYTES + 4)
+    return records['vertices']
+
+
+def ascii_triangles(buffer):
+    """(n, 3, 3) float64 vertices parsed from an ASCII STL buffer"""
+    values = np.array(_VERTEX.findall(buffer), dtype=float)
+    if len(values) % 3:
+        raise ValueError("ASCII STL has a facet without three vertices")
+    return values.reshape(-1, 3, 3)
+
+
+def mesh_metrics(triangles, block=_BLOCK):
+    """MeshMetrics of an (n, 3, 3) vertex array, block triangles at a time"""
+    count = len(triangles)
+    if not count:
+        return MeshMetrics(0, 0.0, 0.0, *[float('nan')] * 6)
+    signed_volume = area = 0.0
+    low = np.full(3, np.inf)
+    high = np.full(3, -np.inf)
+    for start in range(0, count, block):
+        chunk = np.asarray(triangles[start:start + block], dtype=np.float64)
+        v0, v1, v2 = chunk[:, 0], chunk[:, 1], chunk[:, 2]
+        signed_volume += float(np.einsum('ij,ij->', v0, np.cross(v1, v2)))
+        area += float(np.linalg.norm(np.cross(v1 - v0, v2 - v0), axis=1).sum())
+        vertices = chunk.reshape(-1, 3)
+        low = np.minimum(low, vertices.min(axis=0))
+        high = np.maximum(high, vertices.max(axis=0))
+    return MeshMetrics(count, abs(signed_volume) / 6.0, area / 2.0, *low.tolist(), *high.tolist())
+
+
+def read_metrics(buffer):
+    """MeshMetrics of an STL file's contents (binary, or ASCII as a fallback)"""
+    count = binary_triangle_count(buffer)
+    if count is not None:
+        return mesh_metrics(binary_triangles(buffer, count))
+    if bytes(buffer[:5]).lower() != b'solid':
+        raise ValueError("Not an STL file")
+    triangles = ascii_triangles(buffer)
+    if not len(triangles):
+        raise ValueError("ASCII STL has no facets")
+    return mesh_metrics(triangles)
+
+
+def measure_file(path, known_hash=None):
+    """Measurement of the STL at path; never raises, so a bad file doesn't stop a batch
+
+    When the file's content hash equals known_hash the mesh isn't parsed
+    again and metrics is None (the caller's cached metrics still hold).
+    """
+    try:
+        with open(path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            if not stat.st_size:
+                return Measurement(path, 0, stat.st_mtime_ns, None, None, "Empty file")
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                content_hash = hashlib.sha256(mapped).hexdigest()
+                if content_hash == known_hash:
+                    return Measurement(path, stat.st_size, stat.st_mtime_ns, content_hash, None, None)
+                # The NumPy views of the map are gone once read_metrics returns, so it can close
+                metrics = read_metrics(mapped)
+        return Measurement(path, stat.st_size, stat.st_mtime_ns, content_hash, metrics, None)
+    except (OSError, ValueError) as e:
+        return Measurement(path, None, None, None, None, str(e))
@@ -4,7 +4,7 @@ from models.jobs.part_list import PartList
 
 class WorkOrder(BaseModel):
     id = pw.AutoField()
-    name = pw.CharField()
+    name = pw.CharField(index=True)
     description = pw.CharField()
     pvid = pw.IntegerField()
     part_list = pw.ForeignKeyField(PartList, null=True, backref='work_orders')
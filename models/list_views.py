@@ -0,0 +1,200 @@
+"""
+Column projections for the main window's list tabs
+
+Each ListView selects only the columns a tab displays (primary key first)
+and returns plain tuples, or namedtuples with named=True, instead of model
+instances. Foreign keys are shown as the raw *_id column, so no related row
+is loaded. Counts come from the trigger-maintained row_counts table
+(database.counters), so coupon_arrays' 256 slot columns are never read.
+
+Sorting and column filters are part of the query, and pages are fetched
+with keyset pagination (WHERE (sort value, id) > (last shown) LIMIT n), so
+a page deep into a large table costs the same as the first one. That only
+holds when SQLite can walk an index in sort order, so sorting is offered
+on the columns that lead an index (the primary key, index=True fields and
+foreign keys, the first column of a Meta.indexes entry); sorting by
+anything else, counts included, would sort the whole table for every page.
+Filters work on every column but JSON ones.
+"""
+
+import peewee as pw
+from playhouse.sqlite_ext import JSONField
+
+from database.counters import count_column
+from models.builds.build import Build
+from models.coupons.coupon_array import CouponArray
+from models.jobs.job import Job
+from models.jobs.work_order import WorkOrder
+from models.plates.plate import Plate
+from models.powders.powder import Powder
+from models.settings.setting import Setting
+
+
+class ListView:
+    def __init__(self, model_cls, columns, joins=()):
+        """columns: expressions in display order; joins: (model, join type, on) applied in order"""
+        self.model_cls = model_cls
+        self.columns = columns
+        self.joins = joins
+
+    def expression(self, column):
+        expr = self.columns[column]
+        return expr.unalias() if isinstance(expr, pw.Alias) else expr
+
+    def filterable(self, column):
+        # JSON values don't order or compare meaningfully
+        return not isinstance(self.expression(column), JSONField)
+
+    def sortable(self, column):
+        return self.filterable(column) and _leads_index(self.expression(column))
+
+    def query(self, keys=None, sort=None, descending=False, filters=None, after=None, limit=None):
+        """Rows in (sort column, primary key) order
+
+        filters maps column index to filter text (see filter_condition). after
+        is the sort_key() of the last row already shown; the next page starts
+        right after it, so every page costs the same however deep it is.
+        """
+        pk = self.model_cls._meta.primary_key
+        query = self.model_cls.select(*self.columns)
+        for model, join_type, on in self.joins:
+            query = query.join(model, join_type, on=on)
+        if keys is not None:
+            query = query.where(pk.in_(keys))
+        for column, text in (filters or {}).items():
+            condition = filter_condition(self.expression(column), text)
+            if condition is not None:
+                query = query.where(condition)
+        if sort is None or sort == 0:
+            query = query.order_by(pk.desc() if descending else pk)
+            if after is not None:
+                query = query.where(pk < after[1] if descending else pk > after[1])
+        else:
+            expr = self.expression(sort)
+            query = query.order_by(*((expr.desc(), pk.desc()) if descending else (expr, pk)))
+            if after is not None:
+                query = query.where(_after_condition(expr, pk, after, descending))
+        if limit is not None:
+            query = query.limit(limit)
+        return query
+
+    def rows(self, keys=None, named=False, **options):
+        """Display rows for every row, or only those whose primary key is in keys"""
+        query = self.query(keys, **options)
+        return list(query.namedtuples() if named else query.tuples())
+
+    def sort_key(self, row, sort=None):
+        """Keyset position of a row returned by rows(), for the after= argument"""
+        value = row[sort] if sort else row[0]
+        expr = self.expression(sort) if sort else None
+        if isinstance(expr, pw.Field) and value is not None:
+            value = expr.db_value(value)
+        return value, row[0]
+
+
+def _leads_index(expr):
+    """True when expr is a column some index starts with"""
+    if not isinstance(expr, pw.Field):
+        return False
+    if expr.primary_key or expr.index or expr.unique:
+        return True
+    return any(isinstance(index, (list, tuple)) and index[0][0] == expr.name
+               for index in expr.model._meta.indexes)
+
+
+def _after_condition(expr, pk, after, descending):
+    """Rows after (value, key) in ORDER BY expr, pk; SQLite puts NULLs first ascending, last descending"""
+    value, key = after
+    nullable = not isinstance(expr, pw.Field) or expr.null
+    if value is None:
+        if descending:
+            return expr.is_null() & (pk < key)
+        return (expr.is_null() & (pk > key)) | expr.is_null(False)
+    # Row-value comparison, so SQLite can seek straight to the position in the index
+    if descending:
+        condition = pw.Tuple(expr, pk) < pw.Tuple(value, key)
+        return condition | expr.is_null() if nullable else condition
+    return pw.Tuple(expr, pk) > pw.Tuple(value, key)
+
+
+FILTER_OPERATORS = ('>=', '<=', '!=', '=', '>', '<')
+
+
+def _filter_value(expr, text):
+    if isinstance(expr, pw.BooleanField):
+        return text.lower() in ('yes', 'true', '1')
+    for convert in (int, float):
+        try:
+            return convert(text)
+        except ValueError:
+            pass
+    return text
+
+
+def filter_condition(expr, text):
+    """WHERE condition for a column filter
+
+    '>5', '<=2024-06-01', '!=316L' and '=3' compare; anything else is a
+    case-insensitive prefix match, with * as a wildcard.
+    """
+    text = (text or '').strip()
+    if not text:
+        return None
+    for op in FILTER_OPERATORS:
+        if text.startswith(op):
+            value = _filter_value(expr, text[len(op):].strip())
+            return {'>=': expr >= value, '<=': expr <= value, '!=': expr != value,
+                    '=': expr == value, '>': expr > value, '<': expr < value}[op]
+    if isinstance(expr, pw.BooleanField):
+        return expr == _filter_value(expr, text)
+    return expr ** (text.replace('*', '%') + '%')
+
+
+def _fk_label(fk_field, target_pk, value):
+    # 'None' when the FK is unset, 'Missing (deleted)' when it points nowhere
+    return pw.Case(None, [(fk_field.is_null(), 'None'), (target_pk.is_null(), 'Missing (deleted)')], value)
+
+
+BUILD_LIST = ListView(
+    Build,
+    [Build.id, Build.name, Build.description, Build.datetime,
+     Build.powder_weight_required, Build.powder_weight_loaded,
+     Build.powder_id.alias('powder_id'), Build.setting_id.alias('setting_id'),
+     _fk_label(Build.plate, Plate.id, Plate.description).alias('plate_description'),
+     Build.coupon_array_id.alias('coupon_array_id'), count_column(Build, 'jobs').alias('job_count')],
+    joins=[(Plate, pw.JOIN.LEFT_OUTER, Build.plate == Plate.id)],
+)
+
+WORK_ORDER_LIST = ListView(
+    WorkOrder,
+    [WorkOrder.id, WorkOrder.name, WorkOrder.description, WorkOrder.pvid,
+     WorkOrder.part_list_id.alias('part_list_id'), count_column(WorkOrder, 'jobs').alias('job_count')],
+)
+
+JOB_LIST = ListView(
+    Job,
+    [Job.id, Job.name, Job.description, Job.part_list_id.alias('part_list_id'),
+     Job.work_order_id.alias('work_order_id'), Job.build_id.alias('build_id')],
+)
+
+SETTING_LIST = ListView(
+    Setting,
+    [Setting.id, Setting.name, Setting.description, Setting.is_preset],
+)
+
+POWDER_LIST = ListView(
+    Powder,
+    [Powder.id, Powder.description, Powder.mat_id, Powder.man_lot,
+     Powder.subgroup, Powder.rev, Powder.init_date_time, Powder.quantity],
+)
+
+PLATE_LIST = ListView(
+    Plate,
+    [Plate.id, Plate.description, Plate.material, Plate.foreign_keys_list, Plate.stamped_heights],
+)
+
+COUPON_ARRAY_LIST = ListView(
+    CouponArray,
+    [CouponArray.id, CouponArray.name, CouponArray.description, CouponArray.is_preset,
+     count_column(CouponArray, 'coupons').alias('coupon_count')],
+)
@@ -0,0 +1,70 @@
+"""
+One-query loader for everything the powder detail view shows
+
+load_powder_detail() fetches the Powder row with its PowderComposition and
+PowderResults through LEFT JOINs in a single SELECT. Missing composition or
+results rows come back as None.
+
+Compositions are sparse (a handful of the ~118 elements are set), so each
+powder also gets an element-presence bitmap: bit i is set when ELEMENTS[i]
+has a value. It is computed from the composition row just loaded, which
+costs less than a query to find out whether a cached one is still valid.
+"""
+
+from collections import namedtuple
+
+import peewee as pw
+
+from models.powders.powder import Powder
+from models.powders.powder_composition import PowderComposition, ELEMENTS
+from models.powders.powder_results import PowderResults
+
+PowderDetail = namedtuple('PowderDetail', ['powder', 'composition', 'results', 'element_bits'])
+
+def _instance(model_cls, fields, values):
+    instance = model_cls(**{field.name: value for field, value in zip(fields, values)})
+    instance._dirty.clear()
+    return instance
+
+
+def element_bits(composition):
+    """Bitmap of the elements that have a value in composition"""
+    if composition is None:
+        return 0
+    bits = 0
+    for index, element in enumerate(ELEMENTS):
+        if getattr(composition, element) is not None:
+            bits |= 1 << index
+    return bits
+
+
+def present_elements(bits):
+    """Element names for the set bits, in ELEMENTS order"""
+    return [element for index, element in enumerate(ELEMENTS) if bits >> index & 1]
+
+
+def load_powder_detail(powder_id):
+    """PowderDetail for powder_id, or None if the powder doesn't exist"""
+    powder_fields = Powder._meta.sorted_fields
+    composition_fields = PowderComposition._meta.sorted_fields
+    results_fields = PowderResults._meta.sorted_fields
+    row = (Powder
+           .select(*powder_fields, *composition_fields, *results_fields)
+           .join(PowderComposition, pw.JOIN.LEFT_OUTER)
+           .switch(Powder)
+           .join(PowderResults, pw.JOIN.LEFT_OUTER)
+           .where(Powder.id == powder_id)
+           .tuples()
+           .first())
+    if row is None:
+        return None
+    split = len(powder_fields)
+    powder = _instance(Powder, powder_fields, row[:split])
+    composition_values = row[split:split + len(composition_fields)]
+    results_values = row[split + len(composition_fields):]
+    # The primary key (the powder FK) is NULL when the joined row is missing
+    composition = (_instance(PowderComposition, composition_fields, composition_values)
+                   if composition_values[0] is not None else None)
+    results = (_instance(PowderResults, results_fields, results_values)
+               if results_values[0] is not None else None)
+    return PowderDetail(powder, composition, results, element_bits(composition))
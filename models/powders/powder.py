@@ -7,7 +7,7 @@ from models.base import BaseModel
 
 class Powder(BaseModel):
     id = pw.CharField(primary_key=True, unique=True, max_length=128)  # e.g., <matID>-<manLot>-<subgroup>-<rev>
-    init_date_time = pw.DateTimeField()  # Required field
+    init_date_time = pw.DateTimeField(index=True)  # Required field
     description = pw.CharField(null=True, max_length=255)  # Optional field
     mat_id = pw.CharField(max_length=64)  # Required field
     man_lot = pw.CharField(max_length=64)  # Required field
@@ -16,4 +16,7 @@ class Powder(BaseModel):
     quantity = pw.FloatField(null=True)  # Optional field
 
     class Meta:
-        table_name = 'powders' 
\ No newline at end of file
+        table_name = 'powders'
+        indexes = (
+            (('mat_id', 'man_lot'), False),  # lot lookups
+        ) 
\ No newline at end of file
@@ -126,4 +126,58 @@ class PowderComposition(BaseModel):
     Og = pw.FloatField(null=True)
 
     class Meta:
-        table_name = 'powder_compositions' 
\ No newline at end of file
+        table_name = 'powder_compositions' 
+
+# Element columns in periodic-table order
+ELEMENTS = tuple(field.name for field in PowderComposition._meta.sorted_fields
+                 if isinstance(field, pw.FloatField))
+
+
+def element_fields(elements):
+    """PowderComposition fields for element symbols; ValueError naming any that aren't elements"""
+    unknown = [element for element in elements if element not in ELEMENTS]
+    if unknown:
+        raise ValueError(f"Unknown element{'s' if len(unknown) > 1 else ''}: {', '.join(unknown)}")
+    return [getattr(PowderComposition, element) for element in elements]
+
+
+def composition_sum(*elements):
+    """SQL expression summing the given element percentages (NULLs count as 0)"""
+    return pw.fn.comp_sum(*element_fields(elements))
+
+
+def powders_by_composition_sum(elements, low=None, high=None):
+    """Powders whose summed percentage of elements lies in [low, high], filtered in SQL"""
+    total = composition_sum(*elements)
+    query = Powder.select().join(PowderComposition)
+    if low is not None:
+        query = query.where(total >= low)
+    if high is not None:
+        query = query.where(total <= high)
+    return query.order_by(Powder.id)
+
+
+def nearest_powders(reference, limit=10):
+    """(powder_id, distance) closest to reference {element: percent}, ranked in SQL"""
+    pairs = []
+    for field, value in zip(element_fields(list(reference)), reference.values()):
+        pairs.extend([field, value])
+    distance = pw.fn.comp_distance(*pairs)
+    return list(PowderComposition
+                .select(PowderComposition.powder, distance.alias('distance'))
+                .where(distance.is_null(False))
+                .order_by(distance)
+                .limit(limit)
+                .tuples())
+
+
+def lot_composition(lot, elements):
+    """Quantity-weighted mean composition of the powders in a '<matID>-<manLot>' lot"""
+    columns = [pw.fn.weighted_mean(field, Powder.quantity) for field in element_fields(elements)]
+    row = (PowderComposition
+           .select(*columns)
+           .join(Powder)
+           .where(pw.fn.lot_id(Powder.id) == lot)
+           .tuples()
+           .first())
+    return dict(zip(elements, row or [None] * len(elements)))
@@ -0,0 +1,115 @@
+"""
+Vectorized process-window analytics over all feature settings
+
+process_data() pulls every feature_settings row into NumPy arrays with one
+query and derives, per row:
+    energy_density  volumetric energy density E = P / (v * h * t)  [J/mm^3]
+    areal_energy    P / (v * h)                                    [J/mm^2]
+    linear_energy   P / v                                          [J/mm]
+    build_rate      v * h * t                                      [mm^3/s]
+    band            LACK_OF_FUSION / NOMINAL / KEYHOLE from E
+Rows with a missing or zero parameter get NaN for the metrics that need it.
+
+Results are cached against the feature_settings table version, so repeated
+calls cost one small read until a parameter actually changes.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+from database.table_versions import table_version
+from models.settings.setting import FEATURE_TYPES
+from models.settings.feature_settings import FeatureSetting, PARAMETERS
+
+# Energy density bands (J/mm^3); typical 316L window, adjust per material
+LACK_OF_FUSION_BELOW = 40.0
+KEYHOLE_ABOVE = 120.0
+
+UNKNOWN, LACK_OF_FUSION, NOMINAL, KEYHOLE = range(4)
+BAND_NAMES = ('Unknown', 'Lack of fusion', 'Nominal', 'Keyhole')
+
+ProcessData = namedtuple('ProcessData', [
+    'version', 'setting_id', 'feature_code', 'power', 'scan_speed', 'layer_thick',
+    'hatch_dist', 'energy_density', 'areal_energy', 'linear_energy', 'build_rate', 'band',
+])
+
+_cache = {}
+
+
+def _divide(numerator, denominator):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result = numerator / denominator
+    result[~np.isfinite(result)] = np.nan
+    return result
+
+
+def classify(energy_density):
+    band = np.full(energy_density.shape, UNKNOWN, dtype=np.int8)
+    band[energy_density < LACK_OF_FUSION_BELOW] = LACK_OF_FUSION
+    band[(energy_density >= LACK_OF_FUSION_BELOW) & (energy_density <= KEYHOLE_ABOVE)] = NOMINAL
+    band[energy_density > KEYHOLE_ABOVE] = KEYHOLE
+    return band
+
+
+def load_arrays(version=None):
+    """Read every feature setting into arrays and compute the derived metrics"""
+    codes = {feature_type: code for code, feature_type in enumerate(FEATURE_TYPES)}
+    rows = (FeatureSetting
+            .select(FeatureSetting.setting, FeatureSetting.feature_type,
+                    *[getattr(FeatureSetting, name) for name in PARAMETERS])
+            .tuples())
+    setting_ids, feature_codes, values = [], [], []
+    for setting_id, feature_type, *params in rows:
+        setting_ids.append(setting_id)
+        feature_codes.append(codes.get(feature_type, -1))
+        values.append(params)
+    # None becomes NaN
+    params = np.array(values, dtype=float).reshape(-1, len(PARAMETERS))
+    power, scan_speed, layer_thick, hatch_dist = params.T
+    linear_energy = _divide(power, scan_speed)
+    areal_energy = _divide(linear_energy, hatch_dist)
+    energy_density = _divide(areal_energy, layer_thick)
+    return ProcessData(
+        version=version,
+        setting_id=np.array(setting_ids, dtype=np.int64),
+        feature_code=np.array(feature_codes, dtype=np.int8),
+        power=power, scan_speed=scan_speed, layer_thick=layer_thick, hatch_dist=hatch_dist,
+        energy_density=energy_density, areal_energy=areal_energy, linear_energy=linear_energy,
+        build_rate=scan_speed * hatch_dist * layer_thick,
+        band=classify(energy_density),
+    )
+
+
+def process_data():
+    """Cached load_arrays(); reloaded only when feature_settings has changed"""
+    db = FeatureSetting._meta.database
+    version = table_version(db, FeatureSetting._meta.table_name)
+    key = db.database
+    cached = _cache.get(key)
+    if cached is None or cached.version != version:
+        cached = _cache[key] = load_arrays(version)
+    return cached
+
+
+def setting_summary(data=None):
+    """{setting_id: (min E, max E, features outside the window)}"""
+    data = process_data() if data is None else data
+    summary = {}
+    if not len(data.setting_id):
+        return summary
+    order = np.argsort(data.setting_id, kind='stable')
+    ids = data.setting_id[order]
+    starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])
+    ends = np.r_[starts[1:], len(ids)]
+    energy = data.energy_density[order]
+    outside = np.isin(data.band[order], (LACK_OF_FUSION, KEYHOLE))
+    for start, end in zip(starts, ends):
+        chunk = energy[start:end]
+        known = chunk[~np.isnan(chunk)]
+        summary[int(ids[start])] = (
+            float(known.min()) if len(known) else None,
+            float(known.max()) if len(known) else None,
+            int(outside[start:end].sum()),
+        )
+    return summary
@@ -0,0 +1,130 @@
+"""
+Content hashes of Setting parameter sets, and deduplication built on them
+
+content_hash covers every feature parameter exactly (after rounding away
+float noise), so settings with the same hash run the same process.
+near_hash rounds each value to NEAR_DIGITS significant digits first, so
+settings whose parameters differ only slightly usually share it too
+(values either side of a rounding boundary can still land in different
+buckets). Both are indexed, which makes "is there already a setting like
+this?" a single index lookup instead of a pairwise comparison.
+
+The feature_settings triggers set a setting's hashes to NULL whenever its
+parameters change; refresh_hashes() fills them in again, and every lookup
+here calls it first.
+"""
+
+import hashlib
+import json
+
+import peewee as pw
+
+from models.settings.setting import Setting, FEATURE_TYPES
+from models.settings.feature_settings import PARAMETERS, load_parameters, save_features
+
+EXACT_DIGITS = 9    # decimal places kept for content_hash
+NEAR_DIGITS = 2     # significant digits kept for near_hash
+
+
+def _exact(value):
+    return None if value is None else round(float(value), EXACT_DIGITS)
+
+
+def _near(value):
+    return None if value is None else float(f'{float(value):.{NEAR_DIGITS}g}')
+
+
+def _hash(parameters, normalize):
+    canonical = [[feature_type, [normalize(v) for v in parameters[feature_type]]]
+                 for feature_type in FEATURE_TYPES if feature_type in parameters]
+    text = json.dumps(canonical, separators=(',', ':'))
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def content_hash(parameters):
+    """Hash of {feature_type: (power, scan_speed, layer_thick, hatch_dist)}"""
+    return _hash(parameters, _exact)
+
+
+def near_hash(parameters):
+    return _hash(parameters, _near)
+
+
+def refresh_hashes(setting_ids=None):
+    """Recompute stale (NULL) hashes, or those of setting_ids; returns how many were written"""
+    query = Setting.select(Setting.id)
+    if setting_ids is None:
+        query = query.where(Setting.content_hash.is_null() | Setting.near_hash.is_null())
+    else:
+        query = query.where(Setting.id.in_(list(setting_ids)))
+    ids = [setting_id for setting_id, in query.tuples()]
+    if not ids:
+        return 0
+    parameters = load_parameters(ids)
+    with Setting._meta.database.atomic():
+        for setting_id in ids:
+            params = parameters.get(setting_id, {})
+            (Setting
+             .update(content_hash=content_hash(params), near_hash=near_hash(params))
+             .where(Setting.id == setting_id)
+             .execute())
+    return len(ids)
+
+
+def find_matching(parameters, near=False, exclude_id=None):
+    """Settings whose parameters equal (or, with near=True, nearly equal) parameters"""
+    refresh_hashes()
+    if near:
+        query = Setting.select().where(Setting.near_hash == near_hash(parameters))
+    else:
+        query = Setting.select().where(Setting.content_hash == content_hash(parameters))
+    if exclude_id is not None:
+        query = query.where(Setting.id != exclude_id)
+    return list(query.order_by(Setting.id))
+
+
+def find_duplicates(near=False):
+    """Lists of setting ids that share a hash, lowest id first"""
+    refresh_hashes()
+    column = Setting.near_hash if near else Setting.content_hash
+    query = (Setting
+             .select(column, pw.fn.GROUP_CONCAT(Setting.id))
+             .group_by(column)
+             .having(pw.fn.COUNT(Setting.id) > 1)
+             .tuples())
+    return sorted(sorted(int(i) for i in ids.split(',')) for _, ids in query)
+
+
+def choose_keeper(setting_ids):
+    """Keep a preset if the group has one, otherwise the oldest setting"""
+    presets = [setting_id for setting_id, in Setting.select(Setting.id)
+               .where(Setting.id.in_(setting_ids) & (Setting.is_preset == True)).tuples()]
+    return min(presets or setting_ids)
+
+
+def merge_settings(keep_id, duplicate_ids):
+    """Point builds at keep_id and delete the duplicates; returns the number of builds moved"""
+    from models.builds.build import Build
+    duplicate_ids = [setting_id for setting_id in duplicate_ids if setting_id != keep_id]
+    if not duplicate_ids:
+        return 0
+    with Setting._meta.database.atomic():
+        moved = Build.update(setting=keep_id).where(Build.setting.in_(duplicate_ids)).execute()
+        # The settings_delete_features trigger removes their parameter rows
+        Setting.delete().where(Setting.id.in_(duplicate_ids)).execute()
+    return moved
+
+
+def find_or_create_setting(name, description, parameters, is_preset=False):
+    """Reuse a setting with exactly these parameters; returns (setting, created)"""
+    with Setting._meta.database.atomic():
+        matches = find_matching(parameters)
+        if matches:
+            return matches[0], False
+        setting = Setting.create(name=name, description=description, is_preset=is_preset)
+        save_features(setting, {
+            feature_type: dict(zip(PARAMETERS, values))
+            for feature_type, values in parameters.items()
+        })
+        refresh_hashes([setting.id])
+    return setting, True
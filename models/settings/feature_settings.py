@@ -1,47 +1,107 @@
 import peewee as pw
-from database.connection import database
+from database.table_versions import install_version_triggers
 from models.base import BaseModel
+from models.settings.setting import Setting, FEATURE_TYPES
 
-class BaseFeatureSetting(BaseModel):
+PARAMETERS = ('power', 'scan_speed', 'layer_thick', 'hatch_dist')
+
+# Foreign keys aren't enforced on our connections, so a setting's parameter
+# rows are removed together with the setting here
+DELETE_TRIGGER = (
+    'CREATE TRIGGER IF NOT EXISTS settings_delete_features '
+    'AFTER DELETE ON settings BEGIN '
+    'DELETE FROM feature_settings WHERE setting_id = OLD.id; END')
+
+# Any change to a setting's parameters clears its stored hashes; they are
+# recomputed on demand by models.settings.dedupe
+STALE_HASH_TRIGGERS = [
+    'CREATE TRIGGER IF NOT EXISTS feature_settings_stale_hash_{0} '
+    'AFTER {1} ON feature_settings BEGIN '
+    'UPDATE settings SET content_hash = NULL, near_hash = NULL WHERE id IN ({2}); END'
+    .format(op.lower(), op, rows)
+    for op, rows in (('INSERT', 'NEW.setting_id'),
+                     ('UPDATE', 'OLD.setting_id, NEW.setting_id'),
+                     ('DELETE', 'OLD.setting_id'))
+]
+
+TRIGGERS = [DELETE_TRIGGER] + STALE_HASH_TRIGGERS
+
+
+class FeatureSetting(BaseModel):
+    setting = pw.ForeignKeyField(Setting, backref='features', on_delete='CASCADE')
+    feature_type = pw.CharField()  # one of FEATURE_TYPES
     power = pw.FloatField(null=True)
     scan_speed = pw.FloatField(null=True)
     layer_thick = pw.FloatField(null=True)
     hatch_dist = pw.FloatField(null=True)
-    class Meta:
-        abstract = True
 
-class HatchUpSkin(BaseFeatureSetting):
     class Meta:
-        table_name = 'hatch_up_skins'
+        table_name = 'feature_settings'
+        indexes = (
+            (('setting', 'feature_type'), True),
+        )
 
-class HatchInfill(BaseFeatureSetting):
-    class Meta:
-        table_name = 'hatch_infills'
+    @classmethod
+    def create_table(cls, safe=True, **options):
+        super().create_table(safe=safe, **options)
+        for sql in TRIGGERS:
+            cls._meta.database.execute_sql(sql)
+        install_version_triggers(cls._meta.database, cls._meta.table_name)
 
-class HatchDownSkin(BaseFeatureSetting):
-    class Meta:
-        table_name = 'hatch_down_skins'
+    def parameters(self):
+        return tuple(getattr(self, name) for name in PARAMETERS)
 
-class ContourOnPart(BaseFeatureSetting):
-    class Meta:
-        table_name = 'contour_on_parts'
+    @classmethod
+    def energy_density(cls):
+        """Volumetric energy density as a SQL expression (NULL when a factor is NULL or 0)
 
-class ContourStandard(BaseFeatureSetting):
-    class Meta:
-        table_name = 'contour_standards'
+        Built-in arithmetic on purpose: it matches the expression index below
+        and needs no registered function.
+        """
+        return cls.power / (cls.scan_speed * cls.hatch_dist * cls.layer_thick)
 
-class ContourDown(BaseFeatureSetting):
-    class Meta:
-        table_name = 'contour_downs'
 
-class Edge(BaseFeatureSetting):
-    class Meta:
-        table_name = 'edges'
+FeatureSetting.add_index(FeatureSetting.feature_type, FeatureSetting.energy_density(),
+                         name='featuresetting_feature_type_energy_density')
 
-class Core(BaseFeatureSetting):
-    class Meta:
-        table_name = 'cores'
 
-class Support(BaseFeatureSetting):
-    class Meta:
-        table_name = 'supports' 
\ No newline at end of file
+def save_features(setting, values):
+    """Insert or replace parameter rows; values is {feature_type: {param: value}}"""
+    rows = []
+    for feature_type, params in values.items():
+        if feature_type not in FEATURE_TYPES:
+            raise ValueError(f"Unknown feature type: {feature_type}")
+        row = {name: params.get(name) for name in PARAMETERS}
+        row.update(setting=setting, feature_type=feature_type)
+        rows.append(row)
+    if rows:
+        FeatureSetting.insert_many(rows).on_conflict_replace().execute()
+    setting.__dict__.pop('_features', None)
+
+
+def load_parameters(setting_ids=None):
+    """{setting_id: {feature_type: (power, scan_speed, layer_thick, hatch_dist)}} in one query"""
+    query = FeatureSetting.select(FeatureSetting.setting, FeatureSetting.feature_type,
+                                  *[getattr(FeatureSetting, name) for name in PARAMETERS])
+    if setting_ids is not None:
+        query = query.where(FeatureSetting.setting.in_(list(setting_ids)))
+    result = {}
+    for setting_id, feature_type, *params in query.tuples():
+        result.setdefault(setting_id, {})[feature_type] = tuple(params)
+    return result
+
+
+def settings_in_energy_window(low=None, high=None, feature_type=None):
+    """Settings with a feature whose energy density lies in [low, high], filtered in SQL"""
+    energy = FeatureSetting.energy_density()
+    condition = energy.is_null(False)
+    if feature_type is not None:
+        condition &= FeatureSetting.feature_type == feature_type
+    if low is not None:
+        condition &= energy >= low
+    if high is not None:
+        condition &= energy <= high
+    return (Setting
+            .select()
+            .where(Setting.id.in_(FeatureSetting.select(FeatureSetting.setting).where(condition)))
+            .order_by(Setting.id))
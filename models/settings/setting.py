@@ -1,23 +1,56 @@
 import peewee as pw
 from models.base import BaseModel
-from models.settings.feature_settings import (
-    HatchUpSkin, HatchInfill, HatchDownSkin, ContourOnPart, ContourStandard, ContourDown, Edge, Core, Support
+
+# Scan strategy features a setting has parameters for, in display order
+FEATURE_TYPES = (
+    'hatch_up_skin', 'hatch_infill', 'hatch_down_skin', 'contour_on_part',
+    'contour_standard', 'contour_down', 'edge', 'core', 'support',
 )
 
+
+def _feature_accessor(feature_type):
+    def get_feature(self):
+        return self.feature_map().get(feature_type)
+    get_feature.__doc__ = f"The '{feature_type}' FeatureSetting row, or None"
+    return property(get_feature)
+
+
 class Setting(BaseModel):
     id = pw.AutoField()  # Auto-incrementing primary key
-    name = pw.CharField()
+    name = pw.CharField(index=True)
     description = pw.CharField()
     is_preset = pw.BooleanField()
-    hatch_up_skin = pw.ForeignKeyField(HatchUpSkin, backref='setting')
-    hatch_infill = pw.ForeignKeyField(HatchInfill, backref='setting')
-    hatch_down_skin = pw.ForeignKeyField(HatchDownSkin, backref='setting')
-    contour_on_part = pw.ForeignKeyField(ContourOnPart, backref='setting')
-    contour_standard = pw.ForeignKeyField(ContourStandard, backref='setting')
-    contour_down = pw.ForeignKeyField(ContourDown, backref='setting')
-    edge = pw.ForeignKeyField(Edge, backref='setting')
-    core = pw.ForeignKeyField(Core, backref='setting')
-    support = pw.ForeignKeyField(Support, backref='setting')
+    # Hashes of the full parameter set (models.settings.dedupe); NULL when stale
+    content_hash = pw.CharField(null=True, index=True)
+    near_hash = pw.CharField(null=True, index=True)
 
     class Meta:
-        table_name = 'settings' 
\ No newline at end of file
+        table_name = 'settings'
+
+    def feature_map(self):
+        """{feature_type: FeatureSetting}, loaded with one query on first use"""
+        features = self.__dict__.get('_features')
+        if features is None:
+            Setting.attach_features([self])
+            features = self._features
+        return features
+
+    @classmethod
+    def attach_features(cls, settings):
+        """Load the feature rows of all given settings with a single query"""
+        from models.settings.feature_settings import FeatureSetting
+        settings = list(settings)
+        by_id = {setting.id: setting for setting in settings}
+        for setting in settings:
+            setting._features = {}
+        if by_id:
+            query = FeatureSetting.select().where(FeatureSetting.setting.in_(list(by_id)))
+            for feature in query:
+                by_id[feature.setting_id]._features[feature.feature_type] = feature
+        return settings
+
+
+# Parameters live in feature_settings, one row per (setting, feature_type);
+# setting.hatch_up_skin etc. still return the row for that feature.
+for _feature_type in FEATURE_TYPES:
+    setattr(Setting, _feature_type, _feature_accessor(_feature_type))
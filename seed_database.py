@@ -9,9 +9,9 @@ from models.powders.powder import Powder
 from models.powders.powder_composition import PowderComposition
 from models.powders.powder_results import PowderResults
 from models.settings.setting import Setting
-from models.settings.feature_settings import (
-    HatchUpSkin, HatchInfill, HatchDownSkin, ContourOnPart, ContourStandard, ContourDown, Edge, Core, Support
-)
+from models.settings.setting import FEATURE_TYPES
+from models.settings.feature_settings import FeatureSetting, PARAMETERS
+from models.settings.dedupe import find_or_create_setting
 from models.plates.plate import Plate
 from models.coupons.coupon import Coupon
 from models.coupons.coupon_composition import CouponComposition
@@ -26,6 +26,10 @@ from models.jobs.part_list import PartList
 rand_float = lambda: random.choice([round(random.uniform(0, 100), 2), None])
 rand_int = lambda: random.choice([random.randint(1, 100), None])
 rand_str = lambda: random.choice([f"Sample-{random.randint(1, 1000)}", None])
+rand_features = lambda: {
+    feature_type: tuple(rand_float() for _ in PARAMETERS)
+    for feature_type in FEATURE_TYPES
+}
 
 # Initialize and connect to the database
 init_database()
@@ -33,16 +37,14 @@ init_database()
 # Drop all tables and recreate them for clean seeding
 database.drop_tables([
     Powder, PowderComposition, PowderResults,
-    HatchUpSkin, HatchInfill, HatchDownSkin, ContourOnPart, ContourStandard, ContourDown, Edge, Core, Support,
-    Setting, Plate, Coupon, CouponComposition, CouponArray,
+    Setting, FeatureSetting, Plate, Coupon, CouponComposition, CouponArray,
     Build, WorkOrder, Job,
     Part, PartList
 ], safe=True)
 
 database.create_tables([
     Powder, PowderComposition, PowderResults,
-    HatchUpSkin, HatchInfill, HatchDownSkin, ContourOnPart, ContourStandard, ContourDown, Edge, Core, Support,
-    Setting, Plate, Coupon, CouponComposition, CouponArray,
+    Setting, FeatureSetting, Plate, Coupon, CouponComposition, CouponArray,
     Build, WorkOrder, Job,
     Part, PartList
 ], safe=True)
@@ -89,30 +91,12 @@ powder_results = PowderResults.create(
     apparent_dens=rand_float()
 )
 
-# Create feature settings
-hatch_up_skin = HatchUpSkin.create(power=rand_float(), scan_speed=rand_float(), layer_thick=rand_float(), hatch_dist=rand_float())
-hatch_infill = HatchInfill.create(power=rand_float(), scan_speed=rand_float(), layer_thick=rand_float(), hatch_dist=rand_float())
-hatch_down_skin = HatchDownSkin.create(power=rand_float(), scan_speed=rand_float(), layer_thick=rand_float(), hatch_dist=rand_float())
-contour_on_part = ContourOnPart.create(power=rand_float(), scan_speed=rand_float(), layer_thick=rand_float(), hatch_dist=rand_float())
-contour_standard = ContourStandard.create(power=rand_float(), scan_speed=rand_float(), layer_thick=rand_float(), hatch_dist=rand_float())
-contour_down = ContourDown.create(power=rand_float(), scan_speed=rand_float(), layer_thick=rand_float(), hatch_dist=rand_float())
-edge = Edge.create(power=rand_float(), scan_speed=rand_float(), layer_thick=rand_float(), hatch_dist=rand_float())
-core = Core.create(power=rand_float(), scan_speed=rand_float(), layer_thick=rand_float(), hatch_dist=rand_float())
-support = Support.create(power=rand_float(), scan_speed=rand_float(), layer_thick=rand_float(), hatch_dist=rand_float())
-
-setting = Setting.create(
+# Create setting with random feature parameters (an existing one with the same parameters is reused)
+setting, _ = find_or_create_setting(
     name="Default Setting",
     description="A default setting preset",
-    is_preset=True,
-    hatch_up_skin=hatch_up_skin,
-    hatch_infill=hatch_infill,
-    hatch_down_skin=hatch_down_skin,
-    contour_on_part=contour_on_part,
-    contour_standard=contour_standard,
-    contour_down=contour_down,
-    edge=edge,
-    core=core,
-    support=support
+    parameters=rand_features(),
+    is_preset=True
 )
 
 # Create plate
@@ -238,57 +222,19 @@ powder3_results = PowderResults.create(
     apparent_dens=rand_float()
 )
 
-# Create additional feature settings for setting2
-hatch_up_skin2 = HatchUpSkin.create(power=rand_float(), scan_speed=rand_float(), layer_thick=rand_float(), hatch_dist=rand_float())
-hatch_infill2 = HatchInfill.create(power=rand_float(), scan_speed=rand_float(), layer_thick=rand_float(), hatch_dist=rand_float())
-hatch_down_skin2 = HatchDownSkin.create(power=rand_float(), scan_speed=rand_float(), layer_thick=rand_float(), hatch_dist=rand_float())
-contour_on_part2 = ContourOnPart.create(power=rand_float(), scan_speed=rand_float(), layer_thick=rand_float(), hatch_dist=rand_float())
-contour_standard2 = ContourStandard.create(power=rand_float(), scan_speed=rand_float(), layer_thick=rand_float(), hatch_dist=rand_float())
-contour_down2 = ContourDown.create(power=rand_float(), scan_speed=rand_float(), layer_thick=rand_float(), hatch_dist=rand_float())
-edge2 = Edge.create(power=rand_float(), scan_speed=rand_float(), layer_thick=rand_float(), hatch_dist=rand_float())
-core2 = Core.create(power=rand_float(), scan_speed=rand_float(), layer_thick=rand_float(), hatch_dist=rand_float())
-support2 = Support.create(power=rand_float(), scan_speed=rand_float(), layer_thick=rand_float(), hatch_dist=rand_float())
-
-# Create additional feature settings for setting3
-hatch_up_skin3 = HatchUpSkin.create(power=rand_float(), scan_speed=rand_float(), layer_thick=rand_float(), hatch_dist=rand_float())
-hatch_infill3 = HatchInfill.create(power=rand_float(), scan_speed=rand_float(), layer_thick=rand_float(), hatch_dist=rand_float())
-hatch_down_skin3 = HatchDownSkin.create(power=rand_float(), scan_speed=rand_float(), layer_thick=rand_float(), hatch_dist=rand_float())
-contour_on_part3 = ContourOnPart.create(power=rand_float(), scan_speed=rand_float(), layer_thick=rand_float(), hatch_dist=rand_float())
-contour_standard3 = ContourStandard.create(power=rand_float(), scan_speed=rand_float(), layer_thick=rand_float(), hatch_dist=rand_float())
-contour_down3 = ContourDown.create(power=rand_float(), scan_speed=rand_float(), layer_thick=rand_float(), hatch_dist=rand_float())
-edge3 = Edge.create(power=rand_float(), scan_speed=rand_float(), layer_thick=rand_float(), hatch_dist=rand_float())
-core3 = Core.create(power=rand_float(), scan_speed=rand_float(), layer_thick=rand_float(), hatch_dist=rand_float())
-support3 = Support.create(power=rand_float(), scan_speed=rand_float(), layer_thick=rand_float(), hatch_dist=rand_float())
-
 # Create additional settings
-setting2 = Setting.create(
+setting2, _ = find_or_create_setting(
     name="High Speed Setting",
     description="High speed production setting",
-    is_preset=True,
-    hatch_up_skin=hatch_up_skin2,
-    hatch_infill=hatch_infill2,
-    hatch_down_skin=hatch_down_skin2,
-    contour_on_part=contour_on_part2,
-    contour_standard=contour_standard2,
-    contour_down=contour_down2,
-    edge=edge2,
-    core=core2,
-    support=support2
+    parameters=rand_features(),
+    is_preset=True
 )
 
-setting3 = Setting.create(
+setting3, _ = find_or_create_setting(
     name="Precision Setting",
     description="High precision setting for critical parts",
-    is_preset=True,
-    hatch_up_skin=hatch_up_skin3,
-    hatch_infill=hatch_infill3,
-    hatch_down_skin=hatch_down_skin3,
-    contour_on_part=contour_on_part3,
-    contour_standard=contour_standard3,
-    contour_down=contour_down3,
-    edge=edge3,
-    core=core3,
-    support=support3
+    parameters=rand_features(),
+    is_preset=True
 )
 
 # Create additional plates
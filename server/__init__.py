@@ -0,0 +1 @@
+# Local JSON API server package
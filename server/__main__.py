@@ -0,0 +1,45 @@
+"""
+Run the local JSON API server
+
+    python -m server --host 0.0.0.0 --port 8765 --workers 4
+"""
+
+import argparse
+import asyncio
+import os
+
+from database.connection import database, init_database
+
+
+async def serve(host, port, workers):
+    from server.api import ApiApp
+    from server.http import serve_connection
+    app = ApiApp(read_workers=workers)
+    server = await asyncio.start_server(
+        lambda r, w: serve_connection(r, w, app), host, port)
+    print(f"DMLS API listening on http://{host}:{port}/api ({workers} read workers)")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        app.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='server', description="DMLS JSON API server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--workers', type=int, default=4, help="Read worker threads (one connection each)")
+    parser.add_argument('--db', default=os.environ.get('DMLS_DB'))
+    args = parser.parse_args()
+    if args.db:
+        database.init(args.db)
+    init_database()
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,320 @@
+"""
+JSON API over the model layer
+
+Reads run on a small pool of worker threads (peewee keeps one SQLite
+connection per thread); writes are funnelled through a single writer thread
+so concurrent requests never fight over the SQLite write lock. Rendered GET
+responses are cached and validated against PRAGMA data_version, which
+changes whenever any other connection (our writer or another process)
+commits.
+
+Routes:
+    GET    /api                          resource index
+    GET    /api/<resource>?limit=&after=  keyset-paginated collection
+    GET    /api/<resource>/<id>          detail
+    POST   /api/<resource>               create
+    PATCH  /api/<resource>/<id>          update
+    DELETE /api/<resource>/<id>          delete
+    POST   /api/batch                    several writes in one transaction
+"""
+
+import asyncio
+import hashlib
+import sqlite3
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import unquote
+
+import peewee as pw
+
+from database.connection import database
+from models.builds.build import Build
+from models.jobs.job import Job
+from models.powders.powder import Powder
+from models.powders.powder_composition import PowderComposition
+from models.powders.powder_results import PowderResults
+from models.coupons.coupon import Coupon
+from models.coupons.coupon_array import CouponArray
+from server.http import HttpError, Response
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+COUPON_SLOTS = 256
+
+
+def _row_dicts(headers, rows):
+    return [dict(zip(headers, row)) for row in rows]
+
+
+def _select_dicts(model_cls, fields, where):
+    headers = [f.column_name for f in fields]
+    return _row_dicts(headers, model_cls.select(*fields).where(where).tuples())
+
+
+class Resource:
+    """A model exposed as a collection; list views only select list_fields"""
+    def __init__(self, name, model_cls, list_fields):
+        self.name = name
+        self.model_cls = model_cls
+        self.list_fields = [model_cls._meta.fields[f] for f in list_fields]
+        self.headers = [f.column_name for f in self.list_fields]
+
+    @property
+    def pk(self):
+        return self.model_cls._meta.primary_key
+
+    def resolve_field(self, name):
+        """Accept either a field name ('setting') or its column name ('setting_id')"""
+        meta = self.model_cls._meta
+        field = meta.fields.get(name) or meta.columns.get(name)
+        if field is None:
+            raise HttpError(400, f"Unknown field for {self.name}: {name}")
+        return field
+
+    def coerce_pk(self, value):
+        try:
+            return self.pk.adapt(value)
+        except (TypeError, ValueError):
+            raise HttpError(400, f"Invalid id for {self.name}: {value}")
+
+    def list(self, params):
+        try:
+            limit = min(int(params.get('limit', DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE)
+        except ValueError:
+            raise HttpError(400, "limit must be an integer")
+        query = self.model_cls.select(*self.list_fields)
+        if 'after' in params:
+            query = query.where(self.pk > self.coerce_pk(params['after']))
+        for name, value in params.items():
+            if name in ('limit', 'after'):
+                continue
+            query = query.where(self.resolve_field(name) == value)
+        rows = list(query.order_by(self.pk).limit(limit + 1).tuples())
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        return {
+            'items': _row_dicts(self.headers, rows),
+            'next': rows[-1][self.headers.index(self.pk.column_name)] if has_more else None,
+        }
+
+    def detail(self, pk):
+        fields = self.model_cls._meta.sorted_fields
+        rows = _select_dicts(self.model_cls, fields, self.pk == pk)
+        if not rows:
+            raise HttpError(404, f"{self.name} {pk} not found")
+        return rows[0]
+
+    def clean_data(self, data):
+        if not isinstance(data, dict) or not data:
+            raise HttpError(400, "'data' must be a non-empty object")
+        return {self.resolve_field(k).name: v for k, v in data.items()}
+
+    def create(self, data):
+        return self.model_cls.create(**self.clean_data(data)).get_id()
+
+    def update(self, pk, data):
+        data = self.clean_data(data)
+        if self.pk.name in data:
+            raise HttpError(400, "The primary key cannot be changed")
+        count = self.model_cls.update(**data).where(self.pk == pk).execute()
+        if not count:
+            raise HttpError(404, f"{self.name} {pk} not found")
+
+    def delete(self, pk):
+        if not self.model_cls.delete().where(self.pk == pk).execute():
+            raise HttpError(404, f"{self.name} {pk} not found")
+
+
+class BuildResource(Resource):
+    def detail(self, pk):
+        build = super().detail(pk)
+        build['jobs'] = [job_id for (job_id,) in Job.select(Job.id).where(Job.build == pk).tuples()]
+        return build
+
+
+class PowderResource(Resource):
+    def detail(self, pk):
+        powder = super().detail(pk)
+        composition = _select_dicts(PowderComposition, PowderComposition._meta.sorted_fields[1:],
+                                    PowderComposition.powder == pk)
+        results = _select_dicts(PowderResults, PowderResults._meta.sorted_fields[1:],
+                                PowderResults.powder == pk)
+        # Only report elements that were actually measured
+        powder['composition'] = ({k: v for k, v in composition[0].items() if v is not None}
+                                 if composition else None)
+        powder['results'] = results[0] if results else None
+        return powder
+
+
+class CouponArrayResource(Resource):
+    def detail(self, pk):
+        slot_fields = [CouponArray._meta.fields[f'coupon_{i}'] for i in range(1, COUPON_SLOTS + 1)]
+        rows = list(CouponArray
+                    .select(CouponArray.id, CouponArray.name, CouponArray.description,
+                            CouponArray.is_preset, *slot_fields)
+                    .where(CouponArray.id == pk)
+                    .tuples())
+        if not rows:
+            raise HttpError(404, f"{self.name} {pk} not found")
+        row = rows[0]
+        slot_ids = row[4:]
+        coupon_fields = Coupon._meta.sorted_fields
+        coupons = {c['id']: c for c in _select_dicts(
+            Coupon, coupon_fields, Coupon.id.in_({cid for cid in slot_ids if cid is not None}))}
+        return {
+            'id': row[0], 'name': row[1], 'description': row[2], 'is_preset': row[3],
+            'slots': [{'slot': slot, 'coupon': coupons.get(cid)}
+                      for slot, cid in enumerate(slot_ids, start=1) if cid is not None],
+        }
+
+
+RESOURCES = {r.name: r for r in [
+    BuildResource('builds', Build, ['id', 'name', 'datetime', 'powder', 'setting', 'plate',
+                                    'coupon_array', 'powder_weight_required', 'powder_weight_loaded']),
+    PowderResource('powders', Powder, ['id', 'mat_id', 'man_lot', 'subgroup', 'rev',
+                                       'quantity', 'init_date_time', 'description']),
+    Resource('jobs', Job, ['id', 'name', 'description', 'part_list', 'work_order', 'build']),
+    CouponArrayResource('coupon-arrays', CouponArray, ['id', 'name', 'description', 'is_preset']),
+]}
+
+
+class ResponseCache:
+    """LRU of rendered GET bodies, each tagged with the data_version it was built at"""
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+
+    def get(self, key, version):
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != version:
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key, version, etag, body):
+        self._entries[key] = (version, etag, body)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+def _etag(body):
+    return '"%s"' % hashlib.blake2b(body, digest_size=12).hexdigest()
+
+
+def _etag_matches(header, etag):
+    if not header:
+        return False
+    candidates = [c.strip() for c in header.split(',')]
+    return '*' in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+class ApiApp:
+    def __init__(self, read_workers=4, cache_entries=512):
+        self.readers = ThreadPoolExecutor(max_workers=read_workers, thread_name_prefix='dmls-read')
+        self.writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='dmls-write')
+        self.cache = ResponseCache(cache_entries)
+        # Separate connection used only to read PRAGMA data_version on the loop thread
+        self._version_conn = sqlite3.connect(database.database, check_same_thread=False)
+
+    def close(self):
+        self.readers.shutdown(wait=True)
+        self.writer.shutdown(wait=True)
+        self._version_conn.close()
+
+    def data_version(self):
+        return self._version_conn.execute('PRAGMA data_version').fetchone()[0]
+
+    async def _run(self, executor, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+
+    async def __call__(self, request):
+        parts = [unquote(p) for p in request.path.split('/') if p]
+        if not parts or parts[0] != 'api':
+            raise HttpError(404, "Not found")
+        parts = parts[1:]
+        if request.method == 'GET':
+            return await self._get(request, parts)
+        if parts == ['batch'] and request.method == 'POST':
+            payload = request.json() or {}
+            return Response.json(await self._write(payload.get('operations')))
+        resource = self._resource(parts)
+        if request.method == 'POST' and len(parts) == 1:
+            op = {'op': 'create', 'resource': resource.name, 'data': (request.json() or {})}
+            result = await self._write([op])
+            return Response.json(result['results'][0], 201)
+        if request.method == 'PATCH' and len(parts) == 2:
+            op = {'op': 'update', 'resource': resource.name, 'id': parts[1], 'data': (request.json() or {})}
+            await self._write([op])
+            return Response(204)
+        if request.method == 'DELETE' and len(parts) == 2:
+            await self._write([{'op': 'delete', 'resource': resource.name, 'id': parts[1]}])
+            return Response(204)
+        raise HttpError(405, f"{request.method} not allowed on {request.path}")
+
+    def _resource(self, parts):
+        if not parts or len(parts) > 2 or parts[0] not in RESOURCES:
+            raise HttpError(404, "Unknown resource")
+        return RESOURCES[parts[0]]
+
+    async def _get(self, request, parts):
+        if not parts:
+            return Response.json({'resources': sorted(RESOURCES)})
+        resource = self._resource(parts)
+        version = self.data_version()
+        entry = self.cache.get(request.target, version)
+        if entry is None:
+            if len(parts) == 1:
+                payload = await self._run(self.readers, resource.list, request.query)
+            else:
+                pk = resource.coerce_pk(parts[1])
+                payload = await self._run(self.readers, resource.detail, pk)
+            response = Response.json(payload)
+            etag = _etag(response.body)
+            self.cache.put(request.target, version, etag, response.body)
+        else:
+            _, etag, body = entry
+            response = Response(200, body)
+        response.headers['ETag'] = etag
+        if _etag_matches(request.headers.get('if-none-match'), etag):
+            return Response(304, headers={'ETag': etag})
+        return response
+
+    async def _write(self, operations):
+        if not isinstance(operations, list) or not operations:
+            raise HttpError(400, "'operations' must be a non-empty list")
+        return await self._run(self.writer, self._apply_operations, operations)
+
+    def _apply_operations(self, operations):
+        """Apply every operation in one transaction; any failure rolls all of them back"""
+        results = []
+        try:
+            with database.atomic():
+                for index, op in enumerate(operations):
+                    try:
+                        results.append(self._apply_operation(op))
+                    except HttpError as e:
+                        raise HttpError(e.status, f"operation {index}: {e.message}")
+        except pw.IntegrityError as e:
+            raise HttpError(409, f"Integrity error: {e}")
+        return {'results': results}
+
+    def _apply_operation(self, op):
+        if not isinstance(op, dict):
+            raise HttpError(400, "each operation must be an object")
+        resource = RESOURCES.get(op.get('resource'))
+        if resource is None:
+            raise HttpError(400, f"Unknown resource: {op.get('resource')}")
+        kind = op.get('op')
+        if kind == 'create':
+            return {'op': kind, 'resource': resource.name, 'id': resource.create(op.get('data'))}
+        if 'id' not in op:
+            raise HttpError(400, f"'{kind}' needs an 'id'")
+        pk = resource.coerce_pk(op['id'])
+        if kind == 'update':
+            resource.update(pk, op.get('data'))
+        elif kind == 'delete':
+            resource.delete(pk)
+        else:
+            raise HttpError(400, f"Unknown op: {kind}")
+        return {'op': kind, 'resource': resource.name, 'id': pk}
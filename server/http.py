@@ -0,0 +1,135 @@
+"""
+Minimal HTTP/1.1 layer on asyncio streams
+
+Only what the JSON API needs: Content-Length bodies, keep-alive and a
+handful of methods. Anything else is answered with a 4xx.
+"""
+
+import asyncio
+import json
+from urllib.parse import urlsplit, parse_qs
+
+MAX_HEADER_LINES = 100
+MAX_BODY_BYTES = 16 * 1024 * 1024
+
+REASONS = {
+    200: 'OK', 201: 'Created', 204: 'No Content', 304: 'Not Modified',
+    400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+    409: 'Conflict', 413: 'Payload Too Large', 500: 'Internal Server Error',
+}
+
+
+class HttpError(Exception):
+    """Raised by handlers to answer with an error status and JSON message"""
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class Request:
+    def __init__(self, method, target, headers, body):
+        self.method = method
+        self.headers = headers
+        self.body = body
+        parts = urlsplit(target)
+        self.path = parts.path.rstrip('/') or '/'
+        self.query = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+        self.target = target
+
+    def json(self):
+        if not self.body:
+            return None
+        try:
+            return json.loads(self.body)
+        except ValueError:
+            raise HttpError(400, "Request body is not valid JSON")
+
+
+class Response:
+    def __init__(self, status=200, body=b'', headers=None):
+        self.status = status
+        self.body = body
+        self.headers = headers or {}
+
+    @classmethod
+    def json(cls, payload, status=200, headers=None):
+        body = json.dumps(payload, default=str, separators=(',', ':')).encode('utf-8')
+        return cls(status, body, headers)
+
+    def encode(self, keep_alive):
+        lines = [f"HTTP/1.1 {self.status} {REASONS.get(self.status, 'Unknown')}"]
+        headers = dict(self.headers)
+        if self.body or self.status not in (204, 304):
+            headers.setdefault('Content-Type', 'application/json')
+        headers['Content-Length'] = str(len(self.body))
+        headers['Connection'] = 'keep-alive' if keep_alive else 'close'
+        lines.extend(f"{k}: {v}" for k, v in headers.items())
+        return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + self.body
+
+
+async def _read_request(reader):
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+    try:
+        method, target, version = request_line.decode('latin-1').split()
+    except ValueError:
+        raise HttpError(400, "Malformed request line")
+    headers = {}
+    for _ in range(MAX_HEADER_LINES):
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    else:
+        raise HttpError(400, "Too many header lines")
+    try:
+        length = int(headers.get('content-length') or 0)
+    except ValueError:
+        raise HttpError(400, "Bad Content-Length")
+    if length < 0:
+        raise HttpError(400, "Bad Content-Length")
+    if length > MAX_BODY_BYTES:
+        raise HttpError(413, "Request body too large")
+    body = await reader.readexactly(length) if length else b''
+    request = Request(method.upper(), target, headers, body)
+    request.version = version
+    return request
+
+
+def _wants_keep_alive(request):
+    connection = request.headers.get('connection', '').lower()
+    if request.version == 'HTTP/1.0':
+        return connection == 'keep-alive'
+    return connection != 'close'
+
+
+async def serve_connection(reader, writer, handler):
+    """Answer requests on one connection until the client closes it"""
+    try:
+        while True:
+            try:
+                request = await _read_request(reader)
+            except HttpError as e:
+                writer.write(Response.json({'error': e.message}, e.status).encode(False))
+                await writer.drain()
+                return
+            except (asyncio.IncompleteReadError, ConnectionError):
+                return
+            if request is None:
+                return
+            keep_alive = _wants_keep_alive(request)
+            try:
+                response = await handler(request)
+            except HttpError as e:
+                response = Response.json({'error': e.message}, e.status)
+            except Exception as e:
+                response = Response.json({'error': f"{type(e).__name__}: {e}"}, 500)
+            writer.write(response.encode(keep_alive))
+            await writer.drain()
+            if not keep_alive:
+                return
+    finally:
+        writer.close()